@@ -0,0 +1,99 @@
+"""
+Async variants of the hot routers.
+
+With DB_ASYNC enabled, main.py mounts asyncify(router) in place of the
+wines, cellar-slot and scan-event routers. Each route keeps its path,
+parameters and response model but becomes an `async def` on an
+AsyncSession: the original handler runs through AsyncSession.run_sync,
+so its queries go through the async driver and the event loop is free
+while Postgres works, instead of pinning a threadpool worker per request.
+
+The response is rendered inside run_sync as well, so relationships the
+response model touches can still load.
+"""
+import contextvars
+import inspect
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.params import Depends as DependsParam
+from fastapi.routing import APIRoute
+from pydantic import parse_obj_as
+
+from app.database import get_async_db, get_db
+
+
+def _db_params(endpoint) -> list:
+    """Names of the endpoint's parameters that depend on get_db."""
+    return [
+        name for name, param in inspect.signature(endpoint).parameters.items()
+        if isinstance(param.default, DependsParam) and param.default.dependency is get_db
+    ]
+
+
+def _render(route: APIRoute, result):
+    """Turn ORM results into the response model while the session is usable."""
+    if result is None or isinstance(result, Response) or route.response_model is None:
+        return result
+    return parse_obj_as(route.response_model, result)
+
+
+def _async_endpoint(route: APIRoute):
+    sync_endpoint = route.endpoint
+    signature = inspect.signature(sync_endpoint)
+    db_params = _db_params(sync_endpoint)
+
+    async def endpoint(**kwargs):
+        session = None
+        for name in db_params:
+            session = kwargs.pop(name)
+
+        def call(sync_session):
+            result = sync_endpoint(**kwargs, **{name: sync_session for name in db_params})
+            return _render(route, result)
+
+        # run_sync's greenlet starts with an empty context; carry ours in
+        # so per-request state (app/instrumentation.py) is still visible
+        context = contextvars.copy_context()
+        return await session.run_sync(lambda sync_session: context.run(call, sync_session))
+
+    endpoint.__signature__ = signature.replace(parameters=[
+        param.replace(default=Depends(get_async_db)) if name in db_params else param
+        for name, param in signature.parameters.items()
+    ])
+    endpoint.__name__ = sync_endpoint.__name__
+    endpoint.__doc__ = sync_endpoint.__doc__
+    return endpoint
+
+
+def asyncify(router: APIRouter) -> APIRouter:
+    """
+    Copy a router, swapping every sync handler that uses get_db for an
+    async one on get_async_db. Handlers that are already async are kept.
+    """
+    async_router = APIRouter()
+    for route in router.routes:
+        if (
+            not isinstance(route, APIRoute)
+            or inspect.iscoroutinefunction(route.endpoint)
+            or not _db_params(route.endpoint)
+        ):
+            async_router.routes.append(route)
+            continue
+
+        async_router.add_api_route(
+            route.path,
+            _async_endpoint(route),
+            response_model = route.response_model,
+            status_code = route.status_code,
+            tags = route.tags,
+            dependencies = route.dependencies,
+            summary = route.summary,
+            description = route.description,
+            response_description = route.response_description,
+            responses = route.responses,
+            methods = route.methods,
+            name = route.name,
+            response_class = route.response_class,
+            route_class_override = type(route),
+        )
+    return async_router
@@ -0,0 +1,91 @@
+"""
+Command line entry points for maintenance jobs.
+
+    python -m app.cli rebuild-occupancy
+    python -m app.cli recompute-metrics [--changed-only] [--chunk-size N]
+    python -m app.cli snapshot [--out DIR] [--format parquet|arrow] [--full]
+"""
+import argparse
+
+from app import metrics_job, occupancy, snapshot
+from app.database import SessionLocal, engine
+
+
+def rebuild_occupancy(args):
+    """Replay the scan_events log into the slot_occupancy projection."""
+    db = SessionLocal()
+    try:
+        count = occupancy.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt occupancy for {count} slots")
+
+
+def recompute_metrics(args):
+    """Recompute WineMetrics for the whole cellar and print the throughput."""
+    db = SessionLocal()
+    try:
+        report = metrics_job.recompute_all(
+            db,
+            chunk_size=args.chunk_size,
+            changed_only=args.changed_only,
+        )
+    finally:
+        db.close()
+    print(
+        f"Recomputed metrics for {report['wines']} wines in {report['chunks']} chunks "
+        f"({report['elapsed_seconds']}s, {report['wines_per_second']} wines/s)"
+    )
+
+
+def take_snapshot(args):
+    """Write a Parquet/Arrow snapshot of the cellar for analytics."""
+    manifest = snapshot.run(
+        engine,
+        args.out,
+        fmt=args.format,
+        full=args.full,
+        batch_size=args.batch_size,
+    )
+    print(f"Wrote {manifest['mode']} snapshot taken at {manifest['taken_at']}")
+    for name, table in manifest["tables"].items():
+        print(f"  {name}: {table['rows']} rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-occupancy",
+        help="Rebuild the slot occupancy projection from scan_events"
+    )
+    rebuild.set_defaults(func=rebuild_occupancy)
+
+    recompute = commands.add_parser(
+        "recompute-metrics",
+        help="Recompute WineMetrics for every wine"
+    )
+    recompute.add_argument("--changed-only", action="store_true",
+                           help="only wines whose scores changed since the last run")
+    recompute.add_argument("--chunk-size", type=int, default=1000)
+    recompute.set_defaults(func=recompute_metrics)
+
+    snap = commands.add_parser(
+        "snapshot",
+        help="Write a columnar snapshot of wines, purchases, scores, metrics and scan events"
+    )
+    snap.add_argument("--out", default="snapshots", help="snapshot directory (holds the watermark state)")
+    snap.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    snap.add_argument("--full", action="store_true",
+                      help="export every row instead of the changes since the last snapshot")
+    snap.add_argument("--batch-size", type=int, default=snapshot.BATCH_SIZE)
+    snap.set_defaults(func=take_snapshot)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
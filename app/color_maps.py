@@ -0,0 +1,99 @@
+"""
+Slot color maps for the LED controllers.
+
+A color map lights a few slots in one color and leaves the rest in a
+default, so instead of one SlotColor per slot it can be sent as the
+highlighted slot ids (format=ids) or as runs of highlighted positions
+over the stable (rack, row, id) slot ordering (format=rle).
+
+Every format carries an ETag computed from the map itself; a controller
+polling with If-None-Match gets a bodyless 304 while nothing changed.
+"""
+import hashlib
+from typing import List, Optional
+
+from fastapi import Response
+
+from app.schemas import ColorMapFormat, SlotColor, SlotColorMap
+
+
+class ColorMap:
+    def __init__(self, slot_ids: list, highlighted: List[int], color: str, default: Optional[str]):
+        self.slot_ids       = slot_ids          # in (rack, row, id) order
+        self.highlighted    = highlighted       # positions into slot_ids, ascending
+        self.color          = color
+        self.default        = default
+
+    @classmethod
+    def from_rows(cls, rows, color: str, default: Optional[str]) -> "ColorMap":
+        """Build from ordered (slot_id, highlighted?) rows."""
+        slot_ids, highlighted = [], []
+        for position, (slot_id, on) in enumerate(rows):
+            slot_ids.append(slot_id)
+            if on:
+                highlighted.append(position)
+        return cls(slot_ids, highlighted, color, default)
+
+    def layout(self) -> str:
+        return hashlib.sha1(b"".join(slot_id.bytes for slot_id in self.slot_ids)).hexdigest()[:16]
+
+    def etag(self, fmt: ColorMapFormat, layout: str) -> str:
+        digest = hashlib.sha1(f"{fmt.value}|{self.color}|{self.default}|{layout}|".encode())
+        digest.update(",".join(map(str, self.highlighted)).encode())
+        return f'"{digest.hexdigest()}"'
+
+    def runs(self) -> list:
+        runs = []
+        for position in self.highlighted:
+            if runs and runs[-1][0] + runs[-1][1] == position:
+                runs[-1][1] += 1
+            else:
+                runs.append([position, 1])
+        return [tuple(run) for run in runs]
+
+    def compact(self, fmt: ColorMapFormat, layout: str) -> SlotColorMap:
+        color_map = SlotColorMap(
+            color = self.color,
+            default = self.default,
+            slots = len(self.slot_ids),
+            layout = layout,
+        )
+        if fmt == ColorMapFormat.IDS:
+            color_map.highlighted = [self.slot_ids[i] for i in self.highlighted]
+        else:
+            color_map.runs = self.runs()
+        return color_map
+
+    def full(self) -> List[SlotColor]:
+        """One SlotColor per slot; slots at the default are left out when there is none."""
+        lit = set(self.highlighted)
+        return [
+            SlotColor(slot_id=slot_id, color=self.color if i in lit else self.default)
+            for i, slot_id in enumerate(self.slot_ids)
+            if i in lit or self.default is not None
+        ]
+
+
+def _matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def respond(
+    color_map: ColorMap,
+    fmt: ColorMapFormat,
+    response: Response,
+    if_none_match: Optional[str] = None,
+):
+    """Render a color map in the requested format with its ETag, or a 304."""
+    layout = color_map.layout()
+    etag = color_map.etag(fmt, layout)
+    if _matches(etag, if_none_match):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    if fmt == ColorMapFormat.FULL:
+        return color_map.full()
+    return color_map.compact(fmt, layout)
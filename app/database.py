@@ -5,8 +5,12 @@ load_dotenv()
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app import db_pool, instrumentation
+
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+# pool sizing, pre-ping and PgBouncer mode come from the environment (app/db_pool.py)
+engine = db_pool.instrument(create_engine(DATABASE_URL, **db_pool.engine_options(DATABASE_URL)))
+instrumentation.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -15,4 +19,39 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Optional async engine -------------------------------
+# DB_ASYNC=true serves the hot routers from an AsyncEngine (see
+# app/async_routes.py). ASYNC_DATABASE_URL defaults to DATABASE_URL with
+# the async driver swapped in.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_url(url):
+    if not url or "://" not in url:
+        return url
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = db_pool.instrument(create_async_engine(
+        ASYNC_DATABASE_URL, **db_pool.engine_options(ASYNC_DATABASE_URL, is_async=True)
+    ))
+    instrumentation.instrument_engine(async_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,133 @@
+"""
+Connection pool configuration and instrumentation.
+
+Pool sizing comes from the environment:
+
+    DB_POOL_SIZE            connections kept open (default 5)
+    DB_POOL_MAX_OVERFLOW    extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT         seconds to wait for a connection (default 30)
+    DB_POOL_RECYCLE         reconnect connections older than this (default 1800)
+    DB_POOL_PRE_PING        test connections before use (default true)
+    DB_PGBOUNCER            running behind PgBouncer in transaction mode:
+                            turn off server-side prepared statement caching
+
+The pools record how long a checkout waits for a connection and how long
+connections are held, which /health/db reports along with saturation.
+"""
+import os
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.telemetry import Counter, Histogram
+
+checkout_wait   = Histogram()       # seconds spent getting a connection from the pool
+connection_held = Histogram()       # seconds a connection stays checked out
+checkout_timeouts = Counter()       # checkouts that gave up after DB_POOL_TIMEOUT
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+POOL_SIZE       = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW    = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT    = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE    = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+PRE_PING        = _flag("DB_POOL_PRE_PING", "true")
+PGBOUNCER       = _flag("DB_PGBOUNCER", "false")
+
+
+# --- Instrumented pools ---------------------------------
+class _TimedCheckout:
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _track_hold_time(engine):
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_conn, record, proxy):
+        record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_conn, record):
+        started = record.info.pop("checked_out_at", None)
+        if started is not None:
+            connection_held.observe(time.perf_counter() - started)
+
+
+# --- Engine options ---------------------------------------
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine/create_async_engine."""
+    if not url or url.startswith("sqlite"):
+        # SQLite picks its own pool; sizing doesn't apply
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": PRE_PING,
+    }
+
+    if PGBOUNCER:
+        driver = url.split("://", 1)[0]
+        if "asyncpg" in driver:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                # PgBouncer may hand us a server that has seen our names before
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        elif "psycopg" in driver and "psycopg2" not in driver:
+            options["connect_args"] = {"prepare_threshold": None}
+        # psycopg2 never uses server-side prepared statements
+    return options
+
+
+def instrument(engine):
+    """Attach hold-time tracking to an engine (sync, or an AsyncEngine's sync_engine)."""
+    _track_hold_time(getattr(engine, "sync_engine", engine))
+    return engine
+
+
+def pool_status(engine) -> dict:
+    """Current pool occupancy plus the checkout histograms."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "capacity": capacity,
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+        })
+    status.update({
+        "checkout_wait_seconds": checkout_wait.summary(),
+        "connection_held_seconds": connection_held.summary(),
+        "checkout_timeouts": checkout_timeouts.value(),
+    })
+    return status
@@ -0,0 +1,220 @@
+"""
+Streaming export of whole tables (GET /export/{table}).
+
+Each export is one query read through a server-side cursor (yield_per),
+so memory stays flat however large the table is: rows are encoded and
+sent a batch at a time. Lookups are joined in as names (country, region,
+...; producer/label/vintage for rows that point at a wine), so the output
+stands on its own without the lookup tables.
+
+    ndjson  one JSON object per line (lists stay lists)
+    csv     a header row, then one line per row (lists joined with "; ")
+
+Compression is negotiated with Accept-Encoding: gzip is applied on the
+fly, batch by batch.
+
+Streaming outlives the request handler, so every export opens its own
+session rather than using the request's. EXPORT_BATCH_SIZE sets the rows
+fetched and encoded per batch (default 1000).
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import fast_json
+from app.database import SessionLocal
+from app.models import (
+    CellarSlot, Classification, Country, CriticScore, Purchase, Region,
+    ScanEvent, Subregion, Varietal, Wine, wine_varietals,
+)
+
+BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+# --- Tables ---------------------------------------------
+# the wine a purchase, score or scan event points at
+WINE_NAME = (Wine.producer, Wine.label, Wine.vintage)
+
+
+def _wines():
+    return (
+        select(
+            Wine.id, Wine.producer, Wine.label, Wine.vintage,
+            Country.name.label("country"),
+            Region.name.label("region"),
+            Subregion.name.label("subregion"),
+            Classification.name.label("classification"),
+            Wine.bottle_size, Wine.closure_type, Wine.abv,
+        )
+        .join(Country, Wine.country_id == Country.id)
+        .join(Region, Wine.region_id == Region.id)
+        .outerjoin(Subregion, Wine.subregion_id == Subregion.id)
+        .outerjoin(Classification, Wine.classification_id == Classification.id)
+        .order_by(Wine.id)
+    )
+
+
+def _wine_varietals(db: Session, rows: List[dict]):
+    """Add each wine's varietal names: one query per batch."""
+    names = {}
+    link = wine_varietals.c
+    found = db.execute(
+        select(link.wine_id, Varietal.name)
+            .join(Varietal, link.varietal_id == Varietal.id)
+            .where(link.wine_id.in_([row["id"] for row in rows]))
+            .order_by(link.wine_id, Varietal.name)
+    )
+    for wine_id, name in found:
+        names.setdefault(wine_id, []).append(name)
+    for row in rows:
+        row["varietals"] = names.get(row["id"], [])
+
+
+def _purchases():
+    return (
+        select(
+            Purchase.id, Purchase.wine_id, *WINE_NAME,
+            Purchase.purchase_date, Purchase.price_amount,
+            Purchase.price_currency, Purchase.receipt_url,
+        )
+        .join(Wine, Purchase.wine_id == Wine.id)
+        .order_by(Purchase.id)
+    )
+
+
+def _critic_scores():
+    return (
+        select(
+            CriticScore.id, CriticScore.wine_id, *WINE_NAME,
+            CriticScore.source, CriticScore.score, CriticScore.review_date,
+        )
+        .join(Wine, CriticScore.wine_id == Wine.id)
+        .order_by(CriticScore.id)
+    )
+
+
+def _scan_events():
+    return (
+        select(
+            ScanEvent.id, ScanEvent.timestamp, ScanEvent.event_type,
+            ScanEvent.wine_id, *WINE_NAME,
+            ScanEvent.slot_id, CellarSlot.rack, CellarSlot.row, CellarSlot.led_node_id,
+            ScanEvent.idempotency_key,
+        )
+        .join(Wine, ScanEvent.wine_id == Wine.id)
+        .join(CellarSlot, ScanEvent.slot_id == CellarSlot.id)
+        .order_by(ScanEvent.id)
+    )
+
+
+class Table(NamedTuple):
+    query: Callable                 # () -> select
+    extra: tuple = ()               # columns added per batch by `extend`
+    extend: Optional[Callable[[Session, List[dict]], None]] = None
+
+
+TABLES: Dict[str, Table] = {
+    "wines":            Table(_wines, ("varietals",), _wine_varietals),
+    "purchases":        Table(_purchases),
+    "critic_scores":    Table(_critic_scores),
+    "scan_events":      Table(_scan_events),
+}
+
+
+# --- Encoding -------------------------------------------
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    return value
+
+
+class _NDJSON:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Iterable[dict]) -> bytes:
+        return b"".join(fast_json.dumps(row) + b"\n" for row in rows)
+
+
+class _CSV:
+    def __init__(self, columns: List[str]):
+        self.columns    = columns
+        self.buffer     = io.StringIO()
+        self.writer     = csv.writer(self.buffer)
+
+    def _drain(self) -> bytes:
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text.encode()
+
+    def header(self) -> bytes:
+        self.writer.writerow(self.columns)
+        return self._drain()
+
+    def encode(self, rows: Iterable[dict]) -> bytes:
+        for row in rows:
+            self.writer.writerow([_csv_value(row[name]) for name in self.columns])
+        return self._drain()
+
+
+ENCODERS = {"ndjson": _NDJSON, "csv": _CSV}
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)     # 31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+# --- Streaming ------------------------------------------
+def rows(table: str, batch_size: int = BATCH_SIZE) -> Iterator[List[dict]]:
+    """Batches of denormalized rows, read through a server-side cursor on a session of its own."""
+    spec = TABLES[table]
+    db = SessionLocal()
+    try:
+        result = db.execute(spec.query().execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            batch = [dict(row._mapping) for row in partition]
+            if spec.extend is not None:
+                spec.extend(db, batch)
+            yield batch
+    finally:
+        db.close()
+
+
+def columns(table: str) -> List[str]:
+    spec = TABLES[table]
+    return [column.name for column in spec.query().selected_columns] + list(spec.extra)
+
+
+def stream(table: str, fmt: str, gzip: bool = False, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """The encoded export, batch by batch."""
+    encoder = ENCODERS[fmt](columns(table))
+
+    def chunks():
+        yield encoder.header()
+        for batch in rows(table, batch_size):
+            yield encoder.encode(batch)
+
+    return _gzip(chunks()) if gzip else chunks()
@@ -0,0 +1,207 @@
+"""
+Per-request SQL and timing instrumentation.
+
+Three hooks feed one RequestStats object per request, carried in a
+context variable so it follows the request into the threadpool:
+
+  - the HTTP middleware (record_request) times the whole request,
+  - TimedRoute times the handler itself and names the route,
+  - SQLAlchemy cursor events count statements and their time.
+
+Whatever is left between the handler returning and the response starting
+is serialization (response_model validation, lazy loads, JSON encoding).
+Totals are aggregated per route into histograms served at /metrics/runtime.
+
+    APP_DEBUG=true          add X-DB-Query-Count, X-DB-Time-ms,
+                            X-Handler-Time-ms and X-Serialize-Time-ms headers
+    SLOW_QUERY_MS=200       log statements slower than this, with their route
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.telemetry import Counter, Histogram
+
+DEBUG = os.getenv("APP_DEBUG", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "200")) / 1000
+
+logger = logging.getLogger("app.sql")
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class RequestStats:
+    __slots__ = ("route", "router", "started", "handler_time", "handler_done", "query_count", "db_time")
+
+    def __init__(self):
+        self.route          = None
+        self.router         = None
+        self.started        = time.perf_counter()
+        self.handler_time   = 0.0
+        self.handler_done   = None
+        self.query_count    = 0
+        self.db_time        = 0.0
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests       = Counter()
+        self.query_count    = Histogram(buckets=QUERY_COUNT_BUCKETS)
+        self.db_time        = Histogram()
+        self.handler_time   = Histogram()
+        self.serialize_time = Histogram()
+        self.total_time     = Histogram()
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests.value(),
+            "query_count": self.query_count.summary(),
+            "db_seconds": self.db_time.summary(),
+            "handler_seconds": self.handler_time.summary(),
+            "serialize_seconds": self.serialize_time.summary(),
+            "total_seconds": self.total_time.summary(),
+        }
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_stats", default=None)
+routes: Dict[str, RouteStats] = {}
+
+# per router tag, for the Prometheus exposition (app/prometheus.py)
+router_requests: Dict[Tuple[str, int], Counter] = {}     # (router, status) -> requests
+router_latency: Dict[str, Histogram] = {}                # router -> request seconds
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def track():
+    """Collect query counts and DB time for the enclosed block (outside a request too)."""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _get(registry: dict, key, factory):
+    metric = registry.get(key)
+    if metric is None:
+        metric = registry.setdefault(key, factory())
+    return metric
+
+
+# --- SQLAlchemy hooks -------------------------------------
+def instrument_engine(engine):
+    """Count and time every statement the engine runs against the current request."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # the start time lives on the statement's execution context, which is
+    # discarded with it, so a statement that raises leaves nothing behind
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        stats = _current.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.db_time += elapsed
+        if elapsed >= SLOW_QUERY_SECONDS:
+            logger.warning(
+                "slow query %.1fms on %s: %s",
+                elapsed * 1000, stats.route if stats else "(no request)", statement
+            )
+
+    return engine
+
+
+# --- Route hook -------------------------------------------
+def _timed(endpoint, route_name: str, router_name: str):
+    if getattr(endpoint, "__timed__", False):
+        return endpoint
+
+    def start():
+        stats = _current.get()
+        if stats is not None:
+            stats.route = route_name
+            stats.router = router_name
+        return stats, time.perf_counter()
+
+    def finish(stats, started):
+        if stats is not None:
+            stats.handler_done = time.perf_counter()
+            stats.handler_time = stats.handler_done - started
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            stats, started = start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                finish(stats, started)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            stats, started = start()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                finish(stats, started)
+
+    wrapper.__timed__ = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that times its handler and tags the request with its route and router."""
+    def __init__(self, path: str, endpoint, **kwargs):
+        methods = ",".join(sorted(kwargs.get("methods") or ["GET"]))
+        tags = kwargs.get("tags") or ["app"]
+        super().__init__(path, _timed(endpoint, f"{methods} {path}", str(tags[0]).lower()), **kwargs)
+
+
+# --- HTTP middleware ----------------------------------------
+async def record_request(request, call_next):
+    with track() as stats:
+        response = await call_next(request)
+
+    finished = time.perf_counter()
+    total = finished - stats.started
+    serialize = finished - stats.handler_done if stats.handler_done else 0.0
+
+    router = stats.router or "unmatched"
+    _get(router_requests, (router, response.status_code), Counter).inc()
+    _get(router_latency, router, Histogram).observe(total)
+
+    route = _get(routes, stats.route or "unmatched", RouteStats)
+    route.requests.inc()
+    route.query_count.observe(stats.query_count)
+    route.db_time.observe(stats.db_time)
+    route.handler_time.observe(stats.handler_time)
+    route.serialize_time.observe(serialize)
+    route.total_time.observe(total)
+
+    if DEBUG:
+        response.headers["X-DB-Query-Count"] = str(stats.query_count)
+        response.headers["X-DB-Time-ms"] = f"{stats.db_time * 1000:.2f}"
+        response.headers["X-Handler-Time-ms"] = f"{stats.handler_time * 1000:.2f}"
+        response.headers["X-Serialize-Time-ms"] = f"{serialize * 1000:.2f}"
+    return response
+
+
+def runtime_summary() -> dict:
+    return {route: stats.summary() for route, stats in sorted(routes.items())}
@@ -0,0 +1,225 @@
+"""
+LED command dispatch.
+
+Scan endpoints call dispatcher.submit() after they commit and return
+straight away; a background asyncio worker delivers the commands to the
+LED nodes (CellarSlot.led_node_id), so a slow or unreachable node never
+holds up a scan request.
+
+  - submit() is thread-safe (sync handlers run in the threadpool) and
+    never blocks: when the bounded queue is full the command is dropped
+    and counted.
+  - The worker drains the queue every LED_BATCH_WINDOW_MS and groups
+    commands per node; repeated changes to one slot coalesce so only the
+    latest color is sent.
+  - Each node is delivered to independently and retried with exponential
+    backoff. Commands that arrive during a retry are merged into it, so a
+    retry always carries the newest colors.
+
+The transport is pluggable: LED_TRANSPORT=logging (default), simulator,
+or a "package.module:Class" path to any Transport subclass.
+
+    LED_QUEUE_SIZE          queued commands before dropping (default 10000)
+    LED_BATCH_WINDOW_MS     how long to gather commands per batch (default 20)
+    LED_MAX_ATTEMPTS        deliveries per batch before giving up (default 5)
+"""
+import asyncio
+import importlib
+import logging
+import os
+import random
+from typing import Dict, NamedTuple, Optional
+
+from app.telemetry import Counter
+
+logger = logging.getLogger("app.led")
+
+
+class LedCommand(NamedTuple):
+    node_id: str
+    slot_id: object
+    color: str
+
+
+# --- Transports -------------------------------------------
+class Transport:
+    """Delivers one batch of slot colors to one LED node."""
+    async def send(self, node_id: str, colors: Dict[object, str]):
+        raise NotImplementedError
+
+
+class LoggingTransport(Transport):
+    """Logs the commands instead of driving hardware."""
+    async def send(self, node_id: str, colors: Dict[object, str]):
+        for slot_id, color in colors.items():
+            logger.info("LED node %s: slot %s -> %s", node_id, slot_id, color)
+
+
+class SimulatorTransport(Transport):
+    """
+    In-memory LED nodes for tests and load runs. Keeps the color of every
+    slot and every batch received, and can add latency and random failures.
+    """
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency        = latency
+        self.failure_rate   = failure_rate
+        self.rng            = random.Random(seed)
+        self.state          = {}        # node_id -> {slot_id: color}
+        self.batches        = []        # (node_id, {slot_id: color}) in delivery order
+
+    async def send(self, node_id: str, colors: Dict[object, str]):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise ConnectionError(f"simulated failure on LED node {node_id}")
+        self.state.setdefault(node_id, {}).update(colors)
+        self.batches.append((node_id, dict(colors)))
+
+
+def transport_from_env() -> Transport:
+    name = os.getenv("LED_TRANSPORT", "logging")
+    if name == "logging":
+        return LoggingTransport()
+    if name == "simulator":
+        return SimulatorTransport()
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+# --- Dispatcher -------------------------------------------
+class LedDispatcher:
+    def __init__(
+        self,
+        transport: Transport,
+        maxsize: int = 10000,
+        batch_window: float = 0.02,
+        max_attempts: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+    ):
+        self.transport      = transport
+        self.maxsize        = maxsize
+        self.batch_window   = batch_window
+        self.max_attempts   = max_attempts
+        self.backoff        = backoff
+        self.max_backoff    = max_backoff
+
+        self.sent       = Counter()     # commands delivered
+        self.dropped    = Counter()     # queue full, not running, or out of retries
+        self.failures   = Counter()     # failed deliveries (each retry counts)
+
+        self._loop      = None
+        self._queue     = None
+        self._worker    = None
+        self._pending   = {}            # node_id -> {slot_id: color} awaiting delivery
+        self._inflight  = {}            # node_id -> delivery task
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.maxsize)
+        self._worker = self._loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop taking commands and give queued ones a chance to go out."""
+        if not self.running:
+            return
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._collect()
+        self._flush_all()
+        if self._inflight:
+            await asyncio.wait(list(self._inflight.values()), timeout=timeout)
+        self._worker = None
+
+    # --- producer side (any thread) ---
+    def submit(self, node_id: str, slot_id, color: str) -> bool:
+        """Queue a color change; returns False if it was dropped."""
+        if not self.running:
+            self.dropped.inc()
+            logger.debug("LED dispatcher not running; dropped slot %s -> %s", slot_id, color)
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, LedCommand(node_id, slot_id, color))
+        except RuntimeError:
+            # the loop has shut down
+            self.dropped.inc()
+            return False
+        return True
+
+    def _enqueue(self, command: LedCommand):
+        try:
+            self._queue.put_nowait(command)
+        except asyncio.QueueFull:
+            self.dropped.inc()
+            logger.warning("LED queue full; dropped slot %s -> %s", command.slot_id, command.color)
+
+    # --- worker side (event loop) ---
+    def _collect(self):
+        """Move everything queued into the per-node pending maps (coalescing)."""
+        while True:
+            try:
+                command = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self._pending.setdefault(command.node_id, {})[command.slot_id] = command.color
+
+    def _flush_all(self):
+        for node_id in list(self._pending):
+            if node_id not in self._inflight:
+                self._inflight[node_id] = self._loop.create_task(self._deliver(node_id))
+
+    async def _run(self):
+        while True:
+            command = await self._queue.get()
+            self._pending.setdefault(command.node_id, {})[command.slot_id] = command.color
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            self._collect()
+            self._flush_all()
+
+    async def _deliver(self, node_id: str):
+        attempt = 0
+        try:
+            while self._pending.get(node_id):
+                colors = self._pending.pop(node_id)
+                try:
+                    await self.transport.send(node_id, colors)
+                except Exception as e:
+                    self.failures.inc()
+                    attempt += 1
+                    if attempt >= self.max_attempts:
+                        self.dropped.inc(len(colors))
+                        logger.error("LED node %s unreachable after %d attempts: %s", node_id, attempt, e)
+                        attempt = 0
+                        continue
+                    # newer commands for the same slots win over the failed ones
+                    self._pending[node_id] = {**colors, **self._pending.get(node_id, {})}
+                    delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                else:
+                    self.sent.inc(len(colors))
+                    attempt = 0
+        finally:
+            self._inflight.pop(node_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending_nodes": len(self._pending),
+            "sent": self.sent.value(),
+            "dropped": self.dropped.value(),
+            "failures": self.failures.value(),
+        }
+
+
+dispatcher = LedDispatcher(
+    transport_from_env(),
+    maxsize = int(os.getenv("LED_QUEUE_SIZE", "10000")),
+    batch_window = float(os.getenv("LED_BATCH_WINDOW_MS", "20")) / 1000,
+    max_attempts = int(os.getenv("LED_MAX_ATTEMPTS", "5")),
+)
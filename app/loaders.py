@@ -0,0 +1,58 @@
+"""
+Loader options for the nested read schemas.
+
+Each response model in app.schemas walks a fixed relationship graph
+(WineRead -> region -> country, subregion -> region -> country, ...).
+Left to lazy loading, serializing a page of N rows issues several SELECTs
+per row. The option sets below load the whole graph a schema needs with
+one extra SELECT per relationship level, independent of page size.
+
+    db.query(models.Wine).options(*loaders.WINE_READ)
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import models
+
+
+def _wine_read(rel=selectinload):
+    """
+    Options for everything WineRead renders. `rel` starts each path and
+    defaults to querying Wine directly; pass a function that prefixes the
+    path with the parent's Wine relationship to nest the graph.
+    """
+    return [
+        rel(models.Wine.country),
+        rel(models.Wine.region)
+            .selectinload(models.Region.country),
+        rel(models.Wine.subregion)
+            .selectinload(models.Subregion.region)
+            .selectinload(models.Region.country),
+        rel(models.Wine.classification),
+        rel(models.Wine.varietals),
+    ]
+
+
+# --- Response model graphs ------------------------------
+WINE_READ = _wine_read()
+
+PURCHASE_READ = _wine_read(
+    lambda attr: joinedload(models.Purchase.wine).selectinload(attr)
+)
+
+SCAN_EVENT_READ = [
+    joinedload(models.ScanEvent.slot),
+    *_wine_read(lambda attr: joinedload(models.ScanEvent.wine).selectinload(attr)),
+]
+
+# WineRead with its lookups rendered from app.lookup_cache instead
+WINE_VARIETALS = [
+    selectinload(models.Wine.varietals),
+]
+
+REGION_READ = [
+    joinedload(models.Region.country),
+]
+
+SUBREGION_READ = [
+    joinedload(models.Subregion.region).joinedload(models.Region.country),
+]
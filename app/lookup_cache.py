@@ -0,0 +1,112 @@
+"""
+Process-local read-through cache for the lookup tables.
+
+Countries, regions, subregions, classifications and varietals change
+rarely but are read on every wine write (foreign key validation) and
+every nested WineRead. Entries are the rendered read schemas, keyed by
+(model, id), so cached values never hold on to a database session.
+
+Any create/update/delete in the lookup routers calls invalidate(), which
+bumps a version number and drops everything: a region renders its
+country, so per-row invalidation would leave stale nested data behind.
+Other worker processes pick up changes when their entries expire (TTL).
+
+Configured with LOOKUP_CACHE_SIZE (entries) and LOOKUP_CACHE_TTL (seconds).
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app import loaders, models, schemas
+
+# model -> (read schema, loader options needed to render it)
+READ_SCHEMAS = {
+    models.Country:         (schemas.CountryRead, []),
+    models.Region:          (schemas.RegionRead, loaders.REGION_READ),
+    models.Subregion:       (schemas.SubregionRead, loaders.SUBREGION_READ),
+    models.Classification:  (schemas.ClassificationRead, []),
+    models.Varietal:        (schemas.VarietalRead, []),
+}
+
+
+class LookupCache:
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self.maxsize    = maxsize
+        self.ttl        = ttl
+        self.version    = 0
+        self.hits       = 0
+        self.misses     = 0
+        self._entries   = OrderedDict()     # (model, id) -> (expires_at, version, value)
+        self._lock      = threading.Lock()
+
+    def get(self, db: Session, model, id) -> Optional[BaseModel]:
+        """
+        Return the read schema for a lookup row, loading it on a miss.
+        Missing rows (and malformed ids) return None and are not cached.
+        """
+        try:
+            key = (model, uuid.UUID(str(id)))
+        except ValueError:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, version, value = entry
+                if expires_at > now and version == self.version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            version = self.version
+
+        schema, options = READ_SCHEMAS[model]
+        row = db.query(model).options(*options).get(key[1])
+        if row is None:
+            return None
+        value = schema.from_orm(row)
+
+        with self._lock:
+            # don't store a value read before an invalidation
+            if version == self.version:
+                self._entries[key] = (now + self.ttl, version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def exists(self, db: Session, model, id) -> bool:
+        return self.get(db, model, id) is not None
+
+    def invalidate(self):
+        """Drop every entry; called after any lookup table write."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+lookup_cache = LookupCache(
+    maxsize = int(os.getenv("LOOKUP_CACHE_SIZE", "4096")),
+    ttl     = float(os.getenv("LOOKUP_CACHE_TTL", "300")),
+)
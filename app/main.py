@@ -4,8 +4,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # import DB setup
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.database import engine, Base, get_db
+from app import db_pool, instrumentation, led, occupancy_stream
+from app.async_routes import asyncify
+from app.database import engine, async_engine, Base, get_db, DB_ASYNC
 
 # import lookup routers
 from app.routers.lookups import router as lookups_router
@@ -14,26 +17,49 @@ from app.routers.varietals import router as varietals_router
 from app.routers.wines import router as wines_router
 from app.routers.purchases import router as purchases_router
 from app.routers.critic_scores import router as critic_scores_router
+from app.routers.runtime import router as runtime_router
 from app.routers.metrics import router as metrics_router
+from app.routers.occupancy_stream import router as occupancy_stream_router
 from app.routers.cellar_slots import router as cellar_slots_router
 from app.routers.scan_events import router as scan_events_router
+from app.routers.export import router as export_router
 
 app = FastAPI()
 
+# per-request query counts and timings (app/instrumentation.py)
+@app.middleware("http")
+async def instrument_requests(request, call_next):
+    return await instrumentation.record_request(request, call_next)
+
 @app.on_event("startup")
 def on_startup():
     # Create the database tables if they do not exist
     Base.metadata.create_all(bind=engine)
 
+@app.on_event("startup")
+async def start_workers():
+    await led.dispatcher.start()
+    occupancy_stream.broker.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await led.dispatcher.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 app.include_router(lookups_router)
 app.include_router(classifications_router)
 app.include_router(varietals_router)
-app.include_router(wines_router)
+# With DB_ASYNC the hot routers run on the async engine
+app.include_router(asyncify(wines_router) if DB_ASYNC else wines_router)
 app.include_router(purchases_router)
 app.include_router(critic_scores_router)
+app.include_router(runtime_router)
 app.include_router(metrics_router)
-app.include_router(cellar_slots_router)
-app.include_router(scan_events_router)
+app.include_router(occupancy_stream_router)
+app.include_router(asyncify(cellar_slots_router) if DB_ASYNC else cellar_slots_router)
+app.include_router(asyncify(scan_events_router) if DB_ASYNC else scan_events_router)
+app.include_router(export_router)
 
 @app.get("/ping")
 def ping():
@@ -41,5 +67,11 @@ def ping():
 
 @app.get("/health/db")
 def health_check(db: Session = Depends(get_db)):
-    result = db.execute("SELECT 1").scalar()
-    return {"db_connected": result == 1}
\ No newline at end of file
+    result = db.execute(text("SELECT 1")).scalar()
+    health = {
+        "db_connected": result == 1,
+        "pool": db_pool.pool_status(engine),
+    }
+    if async_engine is not None:
+        health["async_pool"] = db_pool.pool_status(async_engine)
+    return health
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Batch recompute of WineMetrics for the whole cellar.
+
+Metrics for every wine come from the vectorized engine in app.scoring
+(one columnar fetch, one NumPy pass) and are upserted with one
+INSERT ... ON CONFLICT per chunk.
+
+Run with POST /metrics/recompute-all or `python -m app.cli recompute-metrics`.
+"""
+import math
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import scoring
+from app.models import WineMetrics
+
+UPSERT_COLUMNS = (
+    "avg_score", "review_count", "score_sum", "current_market",
+    "rarity_score", "qpr", "computed_at",
+)
+
+
+def _insert_for(db: Session):
+    """The dialect's INSERT construct that supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"recompute-all does not support the {dialect} dialect")
+    return insert
+
+
+def _decimal(value) -> Decimal:
+    """Round a float to a 2dp Decimal, mapping NaN to None."""
+    if value is None or math.isnan(value):
+        return None
+    return round(Decimal(float(value)), 2)
+
+
+def _stale_wine_ids(db: Session) -> set:
+    """Wines whose scores changed after their last batch recompute."""
+    return {
+        wine_id for wine_id, changed, computed in db.execute(
+            select(WineMetrics.wine_id, WineMetrics.scores_changed_at, WineMetrics.computed_at)
+        )
+        if computed is None or (changed is not None and changed > computed)
+    }
+
+
+def upsert_metrics(db: Session, rows: list):
+    """Write a chunk of metrics rows with a single INSERT ... ON CONFLICT."""
+    if not rows:
+        return
+    insert = _insert_for(db)
+    stmt = insert(WineMetrics.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["wine_id"],
+        set_={name: stmt.excluded[name] for name in UPSERT_COLUMNS},
+    )
+    db.execute(stmt)
+
+
+def recompute_all(db: Session, chunk_size: int = 1000, changed_only: bool = False) -> dict:
+    """
+    Recompute and upsert metrics for every wine (or, with changed_only,
+    every wine whose scores changed since its last batch recompute, plus
+    wines that were never computed). Cellar-relative scores always use
+    the whole cellar. Commits once at the end and returns a throughput report.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    scores = scoring.score_cellar(db)
+    positions = range(len(scores))
+    if changed_only:
+        stale = _stale_wine_ids(db)
+        known = {wine_id for (wine_id,) in db.execute(select(WineMetrics.wine_id))}
+        positions = [
+            i for i, wine_id in enumerate(scores.wine_ids)
+            if wine_id in stale or wine_id not in known
+        ]
+
+    chunks = 0
+    for start in range(0, len(positions), chunk_size):
+        upsert_metrics(db, [
+            {
+                "wine_id":          scores.wine_ids[i],
+                "avg_score":        _decimal(scores.avg_score[i]),
+                "review_count":     int(scores.review_count[i]),
+                "score_sum":        _decimal(scores.score_sum[i]),
+                "current_market":   _decimal(scores.current_market[i]),
+                "rarity_score":     _decimal(scores.rarity_score[i]),
+                "qpr":              _decimal(scores.qpr[i]),
+                "computed_at":      now,
+            }
+            for i in positions[start:start + chunk_size]
+        ])
+        chunks += 1
+    db.commit()
+
+    wines = len(positions)
+    elapsed = time.perf_counter() - started
+    return {
+        "wines": wines,
+        "chunks": chunks,
+        "changed_only": changed_only,
+        "elapsed_seconds": round(elapsed, 3),
+        "wines_per_second": round(wines / elapsed, 1) if elapsed else None,
+    }
@@ -3,6 +3,7 @@ from enum import Enum as PyEnum
 from datetime import datetime
 
 from sqlalchemy import (
+    DDL,
     Column,
     String,
     Integer,
@@ -13,7 +14,9 @@ from sqlalchemy import (
     UniqueConstraint,
     Date,
     Numeric,
-    DateTime
+    DateTime,
+    Index,
+    event,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -98,6 +101,8 @@ class Region(Base):
 
     __table_args__ = (
         UniqueConstraint('name', 'country_id', name='uix_region_name_country'),
+        # keyset order of GET /lookups/regions
+        Index('ix_regions_name_id', 'name', 'id'),
     )
 
 
@@ -127,6 +132,8 @@ class Subregion(Base):
 
     __table_args__ = (
         UniqueConstraint('name', 'region_id', name='uix_subregion_name_region'),
+        # keyset order of GET /lookups/subregions
+        Index('ix_subregions_name_id', 'name', 'id'),
     )
 # -------------------------------------------------------------
 
@@ -153,6 +160,8 @@ class Classification(Base):
         # Prevent exact duplicates for the same scope
         UniqueConstraint('name', 'country_id', 'region_id',
                          name='uix_classification_name_scope'),
+        # keyset order of GET /lookups/classifications
+        Index('ix_classifications_name_id', 'name', 'id'),
     )
 
 # --- Varietal and Blend models -----------------------------
@@ -192,6 +201,77 @@ wine_varietals = Table(
     )
 )
 
+# A wine's blend has no updated_at of its own: changing the blend (or
+# renaming one of its varietals) touches the wine instead, so the snapshot
+# watermark (app/snapshot.py) picks it up. Triggers, so that Core and raw
+# SQL writes count too; migration d2e6a9c4f170 adds them to existing databases.
+WINE_VARIETALS_TRIGGERS = {
+    "postgresql": (
+        """
+        CREATE OR REPLACE FUNCTION touch_blended_wine() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE wines SET updated_at = timezone('utc', now()) WHERE id = OLD.wine_id;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                UPDATE wines SET updated_at = timezone('utc', now()) WHERE id = NEW.wine_id;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER wine_varietals_touch_wine
+        AFTER INSERT OR UPDATE OR DELETE ON wine_varietals
+        FOR EACH ROW EXECUTE FUNCTION touch_blended_wine()
+        """,
+        """
+        CREATE OR REPLACE FUNCTION touch_varietal_wines() RETURNS trigger AS $$
+        BEGIN
+            UPDATE wines SET updated_at = timezone('utc', now())
+            WHERE id IN (SELECT wine_id FROM wine_varietals WHERE varietal_id = NEW.id);
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER varietals_touch_wines
+        AFTER UPDATE OF name ON varietals
+        FOR EACH ROW EXECUTE FUNCTION touch_varietal_wines()
+        """,
+    ),
+    # DDL() %-formats the statement, hence the doubled %%
+    "sqlite": (
+        """
+        CREATE TRIGGER wine_varietals_touch_wine_insert AFTER INSERT ON wine_varietals
+        BEGIN
+            UPDATE wines SET updated_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now') WHERE id = NEW.wine_id;
+        END
+        """,
+        """
+        CREATE TRIGGER wine_varietals_touch_wine_update AFTER UPDATE ON wine_varietals
+        BEGIN
+            UPDATE wines SET updated_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now') WHERE id IN (OLD.wine_id, NEW.wine_id);
+        END
+        """,
+        """
+        CREATE TRIGGER wine_varietals_touch_wine_delete AFTER DELETE ON wine_varietals
+        BEGIN
+            UPDATE wines SET updated_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now') WHERE id = OLD.wine_id;
+        END
+        """,
+        """
+        CREATE TRIGGER varietals_touch_wines AFTER UPDATE OF name ON varietals
+        BEGIN
+            UPDATE wines SET updated_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+            WHERE id IN (SELECT wine_id FROM wine_varietals WHERE varietal_id = NEW.id);
+        END
+        """,
+    ),
+}
+for dialect, statements in WINE_VARIETALS_TRIGGERS.items():
+    for statement in statements:
+        # wine_varietals is created after wines and varietals
+        event.listen(wine_varietals, "after_create", DDL(statement).execute_if(dialect=dialect))
+
 # --- Wine table format ---------------------------------
 class Wine(Base):
     __tablename__ = "wines"
@@ -214,6 +294,7 @@ class Wine(Base):
     bottle_size     = Column(SAEnum(BottleSize), nullable=False)
     closure_type    = Column(SAEnum(ClosureType), nullable=False)
     abv             = Column(DECIMAL(4,2), nullable=True)
+    updated_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)   # snapshot watermark
 
     # 5. Relationships
     country         = relationship('Country')
@@ -225,6 +306,8 @@ class Wine(Base):
     # 6. Uniqueness: no duplicate producer/label/vintage/size combos
     __table_args__ = (
         UniqueConstraint('producer', 'label', 'vintage', 'bottle_size', name='uix_wine_unique'),
+        # keyset order of GET /wines
+        Index('ix_wines_producer_label_vintage_id', 'producer', 'label', 'vintage', 'id'),
     )
 
 # ---- Purchase price and timing --------------------------
@@ -237,9 +320,16 @@ class Purchase(Base):
     price_amount    = Column(Numeric(10,2), nullable=False)
     price_currency  = Column(String(3), nullable=False)     # ISO currency code, e.g., "USD"
     receipt_url     = Column(String(500), nullable=True)    # link or photo URL
+    updated_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)   # snapshot watermark
 
     wine = relationship('Wine', backref='purchases')
 
+    __table_args__ = (
+        Index('ix_purchases_wine_id', 'wine_id'),
+        # keyset order of GET /purchases
+        Index('ix_purchases_purchase_date_id', 'purchase_date', 'id'),
+    )
+
 
 # --- Critic & Quality metrics ----------------------------
 class CriticScore(Base):
@@ -250,18 +340,25 @@ class CriticScore(Base):
     source      = Column(String(100), nullable=False)   # e.g., "WA", "Decanter"
     score       = Column(DECIMAL(5,2), nullable=False)  # e.g., 96.00
     review_date = Column(Date, nullable=True)
+    updated_at  = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)   # snapshot watermark
 
     wine = relationship('Wine', backref='critic_scores')
 
+    # wine_id filters (list_critic_scores, metrics recompute) in keyset order
+    __table_args__ = (Index('ix_critic_scores_wine_id_id', 'wine_id', 'id'),)
+
 class WineMetrics(Base):
     __tablename__ = 'wine_metrics'
 
     wine_id         = Column(UUID(as_uuid=True), ForeignKey('wines.id'), primary_key=True)
     avg_score       = Column(DECIMAL(5,2), nullable=True)
     review_count    = Column(Integer, nullable=False, default=0)
+    score_sum       = Column(Numeric(12,2), nullable=False, default=0)    # running total behind avg_score
     current_market  = Column(Numeric(10,2), nullable=True)
     rarity_score    = Column(DECIMAL(5,2), nullable=True)
     qpr             = Column(DECIMAL(5,2), nullable=True)
+    scores_changed_at = Column(DateTime, nullable=True)   # last critic score write for this wine
+    computed_at     = Column(DateTime, nullable=True)     # last batch recompute
 
     wine = relationship('Wine', backref='metrics', uselist=False)
 
@@ -292,7 +389,33 @@ class ScanEvent(Base):
     slot_id     = Column(UUID(as_uuid=True), ForeignKey('cellar_slots.id'), nullable=False)
     event_type  = Column(SAEnum(EventTypeEnum), nullable=False)
     timestamp   = Column(DateTime, default=datetime.utcnow, nullable=False)
+    idempotency_key = Column(String(100), nullable=True)    # set by batch uploads
+    updated_at  = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)   # snapshot watermark
 
     # Relationships for easy access
     wine = relationship('Wine', backref='scan_events')
-    slot = relationship('CellarSlot', backref='scan_events')
\ No newline at end of file
+    slot = relationship('CellarSlot', backref='scan_events')
+
+    __table_args__ = (
+        UniqueConstraint('idempotency_key', name='uix_scan_event_idempotency_key'),
+        # latest event of a slot (occupancy.replay_slot, rebuild)
+        Index('ix_scan_events_slot_id_timestamp', slot_id, timestamp.desc()),
+        # a wine's history, optionally of one event type (occupancy.has_history)
+        Index('ix_scan_events_wine_id_event_type_timestamp', wine_id, event_type, timestamp.desc()),
+        # keyset order of GET /scan-events and the occupancy stream replay
+        Index('ix_scan_events_timestamp_id', timestamp, id),
+    )
+
+
+class SlotOccupancy(Base):
+    """
+    Current-state projection of the scan_events log: one row per slot
+    holding whichever wine the latest event left in it (NULL when free).
+    Maintained by app.occupancy in the same transaction as each ScanEvent.
+    """
+    __tablename__ = 'slot_occupancy'
+
+    slot_id         = Column(UUID(as_uuid=True), ForeignKey('cellar_slots.id', ondelete='CASCADE'), primary_key=True)
+    wine_id         = Column(UUID(as_uuid=True), ForeignKey('wines.id'), nullable=True, index=True)
+    last_event_id   = Column(UUID(as_uuid=True), ForeignKey('scan_events.id', ondelete='SET NULL'), nullable=True)
+    last_event_at   = Column(DateTime, nullable=True)
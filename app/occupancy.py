@@ -0,0 +1,333 @@
+"""
+Slot occupancy projection.
+
+The scan_events table is an append-only log; replaying it to answer
+"what is in slot X right now?" gets slower as the log grows. Instead we
+keep models.SlotOccupancy up to date as events are written, so occupancy
+reads never touch scan_events.
+
+Callers add their ScanEvent, pass it to apply_event() and commit as usual,
+which keeps the log and the projection in the same transaction.
+
+Scanner traffic goes through claim() and release() instead: each is a
+single compare-and-set UPDATE on the slot's occupancy row, so of two
+scanners racing for one slot exactly one wins and the other gets
+SlotConflict, with no extra reads and no retry loop. On PostgreSQL the
+loser's UPDATE waits on the winner's row lock and then re-checks the
+condition against the committed row.
+
+Batch uploads (app.scan_ingest) walk their events through a SlotSequence
+instead, which holds the same row locks and rejects events that don't
+follow from the slot's state.
+
+Every change is also noted in session.info (CHANGES_KEY) so that, once
+the transaction commits, app.occupancy_stream can push it to subscribers.
+Recorded events are tallied there too (RECORDED_KEY) and only reach
+scan_events_total when the outermost transaction commits, so a
+rolled-back SlotConflict isn't counted.
+"""
+from typing import Optional, Set
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import CellarSlot, EventTypeEnum, ScanEvent, SlotOccupancy
+from app.telemetry import Counter, RateWindow
+
+scan_events_total   = Counter()             # events committed by this process
+scan_events_window  = RateWindow(60)        # ... over the last minute
+
+
+CHANGES_KEY     = "occupancy_changes"
+RECORDED_KEY    = "occupancy_recorded"      # events recorded in the open transaction
+
+
+class SlotConflict(Exception):
+    """The slot was not in the state the transition expected."""
+
+
+def _fold(occ: SlotOccupancy, event_id, wine_id, event_type, timestamp):
+    """Apply a single event to an occupancy row."""
+    occ.wine_id         = wine_id if event_type == EventTypeEnum.IN else None
+    occ.last_event_id   = event_id
+    occ.last_event_at   = timestamp
+
+
+def _changed(db: Session, slot_id, event_id, wine_id, event_type, timestamp):
+    """Note a change to the slot for the stream, published if the session commits."""
+    db.info.setdefault(CHANGES_KEY, []).append({
+        "event_id": str(event_id) if event_id else None,
+        "slot_id": str(slot_id),
+        "wine_id": str(wine_id) if wine_id else None,
+        "event_type": event_type.value,
+        "timestamp": timestamp.isoformat() if timestamp else None,
+    })
+
+
+def _event_changed(db: Session, event: ScanEvent):
+    _changed(db, event.slot_id, event.id, event.wine_id, event.event_type, event.timestamp)
+
+
+def _recorded(db: Session, count: int):
+    """Tally events for the metrics, counted if the session commits."""
+    db.info[RECORDED_KEY] = db.info.get(RECORDED_KEY, 0) + count
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _count_committed(session: Session):
+    count = session.info.pop(RECORDED_KEY, 0)
+    if count:
+        scan_events_total.inc(count)
+        scan_events_window.inc(count)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction):
+    # a SAVEPOINT rolling back leaves the outer transaction's events pending
+    if previous_transaction.parent is None:
+        session.info.pop(RECORDED_KEY, None)
+
+
+def _record(db: Session, event: ScanEvent):
+    # flush so the event's id and timestamp defaults are populated
+    db.add(event)
+    db.flush()
+    _recorded(db, 1)
+
+
+def _compare_and_set(db: Session, event: ScanEvent, expected_wine_id) -> bool:
+    """Point the slot at `event` if it currently holds `expected_wine_id` (None: empty)."""
+    Occ = SlotOccupancy
+    current = Occ.wine_id.is_(None) if expected_wine_id is None else Occ.wine_id == expected_wine_id
+    result = db.execute(
+        update(Occ)
+            .where(Occ.slot_id == event.slot_id, current)
+            .values(
+                wine_id = event.wine_id if event.event_type == EventTypeEnum.IN else None,
+                last_event_id = event.id,
+                last_event_at = event.timestamp,
+            )
+            .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _has_projection(db: Session, slot_id) -> bool:
+    return db.query(SlotOccupancy.slot_id).filter(SlotOccupancy.slot_id == slot_id).first() is not None
+
+
+def claim(db: Session, slot_id, wine_id) -> ScanEvent:
+    """
+    Record an IN event and mark the slot occupied, atomically.
+    Raises SlotConflict if the slot isn't free; the caller rolls back
+    (discarding the event) or commits.
+    """
+    event = ScanEvent(wine_id=wine_id, slot_id=slot_id, event_type=EventTypeEnum.IN)
+    _record(db, event)
+    if _compare_and_set(db, event, None):
+        _event_changed(db, event)
+        return event
+
+    # no projection row yet (slot predates it): create it already occupied
+    if _has_projection(db, slot_id):
+        raise SlotConflict(slot_id)
+    try:
+        with db.begin_nested():
+            db.add(SlotOccupancy(
+                slot_id=slot_id, wine_id=wine_id,
+                last_event_id=event.id, last_event_at=event.timestamp,
+            ))
+    except IntegrityError:
+        # another scanner created it first
+        raise SlotConflict(slot_id)
+    _event_changed(db, event)
+    return event
+
+
+def release(db: Session, slot_id, wine_id) -> ScanEvent:
+    """
+    Record an OUT event and free the slot, atomically. Raises SlotConflict
+    if the slot no longer holds this wine.
+    """
+    event = ScanEvent(wine_id=wine_id, slot_id=slot_id, event_type=EventTypeEnum.OUT)
+    _record(db, event)
+    if not _compare_and_set(db, event, wine_id):
+        raise SlotConflict(slot_id)
+    _event_changed(db, event)
+    return event
+
+
+def apply_event(db: Session, event: ScanEvent) -> SlotOccupancy:
+    """
+    Fold a new ScanEvent into its slot's occupancy row.
+    The caller is responsible for committing.
+    """
+    _record(db, event)
+
+    occ = db.query(SlotOccupancy).get(event.slot_id)
+    if occ is None:
+        occ = SlotOccupancy(slot_id=event.slot_id)
+        db.add(occ)
+    elif occ.last_event_at is not None and event.timestamp < occ.last_event_at:
+        # a back-dated event is part of the history but does not
+        # change what is in the slot now
+        return occ
+
+    _fold(occ, event.id, event.wine_id, event.event_type, event.timestamp)
+    _event_changed(db, event)
+    return occ
+
+
+class SlotSequence:
+    """
+    Walks a batch of already-validated events (dicts with the ScanEvent
+    columns) through their slots, in timestamp order. The slots' occupancy
+    rows are locked when it is created so live claims can't interleave.
+
+    check() says why an event can't come next for its slot (None if it
+    can): an IN needs the slot empty, an OUT needs it to hold that wine,
+    and nothing may be older than the slot's last event. accept() moves
+    the slot on; fold() writes each slot's last accepted event to the
+    projection. The caller is responsible for committing.
+    """
+    def __init__(self, db: Session, slot_ids: set):
+        self.rows = {
+            occ.slot_id: occ for occ in
+            db.query(SlotOccupancy)
+                .filter(SlotOccupancy.slot_id.in_(slot_ids))
+                .with_for_update()
+        } if slot_ids else {}
+        self.state = {slot_id: (occ.wine_id, occ.last_event_at) for slot_id, occ in self.rows.items()}
+        self.latest = {}        # slot_id -> last accepted event
+        self.accepted = 0
+
+    def check(self, event: dict) -> Optional[str]:
+        wine_id, last_event_at = self.state.get(event["slot_id"], (None, None))
+        if last_event_at is not None and event["timestamp"] < last_event_at:
+            return "Older than the slot's last event"
+        if event["event_type"] == EventTypeEnum.IN:
+            return None if wine_id is None else "Slot is occupied"
+        if wine_id is None:
+            return "Slot is empty"
+        return None if wine_id == event["wine_id"] else "Slot holds another wine"
+
+    def accept(self, event: dict):
+        wine_id = event["wine_id"] if event["event_type"] == EventTypeEnum.IN else None
+        self.state[event["slot_id"]] = (wine_id, event["timestamp"])
+        self.latest[event["slot_id"]] = event
+        self.accepted += 1
+
+    def fold(self, db: Session) -> int:
+        """Write each slot's last accepted event; returns the number of slots changed."""
+        for slot_id, event in self.latest.items():
+            occ = self.rows.get(slot_id)
+            if occ is None:
+                occ = SlotOccupancy(slot_id=slot_id)
+                db.add(occ)
+            _fold(occ, event["id"], event["wine_id"], event["event_type"], event["timestamp"])
+            _changed(db, slot_id, event["id"], event["wine_id"], event["event_type"], event["timestamp"])
+
+        db.flush()
+        _recorded(db, self.accepted)
+        return len(self.latest)
+
+
+def replay_slot(db: Session, slot_id) -> SlotOccupancy:
+    """
+    Recompute a single slot from its latest event. Used when an event
+    is edited or deleted. The caller is responsible for committing.
+    """
+    db.flush()
+    latest = (
+        db.query(ScanEvent)
+            .filter(ScanEvent.slot_id == slot_id)
+            .order_by(ScanEvent.timestamp.desc())
+            .first()
+    )
+
+    occ = db.query(SlotOccupancy).get(slot_id)
+    if occ is None:
+        occ = SlotOccupancy(slot_id=slot_id)
+        db.add(occ)
+
+    if latest is None:
+        _fold(occ, None, None, EventTypeEnum.OUT, None)
+        _changed(db, slot_id, None, None, EventTypeEnum.OUT, None)
+    else:
+        _fold(occ, latest.id, latest.wine_id, latest.event_type, latest.timestamp)
+        _event_changed(db, latest)
+    return occ
+
+
+def rebuild(db: Session) -> int:
+    """
+    Throw away the projection and replay the whole scan_events log.
+    Returns the number of slots written. The caller is responsible for committing.
+    """
+    db.query(SlotOccupancy).delete(synchronize_session=False)
+
+    # one row per slot, empty until an event says otherwise
+    rows = {
+        slot_id: SlotOccupancy(slot_id=slot_id)
+        for (slot_id,) in db.query(CellarSlot.id)
+    }
+
+    latest_ts = (
+        db.query(ScanEvent.slot_id, func.max(ScanEvent.timestamp).label("ts"))
+            .group_by(ScanEvent.slot_id)
+            .subquery()
+    )
+    latest = (
+        db.query(
+            ScanEvent.id,
+            ScanEvent.slot_id,
+            ScanEvent.wine_id,
+            ScanEvent.event_type,
+            ScanEvent.timestamp,
+        )
+        .join(
+            latest_ts,
+            (ScanEvent.slot_id == latest_ts.c.slot_id) &
+            (ScanEvent.timestamp == latest_ts.c.ts)
+        )
+    )
+    for ev in latest:
+        occ = rows.get(ev.slot_id)
+        if occ is None:
+            continue
+        _fold(occ, ev.id, ev.wine_id, ev.event_type, ev.timestamp)
+
+    db.add_all(rows.values())
+    db.flush()
+    # too many changes to stream one by one; subscribers start over
+    db.info[CHANGES_KEY] = [{"event_type": "reset"}]
+    return len(rows)
+
+
+# --- Reads ---------------------------------------------
+def occupied_slot_ids(db: Session) -> Set:
+    """Ids of every slot currently holding a bottle."""
+    return {
+        slot_id for (slot_id,) in
+        db.query(SlotOccupancy.slot_id).filter(SlotOccupancy.wine_id.isnot(None))
+    }
+
+
+def current_slot(db: Session, wine_id) -> Optional[SlotOccupancy]:
+    """The occupancy row of the slot this wine was most recently put into, if any."""
+    return (
+        db.query(SlotOccupancy)
+            .filter(SlotOccupancy.wine_id == wine_id)
+            .order_by(SlotOccupancy.last_event_at.desc())
+            .first()
+    )
+
+
+def has_history(db: Session, wine_id, event_type: Optional[EventTypeEnum] = None) -> bool:
+    """Whether any scan event (optionally of a given type) was ever logged for a wine."""
+    q = db.query(ScanEvent.id).filter(ScanEvent.wine_id == wine_id)
+    if event_type is not None:
+        q = q.filter(ScanEvent.event_type == event_type)
+    return q.first() is not None
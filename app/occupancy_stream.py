@@ -0,0 +1,210 @@
+"""
+Push stream of occupancy changes.
+
+app.occupancy notes every slot change in session.info; when the session
+commits, a Session "after_commit" hook hands them to the backend, which
+delivers them to the broker of every worker. The broker fans each change
+out to its subscribers (GET /cellar-slots/stream, server-sent events).
+
+  - Subscribers wait on their own asyncio.Queue, so a quiet cellar costs
+    nothing but a keepalive timer per connection.
+  - The last OCCUPANCY_STREAM_BUFFER changes are kept in a ring so a
+    client reconnecting with Last-Event-ID (a scan event id) resumes from
+    memory. Older ids are replayed from scan_events; ids that can't be
+    found get a "reset" event, telling the client to reload the full map.
+  - A subscriber that falls more than its queue behind is disconnected
+    and resumes from the ring when it reconnects.
+
+The default LocalBackend only reaches subscribers in the same process.
+Multi-worker deployments set OCCUPANCY_STREAM_BACKEND to a
+"package.module:Class" Backend that relays through shared infrastructure
+(Redis pub/sub, PostgreSQL LISTEN/NOTIFY, ...).
+"""
+import asyncio
+import importlib
+import itertools
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from sqlalchemy import event, literal, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import ScanEvent
+from app.occupancy import CHANGES_KEY
+
+logger = logging.getLogger("app.occupancy_stream")
+
+BUFFER_SIZE     = int(os.getenv("OCCUPANCY_STREAM_BUFFER", "10000"))
+QUEUE_SIZE      = int(os.getenv("OCCUPANCY_STREAM_QUEUE", "1000"))
+REPLAY_LIMIT    = int(os.getenv("OCCUPANCY_STREAM_REPLAY_LIMIT", "10000"))
+
+
+# --- Backends ---------------------------------------------
+class Backend:
+    """Carries committed changes from any worker to every worker's broker."""
+    def attach(self, deliver: Callable[[List[dict]], None]):
+        """Register the local broker; deliver() may be called from any thread."""
+        self.deliver = deliver
+
+    def publish(self, changes: List[dict]):
+        raise NotImplementedError
+
+
+class LocalBackend(Backend):
+    """Single process: hand changes straight to this process's broker."""
+    def publish(self, changes: List[dict]):
+        self.deliver(changes)
+
+
+def backend_from_env() -> Backend:
+    name = os.getenv("OCCUPANCY_STREAM_BACKEND", "local")
+    if name == "local":
+        return LocalBackend()
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+# --- Broker -----------------------------------------------
+class Subscription:
+    def __init__(self, queue: asyncio.Queue, high_water: int, backlog: Optional[list]):
+        self.queue      = queue
+        self.high_water = high_water    # changes up to this sequence are in the backlog
+        self.backlog    = backlog       # None: Last-Event-ID is not in the ring
+        self.overflowed = False
+
+
+class Broker:
+    def __init__(self, backend: Backend, buffer_size: int = BUFFER_SIZE, queue_size: int = QUEUE_SIZE):
+        self.backend        = backend
+        self.queue_size     = queue_size
+        self.buffer_size    = buffer_size
+        self._seq           = itertools.count(1)
+        self._last_seq      = 0
+        self._ring          = OrderedDict()     # seq -> change, oldest first
+        self._positions     = {}                # event_id -> latest seq carrying it
+        self._subscribers   = set()
+        self._lock          = threading.Lock()
+        self._loop          = None
+        backend.attach(self._receive)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    # --- publishing (any thread) ---
+    def publish(self, changes: List[dict]):
+        self.backend.publish(changes)
+
+    def _receive(self, changes: List[dict]):
+        batch = []
+        with self._lock:
+            for change in changes:
+                seq = next(self._seq)
+                self._last_seq = seq
+                self._ring[seq] = change
+                if change.get("event_id"):
+                    self._positions[change["event_id"]] = seq
+                batch.append((seq, change))
+            while len(self._ring) > self.buffer_size:
+                old_seq, old = self._ring.popitem(last=False)
+                if self._positions.get(old.get("event_id")) == old_seq:
+                    del self._positions[old["event_id"]]
+        if self._loop is not None and self._subscribers:
+            try:
+                self._loop.call_soon_threadsafe(self._fan_out, batch)
+            except RuntimeError:
+                pass    # loop closed during shutdown
+
+    def _fan_out(self, batch: list):
+        for sub in list(self._subscribers):
+            for item in batch:
+                try:
+                    sub.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    # too slow: the stream ends and the client resumes from the ring
+                    sub.overflowed = True
+                    self._subscribers.discard(sub)
+                    logger.info("disconnecting a subscriber %d changes behind", sub.queue.qsize())
+                    break
+
+    # --- subscribing (event loop) ---
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        if self._loop is None:
+            self.start()
+        with self._lock:
+            backlog = []
+            if last_event_id:
+                start = self._positions.get(last_event_id)
+                backlog = None if start is None else [
+                    (seq, change) for seq, change in self._ring.items() if seq > start
+                ]
+            sub = Subscription(asyncio.Queue(self.queue_size), self._last_seq, backlog)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "buffered": len(self._ring), "last_seq": self._last_seq}
+
+
+broker = Broker(backend_from_env())
+
+
+# --- Session hooks ------------------------------------------
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    changes = session.info.pop(CHANGES_KEY, None)
+    if changes:
+        broker.publish(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    # only the outermost transaction: a SAVEPOINT rolling back (begin_nested)
+    # doesn't undo the changes made before it
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGES_KEY, None)
+
+
+# --- Replay from the log ------------------------------------
+def replay_since(db: Session, event_id: str) -> Optional[List[dict]]:
+    """
+    Changes after the given scan event, from scan_events. None when the
+    event is unknown or the client is more than REPLAY_LIMIT events behind.
+    """
+    try:
+        anchor = db.query(ScanEvent).get(uuid.UUID(event_id))
+    except ValueError:
+        return None
+    if anchor is None:
+        return None
+
+    rows = (
+        db.query(ScanEvent)
+            .filter(
+                tuple_(ScanEvent.timestamp, ScanEvent.id) > tuple_(
+                    literal(anchor.timestamp, type_=ScanEvent.timestamp.type),
+                    literal(anchor.id, type_=ScanEvent.id.type),
+                )
+            )
+            .order_by(ScanEvent.timestamp, ScanEvent.id)
+            .limit(REPLAY_LIMIT + 1)
+            .all()
+    )
+    if len(rows) > REPLAY_LIMIT:
+        return None
+    return [
+        {
+            "event_id": str(ev.id),
+            "slot_id": str(ev.slot_id),
+            "wine_id": str(ev.wine_id),
+            "event_type": ev.event_type.value,
+            "timestamp": ev.timestamp.isoformat(),
+        }
+        for ev in rows
+    ]
@@ -0,0 +1,146 @@
+"""
+Prometheus text exposition (format 0.0.4) for GET /metrics.
+
+Everything published here is read from the in-process counters that are
+already recording (app/telemetry.py primitives), so a scrape costs one
+small slot-count query plus string formatting:
+
+  - request counts and latency histograms per router (instrumentation),
+  - connection pool occupancy and checkout timings (db_pool),
+  - lookup cache hits and misses (lookup_cache),
+  - occupied/free cellar slots and scan events per minute (occupancy),
+  - LED commands sent, dropped and failed (led).
+
+Counters are per worker process; Prometheus sums them across targets.
+"""
+from typing import List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import db_pool, instrumentation, led, occupancy, occupancy_stream
+from app.lookup_cache import lookup_cache
+from app.models import CellarSlot, SlotOccupancy
+from app.telemetry import Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if value is None:
+        return "NaN"
+    if value == "+Inf":
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help: str):
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels):
+        if labels:
+            rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            name = f"{name}{{{rendered}}}"
+        self.lines.append(f"{name} {_number(value)}")
+
+    def histogram(self, name: str, histogram: Histogram, **labels):
+        snap = histogram.snapshot()
+        for bound, count in snap["buckets"].items():
+            self.sample(f"{name}_bucket", count, le=bound, **labels)
+        self.sample(f"{name}_sum", snap["sum"], **labels)
+        self.sample(f"{name}_count", snap["count"], **labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _requests(out: Exposition):
+    out.family("cellar_http_requests_total", "counter", "HTTP requests by router and status code.")
+    for (router, status), counter in sorted(instrumentation.router_requests.items()):
+        out.sample("cellar_http_requests_total", counter.value(), router=router, status=status)
+
+    out.family("cellar_http_request_duration_seconds", "histogram", "HTTP request latency by router.")
+    for router, histogram in sorted(instrumentation.router_latency.items()):
+        out.histogram("cellar_http_request_duration_seconds", histogram, router=router)
+
+
+def _pools(out: Exposition, engines: dict):
+    statuses = {name: db_pool.pool_status(engine) for name, engine in engines.items()}
+    for key in ("size", "checked_in", "checked_out", "overflow", "saturation"):
+        out.family(f"cellar_db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}.")
+        for name, status in statuses.items():
+            # SQLite pools don't report sizing
+            if key in status:
+                out.sample(f"cellar_db_pool_{key}", status[key], engine=name)
+
+
+def _pool_timings(out: Exposition):
+    out.family("cellar_db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+    out.histogram("cellar_db_pool_checkout_wait_seconds", db_pool.checkout_wait)
+    out.family("cellar_db_pool_connection_held_seconds", "histogram", "Time a connection stays checked out.")
+    out.histogram("cellar_db_pool_connection_held_seconds", db_pool.connection_held)
+    out.family("cellar_db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out.")
+    out.sample("cellar_db_pool_checkout_timeouts_total", db_pool.checkout_timeouts.value())
+
+
+def _lookup_cache(out: Exposition):
+    stats = lookup_cache.stats()
+    out.family("cellar_lookup_cache_hits_total", "counter", "Lookup cache hits.")
+    out.sample("cellar_lookup_cache_hits_total", stats["hits"])
+    out.family("cellar_lookup_cache_misses_total", "counter", "Lookup cache misses.")
+    out.sample("cellar_lookup_cache_misses_total", stats["misses"])
+    out.family("cellar_lookup_cache_hit_ratio", "gauge", "Lookup cache hits over lookups.")
+    out.sample("cellar_lookup_cache_hit_ratio", stats["hit_rate"])
+    out.family("cellar_lookup_cache_entries", "gauge", "Entries held by the lookup cache.")
+    out.sample("cellar_lookup_cache_entries", stats["size"])
+
+
+def _cellar(out: Exposition, db: Session):
+    total = db.query(func.count(CellarSlot.id)).scalar()
+    occupied = (
+        db.query(func.count(SlotOccupancy.slot_id))
+            .filter(SlotOccupancy.wine_id.isnot(None))
+            .scalar()
+    )
+    out.family("cellar_slots", "gauge", "Cellar slots by state.")
+    out.sample("cellar_slots", occupied, state="occupied")
+    out.sample("cellar_slots", total - occupied, state="free")
+
+    out.family("cellar_scan_events_total", "counter", "Scan events recorded by this process.")
+    out.sample("cellar_scan_events_total", occupancy.scan_events_total.value())
+    out.family("cellar_scan_events_per_minute", "gauge", "Scan events recorded over the last minute.")
+    out.sample("cellar_scan_events_per_minute", occupancy.scan_events_window.count())
+    out.family("cellar_occupancy_stream_subscribers", "gauge", "Open occupancy stream connections.")
+    out.sample("cellar_occupancy_stream_subscribers", occupancy_stream.broker.stats()["subscribers"])
+
+
+def _led(out: Exposition):
+    stats = led.dispatcher.stats()
+    out.family("cellar_led_commands_total", "counter", "LED commands by outcome.")
+    out.sample("cellar_led_commands_total", stats["sent"], outcome="sent")
+    out.sample("cellar_led_commands_total", stats["dropped"], outcome="dropped")
+    out.family("cellar_led_delivery_failures_total", "counter", "Failed LED node deliveries, retries included.")
+    out.sample("cellar_led_delivery_failures_total", stats["failures"])
+    out.family("cellar_led_queue_depth", "gauge", "LED commands waiting for the dispatcher.")
+    out.sample("cellar_led_queue_depth", stats["queued"])
+
+
+def render(db: Session, engines: dict) -> str:
+    """Render every metric; `engines` maps a label ("sync", "async") to an engine."""
+    out = Exposition()
+    _requests(out)
+    _pools(out, engines)
+    _pool_timings(out)
+    _lookup_cache(out)
+    _cellar(out, db)
+    _led(out)
+    return out.render()
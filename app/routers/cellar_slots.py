@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import UUID4
 
-from app import models, schemas
+from app import color_maps, fast_json, led, models, occupancy, schemas
 from app.database import get_db
+from app.pagination import paginate
 from app.schemas import SlotColor
-from app.models import ScanEvent, EventTypeEnum
+from app.models import EventTypeEnum
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/cellar-slots", tags=["cellar-slots"],)
+router = APIRouter(prefix="/cellar-slots", tags=["cellar-slots"], route_class=TimedRoute)
+
+# keyset order for paging through slots, in physical rack/row order
+SLOT_SORT = (models.CellarSlot.rack, models.CellarSlot.row, models.CellarSlot.id)
 
 # --- Create a slot -------------------------------------
 @router.post(
@@ -32,6 +36,8 @@ def create_slot(
     
     new = models.CellarSlot(**data.dict())
     db.add(new)
+    db.flush()
+    db.add(models.SlotOccupancy(slot_id=new.id))
     db.commit()
     db.refresh(new)
     return new
@@ -42,14 +48,14 @@ def create_slot(
     response_model = List[schemas.CellarSlotRead]
 )
 def list_slots(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.CellarSlot)\
-                .offset(skip)\
-                .limit(limit)\
-                .all()
+    rows = paginate(db.query(models.CellarSlot), SLOT_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.CellarSlotRead, rows, response)
 
 
 # --- Get slot by ID ------------------------------------
@@ -109,55 +115,57 @@ def delete_slot(
 
 
 # --- Search for bottles in the cellar ----------------
+# The color-map endpoints answer in one of three formats (?format=full|ids|rle,
+# see app/color_maps.py) and send an ETag so polling controllers get 304s.
+COLOR_MAP_RESPONSES = Union[List[SlotColor], schemas.SlotColorMap]
+
 @router.post(
     "/search-bottle",
-    response_model = List[SlotColor]
+    response_model = COLOR_MAP_RESPONSES
 )
 def search_bottle(
     wine_id: UUID4,
+    response: Response,
+    format: schemas.ColorMapFormat = schemas.ColorMapFormat.FULL,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    # 1. Find the current slot for this bottle by taking its latest
-    #    event (IN or OUT)
-    latest = (
-        db.query(ScanEvent)
-            .filter(ScanEvent.wine_id == wine_id)
-            .order_by(ScanEvent.timestamp.desc())
-            .first()
-    )
+    # 1. Find the slot currently holding this bottle
+    current = occupancy.current_slot(db, wine_id)
 
-    # 2. If there were *no* events at all, that's an error
-    if latest is None:
-        raise HTTPException(status_code=404, detail="Wine has never been slotted in or out")
-    
-    # 3. If the last event was an OUT, return inventory error
-    if latest.event_type == EventTypeEnum.OUT:
+    if current is None:
+        # 2. If there were *no* events at all, that's an error
+        if not occupancy.has_history(db, wine_id):
+            raise HTTPException(status_code=404, detail="Wine has never been slotted in or out")
+
+        # 3. Otherwise it has been taken out, return inventory error
         raise HTTPException(status_code=400, detail="Wine is currently out of the cellar")
-    else:
-        highlight_id = latest.slot_id
 
-    # 4. Build the color map
-    slots = db.query(models.CellarSlot).all()
-    return [
-        schemas.SlotColor(
-            slot_id = slot.id,
-            color = "green" if slot.id == highlight_id else "red"
-        )
-        for slot in slots
-    ]    
+    highlight_id = current.slot_id
+
+    # 4. Build the color map over the slot ids only
+    rows = (
+        (slot_id, slot_id == highlight_id)
+        for (slot_id,) in db.query(models.CellarSlot.id).order_by(*SLOT_SORT)
+    )
+    color_map = color_maps.ColorMap.from_rows(rows, color="green", default="red")
+    return color_maps.respond(color_map, format, response, if_none_match)
 
 @router.post(
     "/search-lookup",
-    response_model = List[SlotColor]
+    response_model = COLOR_MAP_RESPONSES
 )
 def search_lookup(
+    response: Response,
     country_id: Optional[UUID4] = None,
     region_id: Optional[UUID4] = None,
     subregion_id: Optional[UUID4] = None,
     varietal_id: Optional[UUID4] = None,
+    format: schemas.ColorMapFormat = schemas.ColorMapFormat.FULL,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    # 1. Find all wines matchimg any of the given filters
+    # 1. Wines matching all of the given filters, as a subquery
     q = db.query(models.Wine.id)
     if country_id:
         q = q.filter(models.Wine.country_id == country_id)
@@ -166,57 +174,51 @@ def search_lookup(
     if subregion_id:
         q = q.filter(models.Wine.subregion_id == subregion_id)
     if varietal_id:
-        q = q.join(models.Wine.varietals).filter(models.wine_varietals.c.varietal_id == varietal_id)
-
-    wine_ids = [w[0] for w in q.all()]
+        # filter on the link table itself: joining the relationship aliases it,
+        # and a filter on the plain table would cross join every blend row
+        link = models.wine_varietals.c
+        q = q.join(models.wine_varietals, link.wine_id == models.Wine.id).filter(link.varietal_id == varietal_id)
+    matching = q.subquery()
 
-    # 2. For each of those wines, find its current slot via latest IN event
-    in_events = (
-        db.query(ScanEvent.wine_id, ScanEvent.slot_id, func.max(ScanEvent.timestamp).label("ts"))
-            .filter(ScanEvent.wine_id.in_(wine_ids), ScanEvent.event_type == EventTypeEnum.IN)
-            .group_by(ScanEvent.wine_id, ScanEvent.slot_id)
+    # 2. One pass over the slots: a slot is green when the wine the occupancy
+    #    projection says it holds right now is one of the matches
+    rows = (
+        db.query(models.CellarSlot.id, matching.c.id)
+            .outerjoin(models.SlotOccupancy, models.SlotOccupancy.slot_id == models.CellarSlot.id)
+            .outerjoin(matching, matching.c.id == models.SlotOccupancy.wine_id)
+            .order_by(*SLOT_SORT)
     )
-    matched_slots = {row.slot_id for row in in_events}
-
-    slots = db.query(models.CellarSlot).all()
-    return [
-        SlotColor(
-            slot_id = slot.id,
-            color = "green" if slot.id in matched_slots else "red"
-        )
-        for slot in slots
-    ]
+    color_map = color_maps.ColorMap.from_rows(
+        ((slot_id, matched_wine is not None) for slot_id, matched_wine in rows),
+        color="green", default="red",
+    )
+    return color_maps.respond(color_map, format, response, if_none_match)
 
 
 # --- Scan a bottle in and slot it accordingly -----------------------------
 @router.post(
     "/scan-in",
-    response_model = List[SlotColor]
+    response_model = COLOR_MAP_RESPONSES
 )
 def scan_in_suggestions(
     wine_id: UUID4,
+    response: Response,
+    format: schemas.ColorMapFormat = schemas.ColorMapFormat.FULL,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    # 1. Compute occupied slots: latest even per slot - if it's IN, it's filled
-    subq = (
-        db.query(ScanEvent.slot_id, func.max(ScanEvent.timestamp).label("ts"))
-        .group_by(ScanEvent.slot_id)
-        .subquery()
+    # Free slots are those the occupancy projection doesn't hold a wine for;
+    # they light up blue and occupied slots are left alone
+    rows = (
+        db.query(models.CellarSlot.id, models.SlotOccupancy.wine_id)
+            .outerjoin(models.SlotOccupancy, models.SlotOccupancy.slot_id == models.CellarSlot.id)
+            .order_by(*SLOT_SORT)
     )
-    latest = db.query(ScanEvent).join(
-        subq,
-        (ScanEvent.slot_id == subq.c.slot_id) &
-        (ScanEvent.timestamp == subq.c.ts)
+    color_map = color_maps.ColorMap.from_rows(
+        ((slot_id, held is None) for slot_id, held in rows),
+        color="blue", default=None,
     )
-    occupied = {e.slot_id for e in latest if e.event_type == EventTypeEnum.IN}
-
-    # 2. Free slots are those not occupied
-    free_slots = db.query(models.CellarSlot).filter(~models.CellarSlot.id.in_(occupied)).all()
-
-    return [
-        SlotColor(slot_id = slot.id, color = "blue")
-        for slot in free_slots
-    ]
+    return color_maps.respond(color_map, format, response, if_none_match)
 
 @router.post(
     "/slot-in",
@@ -234,31 +236,22 @@ def slot_in_wine(
         raise HTTPException(status_code=404, detail="Wine not found")
     slot = db.query(models.CellarSlot).get(slot_id)
 
-    # 2. Valide slot exists and is free
+    # 2. Valide slot exists
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
     
-    last = (
-        db.query(ScanEvent)
-            .filter(ScanEvent.slot_id == slot_id)
-            .order_by(ScanEvent.timestamp.desc())
-            .first()
-    )
-    if last and last.event_type == EventTypeEnum.IN:
-        raise HTTPException(status_code=400, detail="Slot is occupied")
-    
-    # 3. Create IN event
-    ev = models.ScanEvent(
-        wine_id=wine_id, 
-        slot_id=slot_id,
-        event_type = EventTypeEnum.IN
-    )
-    db.add(ev)
+    # 3. Create the IN event and claim the slot in one transaction; if another
+    #    scanner got there first the claim fails and the event is rolled back
+    try:
+        ev = occupancy.claim(db, slot_id, wine_id)
+    except occupancy.SlotConflict:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Slot is occupied")
     db.commit()
     db.refresh(ev)
 
-    # 4. Stub LED: for now, just log
-    print(f"[LED STUB] slot {slot_id} -> blue")
+    # 4. Light the slot; delivery happens in the background (app/led.py)
+    led.dispatcher.submit(slot.led_node_id, slot_id, "blue")
 
     return ev
 
@@ -279,42 +272,25 @@ def slot_out_wine(
         raise HTTPException(status_code=404, detail="Wine not found")
     
     # 2. Find the slot it's currently in
-    last_in = (
-        db.query(ScanEvent)
-            .filter(
-                ScanEvent.wine_id == wine_id,
-                ScanEvent.event_type == EventTypeEnum.IN
-            )
-            .order_by(ScanEvent.timestamp.desc())
-            .first()
-    )
-    if not last_in:
-        raise HTTPException(status_code=400, detail="Wine is not in any slot")
-    
-    # 3. Ensure it hasn't already been taken out
-    last_out = (
-        db.query(ScanEvent)
-            .filter(
-                ScanEvent.wine_id == wine_id,
-                ScanEvent.event_type == EventTypeEnum.OUT
-            )
-            .order_by(ScanEvent.timestamp.desc())
-            .first()
-    )
-    if last_out and last_out.timestamp > last_in.timestamp:
+    current = occupancy.current_slot(db, wine_id)
+    if current is None:
+        # 3. Tell apart never slotted in from already taken out
+        if not occupancy.has_history(db, wine_id, EventTypeEnum.IN):
+            raise HTTPException(status_code=400, detail="Wine is not in any slot")
         raise HTTPException(status_code=400, detail="Wine is already out")
+    slot_id = current.slot_id
     
-    # 4. Create OUT event
-    ev = models.ScanEvent(
-        wine_id = wine_id,
-        slot_id = last_in.slot_id,
-        event_type = EventTypeEnum.OUT
-    )
-    db.add(ev)
+    # 4. Create the OUT event and free the slot, unless a concurrent
+    #    slot-out already took the bottle
+    try:
+        ev = occupancy.release(db, slot_id, wine_id)
+    except occupancy.SlotConflict:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Wine is already out")
     db.commit()
     db.refresh(ev)
 
-    # 5. Stub LED: mark that slot red (just a console log)
-    print(f"[LED STUB] slot {last_in.slot_id} -> red")
+    # 5. Mark that slot red; delivery happens in the background (app/led.py)
+    led.dispatcher.submit(ev.slot.led_node_id, slot_id, "red")
 
     return ev
\ No newline at end of file
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app import schemas, models
+from app import schemas, models, fast_json
 from app.database import get_db
+from app.lookup_cache import lookup_cache
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/lookups", tags=["Lookups"])
+router = APIRouter(prefix="/lookups", tags=["Lookups"], route_class=TimedRoute)
+
+# keyset order for paging through classifications
+CLASSIFICATION_SORT = (models.Classification.name, models.Classification.id)
 
 @router.post(
     "/classifications",
@@ -17,9 +23,9 @@ def create_classification(
     db: Session = Depends(get_db)
 ):
     # optionally, verify if parent scope exists
-    if data.country_id and not db.query(models.Country).get(data.country_id):
+    if data.country_id and not lookup_cache.exists(db, models.Country, data.country_id):
         raise HTTPException(status_code=400, detail= "Country does not exist")
-    if data.region_id and not db.query(models.Region).get(data.region_id):
+    if data.region_id and not lookup_cache.exists(db, models.Region, data.region_id):
         raise HTTPException(status_code=400, detail= "Region does not exist")
     
     new = models.Classification(
@@ -29,6 +35,7 @@ def create_classification(
     )
     db.add(new)
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(new)
     return new
 
@@ -37,8 +44,10 @@ def create_classification(
     response_model=List[schemas.ClassificationRead]
 )
 def list_classifications(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     country_id: Optional[str] = None,
     region_id: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -48,7 +57,8 @@ def list_classifications(
         q = q.filter(models.Classification.country_id == country_id)
     if region_id:
         q = q.filter(models.Classification.region_id == region_id)
-    return q.offset(skip).limit(limit).all()
+    rows = paginate(q, CLASSIFICATION_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.ClassificationRead, rows, response)
 
 @router.get(
     "/classifications/{id}",
@@ -58,7 +68,7 @@ def get_classification(
     id: str,
     db: Session = Depends(get_db)
 ):
-    cls = db.query(models.Classification).get(id)
+    cls = lookup_cache.get(db, models.Classification, id)
     if not cls:
         raise HTTPException(status_code=404, detail= "Classification not found")
     return cls
@@ -81,6 +91,7 @@ def update_classification(
     cls.country_id = data.country_id
     cls.region_id = data.region_id
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(cls)
     return cls
 
@@ -97,4 +108,5 @@ def delete_classification(
         raise HTTPException(status_code=404, detail= "Classification not found")
     
     db.delete(cls)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    lookup_cache.invalidate()
\ No newline at end of file
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import UUID4
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app import models, schemas
+from app import fast_json, models, schemas, wine_metrics
 from app.database import get_db
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/critic-scores", tags=["critic-scores"],)
+router = APIRouter(prefix="/critic-scores", tags=["critic-scores"], route_class=TimedRoute)
+
+# keyset order for paging through critic scores, grouped by wine
+CRITIC_SCORE_SORT = (models.CriticScore.wine_id, models.CriticScore.id)
 
 # --- Create a critic score ---------------------------
 @router.post(
@@ -22,6 +28,7 @@ def create_critic_score(
     new = models.CriticScore(**data.dict())
     
     db.add(new)
+    wine_metrics.apply_score_change(db, new.wine_id, added=new.score)
     db.commit()
     db.refresh(new)
     return new
@@ -32,17 +39,18 @@ def create_critic_score(
     response_model = List[schemas.CriticScoreRead]
 )
 def list_critic_scores(
-    wine_id: Optional[str] = None,
+    response: Response,
+    wine_id: Optional[UUID4] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     q = db.query(models.CriticScore)
     if wine_id:
         q = q.filter(models.CriticScore.wine_id == wine_id)
-    return q.offset(skip)\
-            .limit(limit)\
-            .all()
+    rows = paginate(q, CRITIC_SCORE_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.CriticScoreRead, rows, response)
 
 
 # --- Get a single critic score by id ------------
@@ -51,7 +59,7 @@ def list_critic_scores(
     response_model = schemas.CriticScoreRead
 )
 def get_critic_score(
-    critic_score_id: str,
+    critic_score_id: UUID4,
     db: Session = Depends(get_db)
 ):
     """
@@ -68,7 +76,7 @@ def get_critic_score(
     response_model = schemas.CriticScoreRead
 )
 def update_critic_score(
-    critic_score_id: str,
+    critic_score_id: UUID4,
     data: schemas.CriticScoreCreate,
     db: Session = Depends(get_db)
 ):
@@ -79,11 +87,20 @@ def update_critic_score(
     if not critic_score:
         raise HTTPException(status_code=404, detail= "Critic score not found")
     
+    old_wine_id, old_score = critic_score.wine_id, critic_score.score
+
     # Apply updates
     critic_score.wine_id       = data.wine_id
     critic_score.source        = data.source
     critic_score.score         = data.score
     critic_score.review_date   = data.review_date
+
+    # Keep the running metrics totals in step
+    if old_wine_id == data.wine_id:
+        wine_metrics.apply_score_change(db, data.wine_id, added=data.score, removed=old_score)
+    else:
+        wine_metrics.apply_score_change(db, old_wine_id, removed=old_score)
+        wine_metrics.apply_score_change(db, data.wine_id, added=data.score)
     
     db.commit()
     db.refresh(critic_score)
@@ -95,7 +112,7 @@ def update_critic_score(
     status_code = status.HTTP_204_NO_CONTENT
 )
 def critic_score_delete(
-    critic_score_id: str,
+    critic_score_id: UUID4,
     db: Session = Depends(get_db)
 ):
     """
@@ -105,5 +122,6 @@ def critic_score_delete(
     if not critic_score:
         raise HTTPException(status_code=404, detail= "Critic score not found")
     db.delete(critic_score)
+    wine_metrics.apply_score_change(db, critic_score.wine_id, removed=critic_score.score)
     db.commit()
     return None
\ No newline at end of file
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app import export
+from app.instrumentation import TimedRoute
+from app.schemas import ExportFormat, ExportTable
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=TimedRoute)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (and doesn't give it q=0)."""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip().lower()
+            try:
+                return not (q.startswith("q=") and float(q[2:]) == 0)
+            except ValueError:
+                return False
+    return False
+
+
+@router.get("/{table}", response_class=StreamingResponse)
+def export_table(
+    table: ExportTable,
+    format: ExportFormat = ExportFormat.NDJSON,
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Stream a whole table as NDJSON or CSV, lookups inlined as names.
+    Memory stays constant however large the table; send
+    Accept-Encoding: gzip to have it compressed on the fly.
+    """
+    gzip = accepts_gzip(accept_encoding)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{table.value}.{format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.stream(table.value, format.value, gzip),
+        media_type = export.MEDIA_TYPES[format.value],
+        headers = headers,
+    )
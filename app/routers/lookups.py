@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app import schemas, models
+from app import loaders, schemas, models, fast_json
 from app.database import get_db
+from app.lookup_cache import lookup_cache
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/lookups", tags=["Lookups"])
+router = APIRouter(prefix="/lookups", tags=["Lookups"], route_class=TimedRoute)
+
+# keyset orders for paging through each lookup table
+COUNTRY_SORT    = (models.Country.name, models.Country.id)
+REGION_SORT     = (models.Region.name, models.Region.id)
+SUBREGION_SORT  = (models.Subregion.name, models.Subregion.id)
 
 # --- Country Endpoints ----------------------------
 @router.post(
@@ -26,6 +34,7 @@ def create_country(
     new = models.Country(name=country.name)
     db.add(new)
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(new)
     return new
 
@@ -34,14 +43,14 @@ def create_country(
     response_model=List[schemas.CountryRead]
 )
 def list_countries(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Country)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
+    rows = paginate(db.query(models.Country), COUNTRY_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.CountryRead, rows, response)
 
 @router.get(
     "/countries/{country_id}",
@@ -51,7 +60,7 @@ def get_country(
     country_id: str,
     db: Session = Depends(get_db)
 ):
-    country = db.query(models.Country).get(country_id)
+    country = lookup_cache.get(db, models.Country, country_id)
     if not country:
         raise HTTPException(status_code=404, detail= "Country not found")
     return country
@@ -70,6 +79,7 @@ def update_country(
         raise HTTPException(status_code=404, detail= "Country not found")
     country.name = country_in.name
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(country)
     return country
 
@@ -86,6 +96,7 @@ def delete_country(
         raise HTTPException(status_code=404, detail= "Country not found")
     db.delete(country)
     db.commit()
+    lookup_cache.invalidate()
 
 
 # --- Region Endpoints ----------------------------
@@ -99,8 +110,7 @@ def create_region(
     db: Session = Depends(get_db)
 ):
     # 1. Ensure the parent country exists
-    country = db.query(models.Country).get(region.country_id)
-    if not country:
+    if not lookup_cache.exists(db, models.Country, region.country_id):
         raise HTTPException(status_code=404, detail= "Country does not exist")
     
     # 2. Prevent duplicate region names within the same country
@@ -120,6 +130,7 @@ def create_region(
     )
     db.add(new)
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(new)
     return new
 
@@ -128,14 +139,15 @@ def create_region(
     response_model=List[schemas.RegionRead]
 )
 def list_regions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Region)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
+    q = db.query(models.Region).options(*loaders.REGION_READ)
+    rows = paginate(q, REGION_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.RegionRead, rows, response)
 
 @router.get(
     "/regions/{region_id}",
@@ -145,7 +157,7 @@ def get_region(
     region_id: str,
     db: Session = Depends(get_db)
 ):
-    region = db.query(models.Region).get(region_id)
+    region = lookup_cache.get(db, models.Region, region_id)
     if not region:
         raise HTTPException(status_code=404, detail= "Region not found")
     return region
@@ -164,12 +176,13 @@ def update_region(
         raise HTTPException(status_code=404, detail= "Region not found")
     
     # Ensure the parent country exists
-    if not db.query(models.Country).get(region_in.country_id):
+    if not lookup_cache.exists(db, models.Country, region_in.country_id):
         raise HTTPException(status_code=404, detail= "Country does not exist")
     
     region.name = region_in.name
     region.country_id = region_in.country_id
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(region)
     return region
 
@@ -186,6 +199,7 @@ def delete_region(
         raise HTTPException(status_code=404, detail= "Region not found")
     db.delete(region)
     db.commit()
+    lookup_cache.invalidate()
 
 # --- Subregion Endpoints ---------------------------
 @router.post(
@@ -198,8 +212,7 @@ def create_subregion(
     db: Session = Depends(get_db)
 ):
     # 1. Ensure the parent region exists
-    region = db.query(models.Region).get(subregion.region_id)
-    if not region:
+    if not lookup_cache.exists(db, models.Region, subregion.region_id):
         raise HTTPException(status_code=404, detail= "Region does not exist")
     
     # 2. Prevent duplicate subregion names within the same region
@@ -220,6 +233,7 @@ def create_subregion(
     )
     db.add(new)
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(new)
     return new
 
@@ -228,14 +242,15 @@ def create_subregion(
     response_model=List[schemas.SubregionRead]
 )
 def list_subregions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Subregion)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
+    q = db.query(models.Subregion).options(*loaders.SUBREGION_READ)
+    rows = paginate(q, SUBREGION_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.SubregionRead, rows, response)
 
 @router.get(
     "/subregions/{subregion_id}",
@@ -245,7 +260,7 @@ def get_subregion(
     subregion_id: str,
     db: Session = Depends(get_db)
 ):
-    subregion = db.query(models.Subregion).get(subregion_id)
+    subregion = lookup_cache.get(db, models.Subregion, subregion_id)
     if not subregion:
         raise HTTPException(status_code=404, detail= "Subregion not found")
     return subregion
@@ -264,12 +279,13 @@ def update_subregion(
         raise HTTPException(status_code=404, detail= "Subregion not found")
     
     # Ensure the parent region exists
-    if not db.query(models.Region).get(subregion_in.region_id):
+    if not lookup_cache.exists(db, models.Region, subregion_in.region_id):
         raise HTTPException(status_code=404, detail= "Region does not exist")
     
     subregion.name = subregion_in.name
     subregion.region_id = subregion_in.region_id
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(subregion)
     return subregion
 
@@ -285,4 +301,13 @@ def delete_subregion(
     if not subregion:
         raise HTTPException(status_code=404, detail= "Subregion not found")
     db.delete(subregion)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    lookup_cache.invalidate()
+
+# --- Lookup cache stats ---------------------------
+@router.get("/cache")
+def lookup_cache_stats():
+    """
+    Hit/miss counters and size of the in-process lookup cache
+    """
+    return lookup_cache.stats()
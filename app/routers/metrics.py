@@ -1,17 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import UUID4
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import metrics_job, models, schemas, wine_metrics
 from app.database import get_db
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/metrics", tags=["metrics"])
+router = APIRouter(prefix="/metrics", tags=["metrics"], route_class=TimedRoute)
+
+# --- Recompute metrics for every wine --------------------------
+@router.post(
+    "/recompute-all",
+    response_model = schemas.MetricsRecomputeReport,
+    status_code = status.HTTP_200_OK
+)
+def recompute_all_metrics(
+    changed_only: bool = False,
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Recompute avg_score, review_count, current_market, rarity_score and qpr
+    for the whole cellar in one grouped pass. With changed_only, only wines
+    whose critic scores changed since their last batch recompute are written.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    return metrics_job.recompute_all(db, chunk_size=chunk_size, changed_only=changed_only)
 
 @router.get(
     "/{wine_id}",
     response_model = schemas.WineMetricsRead
 )
 def get_metrics(
-    wine_id: str,
+    wine_id: UUID4,
     db: Session = Depends(get_db)
 ):
     """
@@ -29,36 +51,28 @@ def get_metrics(
     status_code = status.HTTP_200_OK
 )
 def recompute_metrics(
-    wine_id: str,
+    wine_id: UUID4,
     db: Session = Depends(get_db)
 ):
     """
-    Recalculate and upsert the WineMetrics fora. given wine:
-        - avg_score & review_count from CriticScore
-        - (placeholders for current_market, rarity_score, qpr)
+    Recalculate and upsert the WineMetrics for a given wine:
+        - avg_score & review_count from CriticScore, via SQL AVG/COUNT
+
+    Scores are already folded in incrementally as they are written; this
+    is the full rebuild for repairing a wine's totals.
     """
     # 1. Ensure the wine exists
     wine = db.query(models.Wine).get(wine_id)
     if not wine:
         raise HTTPException(status_code=404, detail="Wine not found")
     
-    # 2. Gather all critic scores
-    scores = db.query(models.CriticScore).filter(models.CriticScore.wine_id == wine_id).all()
-    if not scores:
+    # 2. Re-aggregate the critic scores in SQL and upsert the WineMetrics row
+    metrics = wine_metrics.rebuild(db, wine.id)
+    if not metrics.review_count:
+        db.rollback()
         raise HTTPException(status_code=404, detail="No critic scores to compute")
-    
-    count = len(scores)
-    avg = sum([float(s.score) for s in scores]) / count    
-
-    # 3. Upsert the WineMetrics row
-    metrics = db.query(models.WineMetrics).get(wine_id)
-    if not metrics:
-        metrics = models.WineMetrics(wine_id=wine_id)
-        db.add(metrics)
-
-    metrics.avg_score    = round(avg,2)
-    metrics.review_count = count
-    # leave current_market, rarity_score, qpr as-is or null for now
+    # current_market, rarity_score and qpr are relative to the whole cellar;
+    # /metrics/recompute-all computes them for every wine in one pass
 
     db.commit()
     db.refresh(metrics)
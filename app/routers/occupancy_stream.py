@@ -0,0 +1,80 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app import occupancy_stream
+from app.database import SessionLocal
+from app.instrumentation import TimedRoute
+
+KEEPALIVE_SECONDS = 15
+
+# Mounted ahead of the cellar-slots router so /cellar-slots/stream isn't read as a slot id
+router = APIRouter(prefix="/cellar-slots", tags=["cellar-slots"], route_class=TimedRoute)
+
+
+def _sse(change: dict) -> str:
+    kind = "reset" if change["event_type"] == "reset" else "occupancy"
+    lines = [f"id: {change['event_id']}"] if change.get("event_id") else []
+    lines += [f"event: {kind}", f"data: {json.dumps(change)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def _replay(last_event_id: str):
+    db = SessionLocal()
+    try:
+        return occupancy_stream.replay_since(db, last_event_id)
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_occupancy(
+    request: Request,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-sent events, one per slot change (event: occupancy) with the
+    slot, wine, in/out and timestamp. Reconnect with Last-Event-ID to
+    resume; event: reset means the client should reload the full map.
+    """
+    async def events():
+        sub = occupancy_stream.broker.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+
+            # 1. Catch up: from the in-memory ring, else from scan_events
+            replayed = set()
+            if sub.backlog is not None:
+                backlog = [change for _, change in sub.backlog]
+            else:
+                backlog = await run_in_threadpool(_replay, last_event_id)
+                if backlog is None:
+                    backlog = [{"event_type": "reset"}]
+                replayed = {change.get("event_id") for change in backlog}
+            for change in backlog:
+                yield _sse(change)
+
+            # 2. Live changes; anything up to the high-water mark was covered above
+            while not sub.overflowed:
+                try:
+                    seq, change = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if seq <= sub.high_water or change.get("event_id") in replayed:
+                    continue
+                yield _sse(change)
+        finally:
+            occupancy_stream.broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type = "text/event-stream",
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
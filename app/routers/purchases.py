@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app import models, schemas
+from app import fast_json, loaders, models, schemas
 from app.database import get_db
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/purchases", tags=["purchases"],)
+router = APIRouter(prefix="/purchases", tags=["purchases"], route_class=TimedRoute)
+
+# keyset order for paging through purchases
+PURCHASE_SORT = (models.Purchase.purchase_date, models.Purchase.id)
 
 # --- Create a purchase ---------------------------
 @router.post(
@@ -32,14 +37,15 @@ def create_purchase(
     response_model = List[schemas.PurchaseRead]
 )
 def list_purchases(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Purchase)\
-                .offset(skip)\
-                .limit(limit)\
-                .all()
+    q = db.query(models.Purchase).options(*loaders.PURCHASE_READ)
+    rows = paginate(q, PURCHASE_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.PurchaseRead, rows, response)
 
 # --- Get a single purchase by id ------------
 @router.get(
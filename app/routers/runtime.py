@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+
+from app import instrumentation, prometheus
+from app.database import async_engine, engine, get_db
+from app.instrumentation import TimedRoute
+
+# Mounted ahead of the metrics router so /metrics/runtime isn't read as a wine id
+router = APIRouter(prefix="/metrics", tags=["metrics"], route_class=TimedRoute)
+
+@router.get("", response_class=Response)
+def prometheus_metrics(db: Session = Depends(get_db)):
+    """Prometheus text exposition: requests, DB pool, lookup cache and cellar gauges."""
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine
+    return Response(prometheus.render(db, engines), media_type=prometheus.CONTENT_TYPE)
+
+@router.get("/runtime")
+def runtime_metrics():
+    """Per-route request counts, SQL query counts and handler/serialization timings."""
+    return instrumentation.runtime_summary()
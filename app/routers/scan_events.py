@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app import models, schemas
+from app import fast_json, loaders, models, occupancy, scan_ingest, schemas
 from app.database import get_db
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/scan-events",tags=["scan-events"],)
+router = APIRouter(prefix="/scan-events",tags=["scan-events"], route_class=TimedRoute)
+
+# keyset order for paging through the event log
+SCAN_EVENT_SORT = (models.ScanEvent.timestamp, models.ScanEvent.id)
 
 
 # --- Create a scan event --------------------------------------
@@ -25,25 +30,53 @@ def create_scan_event(
         raise HTTPException(status_code=400, detail="Slot not found")
     
     new = models.ScanEvent(**data.dict())
-    db.add(new)
+    occupancy.apply_event(db, new)
     db.commit()
     db.refresh(new)
     return new
 
+# --- Upload a batch of buffered scan events --------------------
+@router.post(
+    "/batch",
+    response_model = schemas.ScanEventBatchResult
+)
+def create_scan_events_batch(
+    events: List[schemas.ScanEventBatchItem],
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Store events buffered by an offline scanner in one transaction and
+    apply them to slot occupancy in timestamp order; events that can't
+    follow from their slot's state are reported as conflicts. Each event
+    carries an idempotency key, so a retried upload reports duplicates
+    instead of storing events twice. Results come back in request order.
+    At most scan_ingest.MAX_BATCH events per request.
+    """
+    if len(events) > scan_ingest.MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {scan_ingest.MAX_BATCH} events per batch",
+        )
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    return scan_ingest.ingest(db, events, chunk_size)
+
 # --- List scan events -------------------------------------------
 @router.get(
     "",
     response_model = List[schemas.ScanEventRead]
 )
 def list_scan_events(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.ScanEvent)\
-                .offset(skip)\
-                .limit(limit)\
-                .all()
+    q = db.query(models.ScanEvent).options(*loaders.SCAN_EVENT_READ)
+    rows = paginate(q, SCAN_EVENT_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.ScanEventRead, rows, response)
 
 # --- Get scan event by ID ----------------------------------------
 @router.get(
@@ -73,11 +106,18 @@ def update_scan_event(
     if not event:
         raise HTTPException(status_code=404, detail="Scan event not found")
     
+    old_slot_id = event.slot_id
+
     event.wine_id       = data.wine_id
     event.slot_id       = data.slot_id
     event.event_type    = data.event_type
     event.timestamp     = data.timestamp
 
+    # editing history may change what is in either slot now
+    occupancy.replay_slot(db, old_slot_id)
+    if data.slot_id != old_slot_id:
+        occupancy.replay_slot(db, data.slot_id)
+
     db.commit()
     db.refresh(event)
     return event
@@ -96,5 +136,6 @@ def delete_scan_event(
         raise HTTPException(status_code=404, detail="Scan event not found")
     
     db.delete(event)
+    occupancy.replay_slot(db, event.slot_id)
     db.commit()
     return None
\ No newline at end of file
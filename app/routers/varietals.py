@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app import models, schemas
+from app import fast_json, models, schemas
 from app.database import get_db
+from app.lookup_cache import lookup_cache
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix="/lookups", tags=["Lookups"])
+router = APIRouter(prefix="/lookups", tags=["Lookups"], route_class=TimedRoute)
+
+# keyset order for paging through varietals
+VARIETAL_SORT = (models.Varietal.name, models.Varietal.id)
 
 @router.post(
     "/varietals",
@@ -25,6 +31,7 @@ def create_varietal(
     new = models.Varietal(name=data.name)
     db.add(new)
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(new)
     return new
 
@@ -34,14 +41,14 @@ def create_varietal(
     response_model=List[schemas.VarietalRead]
 )
 def list_varietals(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Varietal)\
-                .offset(skip)\
-                .limit(limit)\
-                .all()
+    rows = paginate(db.query(models.Varietal), VARIETAL_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.VarietalRead, rows, response)
 
 # --- Get a single Varietal by ID --------------------------
 @router.get(
@@ -52,7 +59,7 @@ def get_varietal(
     varietal_id: str,
     db: Session = Depends(get_db)
 ):
-    varietal = db.query(models.Varietal).get(varietal_id)
+    varietal = lookup_cache.get(db, models.Varietal, varietal_id)
     if not varietal:
         raise HTTPException(status_code=404, detail= "Varietal not found")
     return varietal
@@ -74,6 +81,7 @@ def update_varietal(
     varietal.name = data.name
     
     db.commit()
+    lookup_cache.invalidate()
     db.refresh(varietal)
     return varietal
 
@@ -91,4 +99,5 @@ def delete_varietal(
         raise HTTPException(status_code=404, detail= "Varietal not found")
     db.delete(varietal)
     db.commit()
+    lookup_cache.invalidate()
     return None
\ No newline at end of file
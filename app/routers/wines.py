@@ -1,11 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app import models, schemas
+from app import fast_json, loaders, models, schemas, wine_import, wine_search
 from app.database import get_db
+from app.lookup_cache import lookup_cache
+from app.pagination import paginate
+from app.instrumentation import TimedRoute
 
-router = APIRouter(prefix = '/wines', tags = ['wines'])
+router = APIRouter(prefix = '/wines', tags = ['wines'], route_class = TimedRoute)
+
+# keyset order for paging through wines
+WINE_SORT = (models.Wine.producer, models.Wine.label, models.Wine.vintage, models.Wine.id)
+
+
+def validate_lookups(db: Session, data: schemas.WineCreate):
+    """
+    Ensure the lookups a wine references exist (served from the lookup cache)
+    """
+    if not lookup_cache.exists(db, models.Country, data.country_id):
+        raise HTTPException(status_code=400, detail= "Country not found")
+    if not lookup_cache.exists(db, models.Region, data.region_id):
+        raise HTTPException(status_code=400, detail= "Region not found")
+    if data.subregion_id and not lookup_cache.exists(db, models.Subregion, data.subregion_id):
+        raise HTTPException(status_code=400, detail= "Subregion not found")
+    if data.classification_id and not lookup_cache.exists(db, models.Classification, data.classification_id):
+        raise HTTPException(status_code=400, detail= "Classification not found")
+
+
+def wine_read(db: Session, wine: models.Wine, validate: bool = True) -> schemas.WineRead:
+    """
+    Render a wine with its nested country/region/subregion/classification
+    taken from the lookup cache rather than lazy-loaded relationships.
+    List pages pass validate=False: the fields come from the row and the
+    cache, and fast_json serializes the unvalidated model directly.
+    """
+    fields = {name: getattr(wine, name) for name in schemas.WineBase.__fields__}
+    build = schemas.WineRead if validate else schemas.WineRead.construct
+    return build(
+        **fields,
+        id              = wine.id,
+        country         = lookup_cache.get(db, models.Country, wine.country_id),
+        region          = lookup_cache.get(db, models.Region, wine.region_id),
+        subregion       = wine.subregion_id and lookup_cache.get(db, models.Subregion, wine.subregion_id),
+        classification  = wine.classification_id and lookup_cache.get(db, models.Classification, wine.classification_id),
+        varietals       = wine.varietals,
+    )
 
 @router.post(
     "",
@@ -17,14 +57,7 @@ def create_wine(
     db: Session = Depends(get_db)
 ):
     # 1. Validate required lookups exist
-    if not db.query(models.Country).get(data.country_id):
-        raise HTTPException(status_code=400, detail= "Country not found")
-    if not db.query(models.Region).get(data.region_id):
-        raise HTTPException(status_code=400, detail= "Region not found")
-    if data.subregion_id and not db.query(models.Subregion).get(data.subregion_id):
-        raise HTTPException(status_code=400, detail= "Subregion not found")
-    if data.classification_id and not db.query(models.Classification).get(data.classification_id):
-        raise HTTPException(status_code=400, detail= "Classification not found")
+    validate_lookups(db, data)
     
     # 2. Create the wine record
     new = models.Wine(
@@ -43,7 +76,28 @@ def create_wine(
     db.add(new)
     db.commit()
     db.refresh(new)
-    return new
+    wine_search.index.add(new.id, new.producer, new.label)
+    return wine_read(db, new)
+
+# --- Bulk import wines ------------------------
+@router.post(
+    "/bulk",
+    response_model = schemas.WineBulkResult
+)
+async def bulk_import_wines(
+    request: Request,
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Import many wines in one request from a JSON array, NDJSON
+    (application/x-ndjson) or CSV (text/csv) body. Each chunk is
+    validated and inserted in its own transaction; rows that are
+    invalid or clash with an existing wine are reported, not fatal.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail= "chunk_size must be positive")
+    return await wine_import.run_import(request, db, chunk_size)
 
 # --- Get a list of all wines -----------------
 @router.get(
@@ -51,17 +105,40 @@ def create_wine(
     response_model = List[schemas.WineRead]
 )
 def list_wines(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Return a paginated list of all wines
+    Return a paginated list of all wines, ordered by producer, label and vintage.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
     """
-    return db.query(models.Wine)\
-                .offset(skip)\
-                .limit(limit)\
-                .all()
+    q = db.query(models.Wine).options(*loaders.WINE_VARIETALS)
+    wines = paginate(q, WINE_SORT, response, skip, limit, cursor)
+    return fast_json.respond(schemas.WineRead, [wine_read(db, wine, validate=False) for wine in wines], response)
+
+# --- Search wines by producer and label ------------
+@router.get(
+    "/search",
+    response_model = List[schemas.WineRead]
+)
+def search_wines(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Find wines by producer and label, best match first. Every word of `q`
+    must match a word of the producer or label; typos and prefixes are
+    tolerated ("chat margeau" finds Chateau Margaux).
+    """
+    ids = wine_search.search(db, q, limit)
+    wines = db.query(models.Wine).options(*loaders.WINE_VARIETALS).filter(models.Wine.id.in_(ids)) if ids else []
+    by_id = {wine.id: wine for wine in wines}
+    found = [wine_read(db, by_id[id], validate=False) for id in ids if id in by_id]
+    return fast_json.respond(schemas.WineRead, found)
 
 # --- Get a single wine by id ------------
 @router.get(
@@ -75,10 +152,10 @@ def get_wine(
     """
     Fetch a single wine by its UUID
     """
-    wine = db.query(models.Wine).get(wine_id)
+    wine = db.query(models.Wine).options(*loaders.WINE_VARIETALS).get(wine_id)
     if not wine:
         raise HTTPException(status_code=404, detail= "Wine not found")
-    return wine
+    return wine_read(db, wine)
 
 # --- Update an existing wine --------------
 @router.put(
@@ -98,14 +175,7 @@ def update_wine(
         raise HTTPException(status_code=404, detail= "Wine not found")
     
     # Validate lookups
-    if not db.query(models.Country).get(data.country_id):
-        raise HTTPException(status_code=400, detail= "Country not found")
-    if not db.query(models.Region).get(data.region_id):
-        raise HTTPException(status_code=400, detail= "Region not found")
-    if data.subregion_id and not db.query(models.Subregion).get(data.subregion_id):
-        raise HTTPException(status_code=400, detail= "Subregion not found")
-    if data.classification_id and not db.query(models.Classification).get(data.classification_id):
-        raise HTTPException(status_code=400, detail= "Classification not found")
+    validate_lookups(db, data)
     
     # Apply updates
     wine.producer           = data.producer
@@ -113,7 +183,7 @@ def update_wine(
     wine.vintage            = data.vintage
     wine.country_id         = data.country_id
     wine.region_id          = data.region_id
-    wine.subregion_id       = data.region_id
+    wine.subregion_id       = data.subregion_id
     wine.classification_id  = data.classification_id
     wine.bottle_size        = data.bottle_size
     wine.closure_type       = data.closure_type
@@ -121,7 +191,8 @@ def update_wine(
 
     db.commit()
     db.refresh(wine)
-    return wine
+    wine_search.index.add(wine.id, wine.producer, wine.label)
+    return wine_read(db, wine)
 
 # --- Delete an existing wine -----------------------
 @router.delete(
@@ -140,4 +211,5 @@ def wine_delete(
         raise HTTPException(status_code=404, detail= "Wine not found")
     db.delete(wine)
     db.commit()
+    wine_search.index.remove(wine.id)
     return None
\ No newline at end of file
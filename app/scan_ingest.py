@@ -0,0 +1,171 @@
+"""
+Batched scan event ingestion for scanners that buffer while offline.
+
+A batch of N events costs a handful of statements instead of N requests:
+one IN query per chunk each for known idempotency keys, wines and slots,
+chunked multi-row INSERTs, and one locked read of the affected occupancy
+rows. Everything commits together, so the log and the projection never
+disagree.
+
+Idempotency keys make uploads safe to retry: an event whose key is already
+stored (or repeated earlier in the same batch) is reported as a duplicate
+with the id of the stored event instead of being inserted again.
+
+Each slot's events must follow from its state: they are checked in
+timestamp order against the slot's locked occupancy row, and one that
+can't happen next (an IN to an occupied slot, an OUT of a wine the slot
+doesn't hold, or one older than the slot's last event) is reported as a
+conflict and not stored.
+
+A batch is one transaction holding row locks until it commits, so its
+size is capped at SCAN_EVENT_BATCH_MAX events (default 5000); scanners
+with a larger backlog upload it in several batches.
+"""
+import os
+import uuid
+from datetime import timezone
+from typing import Dict, List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models, occupancy, schemas
+
+MAX_BATCH = int(os.getenv("SCAN_EVENT_BATCH_MAX", "5000"))
+
+
+def _chunks(values: list, size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _known(db: Session, column, values: set, chunk_size: int) -> set:
+    """The subset of `values` present in `column`, one IN query per chunk."""
+    found = set()
+    for chunk in _chunks(list(values), chunk_size):
+        found.update(value for (value,) in db.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def _stored_ids(db: Session, keys: set, chunk_size: int) -> Dict[str, uuid.UUID]:
+    """Event ids already stored under the given idempotency keys."""
+    Event = models.ScanEvent
+    stored = {}
+    for chunk in _chunks(list(keys), chunk_size):
+        stored.update(db.query(Event.idempotency_key, Event.id).filter(Event.idempotency_key.in_(chunk)))
+    return stored
+
+
+def _naive_utc(ts):
+    """scan_events.timestamp is naive UTC; convert client timestamps with an offset."""
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def ingest(db: Session, items: List[schemas.ScanEventBatchItem], chunk_size: int = 1000) -> schemas.ScanEventBatchResult:
+    result = schemas.ScanEventBatchResult(received=len(items))
+    outcomes: List[schemas.ScanEventBatchRow] = [None] * len(items)
+
+    def outcome(i, status, event_id=None, detail=None):
+        outcomes[i] = schemas.ScanEventBatchRow(
+            idempotency_key=items[i].idempotency_key, status=status, event_id=event_id, detail=detail,
+        )
+
+    # 1. Set-based checks: stored keys, then wines and slots
+    stored = _stored_ids(db, {item.idempotency_key for item in items}, chunk_size)
+    wines = _known(db, models.Wine.id, {item.wine_id for item in items}, chunk_size)
+    slots = _known(db, models.CellarSlot.id, {item.slot_id for item in items}, chunk_size)
+
+    rows, first_seen = [], {}
+    for i, item in enumerate(items):
+        key = item.idempotency_key
+        if key in stored:
+            outcome(i, "duplicate", stored[key])
+        elif key in first_seen:
+            first_seen[key].append(i)       # resolved once the first one is stored
+        elif item.wine_id not in wines:
+            outcome(i, "invalid", detail="Wine not found")
+        elif item.slot_id not in slots:
+            outcome(i, "invalid", detail="Slot not found")
+        else:
+            first_seen[key] = []
+            rows.append((i, {
+                "id": uuid.uuid4(),
+                "wine_id": item.wine_id,
+                "slot_id": item.slot_id,
+                "event_type": item.event_type,
+                "timestamp": _naive_utc(item.timestamp),
+                "idempotency_key": key,
+            }))
+
+    # 2. Walk each slot's events in timestamp order from its locked
+    #    projection row, then insert the ones that follow; an event the
+    #    slot's state rules out (an IN to an occupied slot, an OUT of a
+    #    wine the slot doesn't hold, one older than the slot's last event)
+    #    is a conflict and isn't stored
+    rows.sort(key=lambda pair: (pair[1]["timestamp"], pair[0]))
+    slot_ids = {row["slot_id"] for _, row in rows}
+    table = models.ScanEvent.__table__
+
+    sequence = occupancy.SlotSequence(db, slot_ids)
+    accepted = []
+    for i, row in rows:
+        reason = sequence.check(row)
+        if reason:
+            outcome(i, "conflict", detail=reason)
+        else:
+            sequence.accept(row)
+            accepted.append((i, row))
+
+    # 3. If a concurrent upload stored some of the same keys first, start
+    #    over row by row and report those as duplicates. Any other failure
+    #    (a wine or slot deleted since the checks above) leaves no stored
+    #    row for the key: the row is invalid. Either way the row doesn't
+    #    move its slot on, so the rows after it are checked again
+    inserted = []
+    try:
+        for chunk in _chunks(accepted, chunk_size):
+            db.execute(table.insert(), [row for _, row in chunk])
+        inserted = accepted
+    except IntegrityError:
+        db.rollback()
+        sequence = occupancy.SlotSequence(db, slot_ids)
+        for i, row in rows:
+            reason = sequence.check(row)
+            if reason:
+                outcome(i, "conflict", detail=reason)
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(table.insert(), row)
+            except IntegrityError:
+                raced = _stored_ids(db, {row["idempotency_key"]}, 1)
+                if row["idempotency_key"] in raced:
+                    outcome(i, "duplicate", raced[row["idempotency_key"]])
+                else:
+                    outcome(i, "invalid", detail="Wine or slot no longer exists")
+                continue
+            sequence.accept(row)
+            inserted.append((i, row))
+
+    # 4. Move the affected slots to their last stored event, same transaction
+    sequence.fold(db)
+    db.commit()
+
+    for i, row in inserted:
+        outcome(i, "created", row["id"])
+    resolved = {o.idempotency_key: o.event_id for o in outcomes if o is not None}
+    for key, repeats in first_seen.items():
+        for i in repeats:
+            outcome(i, "duplicate", resolved.get(key), detail="Repeated in this batch")
+
+    result.results = outcomes
+    for row in outcomes:
+        if row.status == "created":
+            result.created += 1
+        elif row.status == "duplicate":
+            result.duplicates += 1
+        elif row.status == "conflict":
+            result.conflicts += 1
+        else:
+            result.invalid += 1
+    return result
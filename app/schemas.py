@@ -1,5 +1,6 @@
 from pydantic import BaseModel, UUID4, condecimal, constr
-from typing import Optional, List
+from enum import Enum
+from typing import Optional, List, Tuple
 from app.models import BottleSize, ClosureType
 from datetime import date, datetime
 
@@ -115,6 +116,18 @@ class WineRead(WineBase):
     class Config:
         orm_mode = True
 
+class WineBulkRowResult(BaseModel):
+    """A record from a bulk import that was not inserted."""
+    index: int              # position of the record in the request body
+    status: str             # "invalid" or "conflict"
+    detail: str
+
+class WineBulkResult(BaseModel):
+    """Summary of a bulk wine import."""
+    received: int = 0
+    created: int = 0
+    failures: List[WineBulkRowResult] = []
+
 
 # --- Purchase schemas ---------------------------
 class PurchaseBase(BaseModel):
@@ -162,6 +175,14 @@ class WineMetricsRead(BaseModel):
     class Config:
         orm_mode = True
 
+class MetricsRecomputeReport(BaseModel):
+    """Throughput report from a batch metrics recompute."""
+    wines: int
+    chunks: int
+    changed_only: bool
+    elapsed_seconds: float
+    wines_per_second: Optional[float]
+
 
 # --- CellarSlot schemas ------------------------------
 class CellarSlotBase(BaseModel):
@@ -202,7 +223,62 @@ class ScanEventRead(ScanEventBase):
         orm_mode = True
 
 
+class ScanEventBatchItem(BaseModel):
+    """An event buffered by an offline scanner, with the scanner's own timestamp."""
+    idempotency_key: constr(min_length=1, max_length=100)
+    wine_id: UUID4
+    slot_id: UUID4
+    event_type: EventTypeEnum
+    timestamp: datetime
+
+class ScanEventBatchRow(BaseModel):
+    """Outcome for one event of a batch, without the nested wine and slot."""
+    idempotency_key: str
+    status: str                         # "created", "duplicate", "conflict" or "invalid"
+    event_id: Optional[UUID4] = None    # the stored event (for duplicates, the earlier one)
+    detail: Optional[str] = None
+
+class ScanEventBatchResult(BaseModel):
+    """Summary of a batch upload; results are in request order."""
+    received: int = 0
+    created: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    results: List[ScanEventBatchRow] = []
+
+
 # --- LED slot colors -----------------------------------
 class SlotColor(BaseModel):
     slot_id: UUID4
-    color: str          # e.g., "red", "green", "blue"
\ No newline at end of file
+    color: str          # e.g., "red", "green", "blue"
+
+class ColorMapFormat(str, Enum):
+    FULL = "full"       # one SlotColor per slot
+    IDS = "ids"         # highlighted slot ids only
+    RLE = "rle"         # runs of highlighted positions over the slot ordering
+
+class SlotColorMap(BaseModel):
+    """
+    Compact color map: every slot shows `default` except the highlighted
+    ones, which show `color`. Positions refer to slots ordered by
+    (rack, row, id), the order GET /cellar-slots returns them in.
+    """
+    color: str
+    default: Optional[str] = None       # None: leave the LED as it is
+    slots: int                          # number of slots in the ordering
+    layout: str                         # changes whenever the slot ordering does
+    highlighted: Optional[List[UUID4]] = None       # format=ids
+    runs: Optional[List[Tuple[int, int]]] = None    # format=rle: (start, length)
+
+
+# --- Export --------------------------------------------
+class ExportTable(str, Enum):
+    WINES = "wines"
+    PURCHASES = "purchases"
+    CRITIC_SCORES = "critic_scores"
+    SCAN_EVENTS = "scan_events"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
@@ -0,0 +1,147 @@
+"""
+Vectorized scoring engine for WineMetrics.
+
+Pulls the cellar into NumPy arrays with one columnar fetch per table
+(wine attributes, critic scores, purchase prices) and computes every
+wine's metrics in a single pass, with no per-wine queries or loops:
+
+    avg_score, review_count, score_sum   grouped sums over critic scores
+    current_market                       mean purchase price
+    rarity_score    100 * (1 - mean share of the cellar sharing the wine's
+                    producer, producer/label, producer/label/vintage and
+                    bottle size); a one-off large format scores near 100
+    qpr             50 * score percentile / price percentile, so 50 means
+                    the wine is priced in line with its quality
+
+Percentiles are cumulative distributions (share of wines at or below a
+value) over the wines that have that value.
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import CriticScore, Purchase, Wine
+
+QPR_MAX = 999.99
+
+
+@dataclass
+class CellarScores:
+    """Per-wine metrics, aligned by position with wine_ids. NaN means no value."""
+    wine_ids:       List
+    review_count:   np.ndarray
+    score_sum:      np.ndarray
+    avg_score:      np.ndarray
+    current_market: np.ndarray
+    rarity_score:   np.ndarray
+    qpr:            np.ndarray
+
+    def __len__(self):
+        return len(self.wine_ids)
+
+
+# --- Columnar fetch -------------------------------------
+def _columns(db: Session, *cols):
+    """Run a SELECT and return its result as one tuple per column."""
+    rows = db.execute(select(*cols)).all()
+    if not rows:
+        return tuple(() for _ in cols)
+    return tuple(zip(*rows))
+
+
+def _positions(index: dict, wine_ids) -> np.ndarray:
+    return np.fromiter((index[w] for w in wine_ids), dtype=np.int64, count=len(wine_ids))
+
+
+def _floats(values) -> np.ndarray:
+    return np.fromiter((float(v) for v in values), dtype=np.float64, count=len(values))
+
+
+# --- Vector math ----------------------------------------
+def group_mean(positions: np.ndarray, values: np.ndarray, n: int):
+    """Per-wine (count, sum, mean) of values keyed by wine position."""
+    counts = np.bincount(positions, minlength=n)
+    sums = np.bincount(positions, weights=values, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return counts, sums, means
+
+
+def cume_dist(values: np.ndarray) -> np.ndarray:
+    """Share of non-NaN values <= each value; NaN stays NaN."""
+    out = np.full(values.shape, np.nan)
+    present = ~np.isnan(values)
+    ranked = np.sort(values[present])
+    if len(ranked):
+        out[present] = np.searchsorted(ranked, values[present], side="right") / len(ranked)
+    return out
+
+
+def group_sizes(*keys: np.ndarray) -> np.ndarray:
+    """For each row, how many rows share its combination of key values."""
+    code = np.zeros(len(keys[0]), dtype=np.int64)
+    for key in keys:
+        _, inverse = np.unique(key, return_inverse=True)
+        code = code * (inverse.max(initial=0) + 1) + inverse
+        # keep codes dense so the multiplication above can't overflow
+        _, code = np.unique(code, return_inverse=True)
+    return np.bincount(code)[code]
+
+
+def rarity(producer, label, vintage, bottle_size) -> np.ndarray:
+    n = len(producer)
+    if not n:
+        return np.zeros(0)
+    shared = (
+        group_sizes(producer)
+        + group_sizes(producer, label)
+        + group_sizes(producer, label, vintage)
+        + group_sizes(bottle_size)
+    ) / 4
+    return 100 * (1 - shared / n)
+
+
+def qpr(avg_score: np.ndarray, current_market: np.ndarray) -> np.ndarray:
+    score_pct = cume_dist(avg_score)
+    price_pct = cume_dist(current_market)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = 50 * score_pct / price_pct
+    return np.minimum(ratio, QPR_MAX)
+
+
+# --- Entry point ----------------------------------------
+def score_cellar(db: Session) -> CellarScores:
+    """Compute metrics for every wine in the cellar."""
+    wine_ids, producer, label, vintage, bottle_size = _columns(
+        db, Wine.id, Wine.producer, Wine.label, Wine.vintage, Wine.bottle_size
+    )
+    score_wines, scores = _columns(db, CriticScore.wine_id, CriticScore.score)
+    price_wines, prices = _columns(db, Purchase.wine_id, Purchase.price_amount)
+
+    n = len(wine_ids)
+    index = {wine_id: i for i, wine_id in enumerate(wine_ids)}
+
+    review_count, score_sum, avg_score = group_mean(
+        _positions(index, score_wines), _floats(scores), n
+    )
+    _, _, current_market = group_mean(
+        _positions(index, price_wines), _floats(prices), n
+    )
+
+    return CellarScores(
+        wine_ids        = list(wine_ids),
+        review_count    = review_count,
+        score_sum       = score_sum,
+        avg_score       = avg_score,
+        current_market  = current_market,
+        rarity_score    = rarity(
+            np.asarray(producer, dtype=object),
+            np.asarray(label, dtype=object),
+            np.asarray(vintage, dtype=np.int64),
+            np.asarray([size.value for size in bottle_size], dtype=object),
+        ),
+        qpr             = qpr(avg_score, current_market),
+    )
@@ -0,0 +1,267 @@
+"""
+Columnar snapshots for analytics (pandas, DuckDB, ...).
+
+    python -m app.cli snapshot --out snapshots/ [--format parquet|arrow] [--full]
+
+Every run writes one new directory, snapshots/<UTC timestamp, to the
+microsecond>/, holding a file per table plus manifest.json:
+
+    wines           denormalized: country, region, subregion and
+                    classification names next to their ids
+    wine_varietals  wine_id, varietal_id, varietal name, blend_pct
+    purchases, critic_scores, wine_metrics, scan_events
+
+All tables are read in one transaction (REPEATABLE READ where the
+database supports it), so a snapshot is consistent across tables. Rows
+come off a server-side cursor and are written a batch at a time, so memory
+stays flat however large the tables are.
+
+The first run (or --full) exports everything. Later runs export only
+rows changed since the watermark kept in snapshots/snapshot_state.json:
+updated_at for most tables, the wine's updated_at for its varietals
+(database triggers touch the wine when its blend changes, see
+models.WINE_VARIETALS_TRIGGERS), and scores_changed_at/computed_at for
+wine_metrics. Each run reaches
+SNAPSHOT_LOOKBACK seconds (default 300) behind the watermark, so a row
+committed late by a slow transaction is not missed. The cost is that
+consecutive runs can repeat a row: keep the copy from the newest
+snapshot for each id. Deletes are not tracked; take a --full snapshot
+to pick them up.
+
+Needs pyarrow (pip install pyarrow), imported only when a snapshot runs.
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, String, func, or_, select
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models import (
+    Classification, Country, CriticScore, Purchase, Region, ScanEvent,
+    Subregion, Varietal, Wine, WineMetrics, wine_varietals,
+)
+
+BATCH_SIZE  = int(os.getenv("SNAPSHOT_BATCH_SIZE", "10000"))
+LOOKBACK    = timedelta(seconds=float(os.getenv("SNAPSHOT_LOOKBACK", "300")))
+STATE_FILE  = "snapshot_state.json"
+
+# isolation level that gives one snapshot for the whole transaction
+SNAPSHOT_ISOLATION = {"postgresql": "REPEATABLE READ", "mysql": "REPEATABLE READ"}
+
+
+# --- Tables ---------------------------------------------
+class Table(NamedTuple):
+    name: str
+    query: Callable                 # () -> select
+    stamps: Tuple                   # columns whose change marks a row for the next run
+
+
+def _wines():
+    return (
+        select(
+            Wine.id, Wine.producer, Wine.label, Wine.vintage,
+            Wine.country_id, Country.name.label("country"),
+            Wine.region_id, Region.name.label("region"),
+            Wine.subregion_id, Subregion.name.label("subregion"),
+            Wine.classification_id, Classification.name.label("classification"),
+            Wine.bottle_size, Wine.closure_type, Wine.abv, Wine.updated_at,
+        )
+        .join(Country, Wine.country_id == Country.id)
+        .join(Region, Wine.region_id == Region.id)
+        .outerjoin(Subregion, Wine.subregion_id == Subregion.id)
+        .outerjoin(Classification, Wine.classification_id == Classification.id)
+    )
+
+
+def _wine_varietals():
+    link = wine_varietals.c
+    return (
+        select(link.wine_id, link.varietal_id, Varietal.name.label("varietal"), link.blend_pct)
+            .join(Varietal, link.varietal_id == Varietal.id)
+            .join(Wine, link.wine_id == Wine.id)
+    )
+
+
+TABLES = (
+    Table("wines",          _wines,                                 (Wine.updated_at,)),
+    Table("wine_varietals", _wine_varietals,                        (Wine.updated_at,)),
+    Table("purchases",      lambda: select(Purchase.__table__),     (Purchase.updated_at,)),
+    Table("critic_scores",  lambda: select(CriticScore.__table__),  (CriticScore.updated_at,)),
+    Table("wine_metrics",   lambda: select(WineMetrics.__table__),  (WineMetrics.scores_changed_at, WineMetrics.computed_at)),
+    Table("scan_events",    lambda: select(ScanEvent.__table__),    (ScanEvent.updated_at,)),
+)
+
+
+# --- Arrow ----------------------------------------------
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("snapshots need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _arrow_type(pa, column_type):
+    if isinstance(column_type, UUID):
+        return pa.string()
+    if isinstance(column_type, SAEnum):     # before String: Enum is a String
+        return pa.string()
+    if isinstance(column_type, String):
+        return pa.string()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Numeric):
+        if column_type.precision is None:
+            return pa.float64()
+        return pa.decimal128(column_type.precision, column_type.scale or 0)
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    raise TypeError(f"no Arrow type for {column_type!r}")
+
+
+def _converter(column_type) -> Optional[Callable]:
+    """Python value -> value pyarrow accepts, for the types it can't take as is."""
+    if isinstance(column_type, UUID):
+        return lambda value: None if value is None else str(value)
+    if isinstance(column_type, SAEnum):
+        return lambda value: value.value if isinstance(value, Enum) else value
+    return None
+
+
+class _Writer:
+    """One output file, written batch by batch to a temporary name."""
+    def __init__(self, pa, fmt: str, path: str, schema):
+        self.path   = path
+        self.tmp    = path + ".tmp"
+        if fmt == "parquet":
+            self._file = pa.parquet.ParquetWriter(self.tmp, schema, compression="zstd")
+            self._write = lambda batch: self._file.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._sink = pa.OSFile(self.tmp, "wb")
+            self._file = pa.ipc.new_file(self._sink, schema)
+            self._write = self._file.write_batch
+
+    def write(self, batch):
+        self._write(batch)
+
+    def close(self, keep: bool):
+        self._file.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+        if keep:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+
+
+# --- Snapshot -------------------------------------------
+@contextmanager
+def _snapshot_connection(engine):
+    level = SNAPSHOT_ISOLATION.get(engine.dialect.name)
+    with engine.connect() as conn:
+        if level:
+            conn = conn.execution_options(isolation_level=level)
+        with conn.begin():
+            yield conn
+
+
+def _watermark(conn, table: Table) -> Optional[datetime]:
+    latest = [conn.execute(select(func.max(stamp))).scalar() for stamp in table.stamps]
+    latest = [value for value in latest if value is not None]
+    return max(latest) if latest else None
+
+
+def _export(pa, conn, table: Table, since: Optional[datetime], path: str, fmt: str, batch_size: int) -> int:
+    query = table.query()
+    if since is not None:
+        query = query.where(or_(*(stamp >= since for stamp in table.stamps)))
+
+    columns = list(query.selected_columns)
+    schema = pa.schema([(column.name, _arrow_type(pa, column.type)) for column in columns])
+    converters = [_converter(column.type) for column in columns]
+
+    writer = _Writer(pa, fmt, path, schema)
+    count, ok = 0, False
+    try:
+        result = conn.execution_options(stream_results=True).execute(query)
+        for partition in result.partitions(batch_size):
+            arrays = [
+                pa.array(
+                    [row[i] for row in partition] if convert is None
+                    else [convert(row[i]) for row in partition],
+                    type=field.type,
+                )
+                for i, (field, convert) in enumerate(zip(schema, converters))
+            ]
+            writer.write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(partition)
+        ok = True
+    finally:
+        writer.close(keep=ok)
+    return count
+
+
+def _load_state(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermarks": {}}
+
+
+def _save_state(out_dir: str, state: dict):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def run(engine, out_dir: str, fmt: str = "parquet", full: bool = False, batch_size: int = BATCH_SIZE) -> dict:
+    """Write one snapshot and advance the watermarks. Returns the manifest."""
+    pa = _pyarrow()
+    state = _load_state(out_dir)
+    previous = {} if full else state["watermarks"]
+    taken_at = datetime.utcnow()
+    # to the microsecond, and never reused: a run must not overwrite another's files
+    run_dir = os.path.join(out_dir, taken_at.strftime("%Y%m%dT%H%M%S%fZ"))
+    os.makedirs(out_dir, exist_ok=True)
+    os.mkdir(run_dir)
+
+    manifest = {
+        "taken_at": taken_at.isoformat(),
+        "mode": "incremental" if previous else "full",
+        "format": fmt,
+        "tables": {},
+    }
+    watermarks = dict(state["watermarks"])
+    extension = "parquet" if fmt == "parquet" else "arrow"
+    with _snapshot_connection(engine) as conn:
+        for table in TABLES:
+            mark = previous.get(table.name)
+            since = datetime.fromisoformat(mark) - LOOKBACK if mark else None
+            # read inside the snapshot, so it matches the rows exported below
+            latest = _watermark(conn, table)
+            path = os.path.join(run_dir, f"{table.name}.{extension}")
+            rows = _export(pa, conn, table, since, path, fmt, batch_size)
+            manifest["tables"][table.name] = {
+                "file": os.path.basename(path),
+                "rows": rows,
+                "since": since.isoformat() if since else None,
+            }
+            if latest is not None:
+                watermarks[table.name] = latest.isoformat()
+
+    with open(os.path.join(run_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # only a complete snapshot moves the watermarks
+    _save_state(out_dir, {"watermarks": watermarks, "last_snapshot": os.path.basename(run_dir)})
+    return manifest
@@ -0,0 +1,117 @@
+"""
+In-process metrics primitives.
+
+Recording must be cheap enough to leave on in production, so there are
+no locks: every thread writes only to its own shard (keyed by thread id)
+and readers add the shards up. A snapshot may be a few observations
+behind a concurrent writer, but no update is ever lost.
+"""
+import bisect
+import threading
+import time
+
+# seconds; suits both request latencies and individual queries
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Counter:
+    def __init__(self):
+        self._shards = {}
+
+    def inc(self, amount: float = 1):
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards[ident] = [0]
+        shard[0] += amount
+
+    def value(self) -> float:
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._shards = {}
+
+    def _shard(self) -> list:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            # [sum, count per bucket..., count above the last bucket]
+            shard = [0.0] + [0] * (len(self.buckets) + 1)
+            self._shards[ident] = shard
+        return shard
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[0] += value
+        shard[1 + bisect.bisect_left(self.buckets, value)] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Totals plus cumulative bucket counts, keyed by upper bound
+        (Prometheus `le` semantics; the last key is "+Inf").
+        """
+        total = 0.0
+        counts = [0] * (len(self.buckets) + 1)
+        for shard in list(self._shards.values()):
+            total += shard[0]
+            for i, n in enumerate(shard[1:]):
+                counts[i] += n
+
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + ("+Inf",), counts):
+            running += n
+            cumulative[bound] = running
+        return {"count": running, "sum": total, "buckets": cumulative}
+
+    def quantile(self, q: float):
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        snap = self.snapshot()
+        if not snap["count"]:
+            return None
+        target = q * snap["count"]
+        for bound, running in snap["buckets"].items():
+            if running >= target:
+                return bound
+        return "+Inf"
+
+    def summary(self) -> dict:
+        snap = self.snapshot()
+        return {
+            "count": snap["count"],
+            "mean": snap["sum"] / snap["count"] if snap["count"] else None,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class RateWindow:
+    """Events over the last `seconds` seconds, counted in one-second slots."""
+    def __init__(self, seconds: int = 60):
+        self.seconds = seconds
+        self._shards = {}
+
+    def inc(self, amount: float = 1):
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            # one [second, count] slot per second of the window, reused in a ring
+            shard = self._shards[ident] = [[-1, 0] for _ in range(self.seconds)]
+        now = int(time.monotonic())
+        slot = shard[now % self.seconds]
+        if slot[0] != now:
+            slot[0], slot[1] = now, 0
+        slot[1] += amount
+
+    def count(self) -> float:
+        cutoff = int(time.monotonic()) - self.seconds
+        return sum(
+            n for shard in list(self._shards.values())
+            for second, n in list(shard) if second > cutoff
+        )
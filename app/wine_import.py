@@ -0,0 +1,230 @@
+"""
+Bulk wine import.
+
+Records arrive as a JSON array, NDJSON or CSV (header row naming the
+WineCreate fields) and are imported in chunks. Each chunk validates its
+lookup ids with one IN query per table, checks uix_wine_unique with one
+query, and inserts the survivors with a single executemany in its own
+transaction. Rows that fail are reported back by index; they never
+abort the rest of the import.
+"""
+import codecs
+import csv
+import json
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models, schemas, wine_search
+
+# the columns behind uix_wine_unique
+UNIQUE_KEY = ("producer", "label", "vintage", "bottle_size")
+
+LOOKUP_FIELDS = (
+    ("country_id", models.Country, "Country not found"),
+    ("region_id", models.Region, "Region not found"),
+    ("subregion_id", models.Subregion, "Subregion not found"),
+    ("classification_id", models.Classification, "Classification not found"),
+)
+
+
+# --- Parsing --------------------------------------------
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Decode the request body into lines as it streams in."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_records(request: Request) -> AsyncIterator:
+    """
+    Yield raw records from the body: dicts for JSON and CSV, unparsed
+    lines for NDJSON so a bad line only fails its own row.
+    CSV rows may not contain embedded newlines.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+
+    if content_type in NDJSON_TYPES:
+        async for line in _iter_lines(request):
+            if line.strip():
+                yield line
+
+    elif content_type in CSV_TYPES:
+        header = None
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            # empty cells mean "not given" for the optional columns
+            yield {k: v for k, v in zip(header, values) if v != ""}
+
+    else:
+        try:
+            records = json.loads(await request.body() or b"[]")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of wines")
+        for record in records:
+            yield record
+
+
+def validate_record(index: int, record) -> Tuple[Optional[schemas.WineCreate], Optional[schemas.WineBulkRowResult]]:
+    """Parse one raw record, returning either the model or a failure row."""
+    try:
+        if isinstance(record, str):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise TypeError("Expected an object")
+        return schemas.WineCreate(**record), None
+    except (ValueError, TypeError) as e:
+        return None, schemas.WineBulkRowResult(index=index, status="invalid", detail=str(e))
+
+
+# --- Importing ------------------------------------------
+def _unique_key(wine: schemas.WineCreate) -> tuple:
+    return tuple(getattr(wine, name) for name in UNIQUE_KEY)
+
+
+def _exists(db: Session, row: dict) -> bool:
+    """Whether a wine is stored under the row's uix_wine_unique key."""
+    Wine = models.Wine
+    return db.query(Wine.id).filter(
+        *(getattr(Wine, name) == row[name] for name in UNIQUE_KEY)
+    ).first() is not None
+
+
+def import_chunk(
+    db: Session,
+    chunk: List[Tuple[int, schemas.WineCreate]],
+    seen: set,
+) -> Tuple[int, List[schemas.WineBulkRowResult]]:
+    """
+    Validate and insert one chunk of (index, wine) pairs in one transaction.
+    `seen` carries unique keys across chunks so duplicates within the same
+    import are reported too. Returns (created count, failure rows).
+    """
+    failures = []
+
+    # 1. One IN query per lookup table for every id the chunk references
+    known: Dict[str, set] = {}
+    for field, model, _ in LOOKUP_FIELDS:
+        ids = {getattr(wine, field) for _, wine in chunk if getattr(wine, field)}
+        known[field] = {
+            id for (id,) in db.query(model.id).filter(model.id.in_(ids))
+        } if ids else set()
+
+    valid = []
+    for index, wine in chunk:
+        for field, _, detail in LOOKUP_FIELDS:
+            value = getattr(wine, field)
+            if value and value not in known[field]:
+                failures.append(schemas.WineBulkRowResult(index=index, status="invalid", detail=detail))
+                break
+        else:
+            valid.append((index, wine))
+
+    # 2. One query for rows that already exist under uix_wine_unique
+    keys = {_unique_key(wine) for _, wine in valid}
+    columns = [getattr(models.Wine, name) for name in UNIQUE_KEY]
+    existing = {
+        tuple(row) for row in db.query(*columns).filter(tuple_(*columns).in_(keys))
+    } if keys else set()
+
+    rows = []
+    for index, wine in valid:
+        key = _unique_key(wine)
+        if key in existing or key in seen:
+            failures.append(schemas.WineBulkRowResult(
+                index=index, status="conflict", detail="Wine already exists"
+            ))
+            continue
+        seen.add(key)
+        rows.append((index, {"id": uuid.uuid4(), **wine.dict()}))
+
+    # 3. Multi-row insert; if another writer raced us, retry row by row.
+    #    A row is a conflict only if its wine now exists; any other failure
+    #    (a lookup deleted since the checks above, ...) makes it invalid
+    table = models.Wine.__table__
+    try:
+        if rows:
+            db.execute(table.insert(), [row for _, row in rows])
+        db.commit()
+        _index(row for _, row in rows)
+        return len(rows), failures
+    except IntegrityError:
+        db.rollback()
+
+    created = []
+    for index, row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(table.insert(), row)
+            created.append(row)
+        except IntegrityError as e:
+            if _exists(db, row):
+                failures.append(schemas.WineBulkRowResult(
+                    index=index, status="conflict", detail="Wine already exists"
+                ))
+            else:
+                failures.append(schemas.WineBulkRowResult(
+                    index=index, status="invalid", detail=str(e.orig)
+                ))
+    db.commit()
+    _index(created)
+    return len(created), failures
+
+
+def _index(rows):
+    """Add committed rows to the in-process search index."""
+    for row in rows:
+        wine_search.index.add(row["id"], row["producer"], row["label"])
+
+
+async def run_import(request: Request, db: Session, chunk_size: int) -> schemas.WineBulkResult:
+    """Stream records out of the request and import them chunk by chunk."""
+    result = schemas.WineBulkResult()
+    seen = set()
+    chunk = []
+
+    async def flush():
+        created, failures = await run_in_threadpool(import_chunk, db, chunk, seen)
+        result.created += created
+        result.failures.extend(failures)
+        chunk.clear()
+
+    index = 0
+    async for record in iter_records(request):
+        wine, failure = validate_record(index, record)
+        if failure:
+            result.failures.append(failure)
+        else:
+            chunk.append((index, wine))
+            if len(chunk) >= chunk_size:
+                await flush()
+        index += 1
+
+    if chunk:
+        await flush()
+    result.received = index
+    result.failures.sort(key=lambda row: row.index)
+    return result
@@ -0,0 +1,96 @@
+"""
+Maintenance of the critic-score aggregates in WineMetrics.
+
+avg_score and review_count are kept current as critic scores are
+created, edited and deleted: each change adjusts a running score_sum and
+review_count in a single UPDATE, so neither writes nor metrics reads ever
+scan critic_scores. rebuild() recomputes a wine from scratch with a SQL
+AVG/COUNT for repairs and the explicit /recompute endpoint.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import CriticScore, WineMetrics
+
+
+def _shift_totals(db: Session, wine_id, delta_sum, delta_count) -> int:
+    """Adjust the running totals in place; returns the number of rows updated."""
+    new_sum     = WineMetrics.score_sum + delta_sum
+    new_count   = WineMetrics.review_count + delta_count
+    return (
+        db.query(WineMetrics)
+            .filter(WineMetrics.wine_id == wine_id)
+            .update(
+                {
+                    WineMetrics.score_sum:      new_sum,
+                    WineMetrics.review_count:   new_count,
+                    WineMetrics.avg_score:      case(
+                        (new_count > 0, func.round(new_sum / new_count, 2)),
+                        else_=None
+                    ),
+                    WineMetrics.scores_changed_at: datetime.utcnow(),
+                },
+                synchronize_session=False
+            )
+    )
+
+
+def apply_score_change(
+    db: Session,
+    wine_id,
+    added: Optional[Decimal] = None,
+    removed: Optional[Decimal] = None,
+):
+    """
+    Fold a score being added and/or removed into the wine's running totals.
+    Call it after the CriticScore change itself has been made on the
+    session. The caller is responsible for committing.
+    """
+    db.flush()
+    delta_sum   = (added or 0) - (removed or 0)
+    delta_count = (added is not None) - (removed is not None)
+
+    if _shift_totals(db, wine_id, delta_sum, delta_count):
+        return
+
+    # No metrics row yet: seed it from the (already flushed) scores
+    try:
+        with db.begin_nested():
+            rebuild(db, wine_id)
+    except IntegrityError:
+        # another request created the row first
+        _shift_totals(db, wine_id, delta_sum, delta_count)
+
+
+def rebuild(db: Session, wine_id) -> WineMetrics:
+    """
+    Recompute a wine's score aggregates with SQL AVG/COUNT/SUM.
+    The caller is responsible for committing.
+    """
+    db.flush()
+    count, total, avg = (
+        db.query(
+            func.count(CriticScore.id),
+            func.coalesce(func.sum(CriticScore.score), 0),
+            func.avg(CriticScore.score),
+        )
+        .filter(CriticScore.wine_id == wine_id)
+        .one()
+    )
+
+    metrics = db.query(WineMetrics).get(wine_id)
+    if not metrics:
+        metrics = WineMetrics(wine_id=wine_id)
+        db.add(metrics)
+
+    metrics.review_count    = count
+    metrics.score_sum       = total
+    metrics.avg_score       = round(Decimal(str(avg)), 2) if count else None
+    metrics.scores_changed_at = datetime.utcnow()
+    db.flush()
+    return metrics
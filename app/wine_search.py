@@ -0,0 +1,267 @@
+"""
+Fuzzy wine search over producer and label (GET /wines/search).
+
+Every word of the query has to match a word of the producer or label.
+Matching is by trigrams, so typos ("margeaux") and prefixes ("chat marg")
+still hit. Results are ranked by how much of each query word matched.
+
+On PostgreSQL this runs in the database: pg_trgm's word-similarity
+operator (<%) against a GIN index on producer || ' ' || label (migration
+f5c1d8e2a934), one condition per query word. Both backends split the
+query with query_words(), so punctuation and accents in the query are
+treated the same way; only the in-process index also unaccents the wines.
+
+Other backends use WineIndex, a process-local inverted index:
+
+  - the words of every producer and label (lowercased, accents dropped)
+    map to the wines that contain them;
+  - the distinct words are indexed by trigram, so a query word expands
+    to its similar words by counting shared trigrams over a vocabulary
+    that is far smaller than the wine table;
+  - candidates come from the query word matching the fewest wines, its
+    best matching words first; each is scored against the other query
+    words from its own word list, and the walk stops as soon as the
+    remaining wines can't beat the current top results, so a common
+    word doesn't mean scoring half the cellar.
+
+The index loads lazily on the first search and is kept current by the
+wine routes and the bulk import (add/remove after they commit). Like the
+lookup cache it only sees this process's writes: multi-worker setups set
+WINE_SEARCH_TTL (seconds) so each worker reloads periodically.
+
+    WINE_SEARCH_THRESHOLD   share of a query word's trigrams a word must contain (default 0.5)
+    WINE_SEARCH_TTL         reload the in-process index after this many seconds (default 0: never)
+"""
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.orm import Session
+
+from app import models
+
+THRESHOLD   = float(os.getenv("WINE_SEARCH_THRESHOLD", "0.5"))
+TTL         = float(os.getenv("WINE_SEARCH_TTL", "0"))
+
+# the expression behind ix_wines_search_trgm; must match the migration exactly
+SEARCH_TEXT = models.Wine.producer + literal_column("' '") + models.Wine.label
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> List[str]:
+    """Lowercased words of `text` with accents removed ("Château" -> "chateau")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def query_words(query: str) -> List[str]:
+    """The distinct words of a search query, normalized as words() does; both backends use this."""
+    return list(dict.fromkeys(words(query)))
+
+
+def trigrams(word: str) -> set:
+    """pg_trgm-style trigrams: two spaces before the word, one after."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# --- In-process index --------------------------------------
+class WineIndex:
+    def __init__(self, threshold: float = THRESHOLD, ttl: float = TTL):
+        self.threshold  = threshold
+        self.ttl        = ttl
+        self.loaded_at  = None
+        self._lock      = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._ids       = []        # doc number -> wine id (None once removed)
+        self._docs      = {}        # wine id -> doc number
+        self._doc_words = []        # doc number -> tuple of distinct words
+        self._postings  = {}        # word -> set of doc numbers
+        self._grams     = {}        # trigram -> set of words
+        self._gram_size = {}        # word -> number of trigrams
+
+    # --- maintenance ---
+    def _add_word(self, word: str, doc: int):
+        docs = self._postings.get(word)
+        if docs is None:
+            docs = self._postings[word] = set()
+            grams = trigrams(word)
+            self._gram_size[word] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(word)
+        docs.add(doc)
+
+    def _drop_word(self, word: str, doc: int):
+        docs = self._postings[word]
+        docs.discard(doc)
+        if not docs:
+            del self._postings[word], self._gram_size[word]
+            for gram in trigrams(word):
+                vocabulary = self._grams[gram]
+                vocabulary.discard(word)
+                if not vocabulary:
+                    del self._grams[gram]
+
+    def _put(self, wine_id: uuid.UUID, producer: str, label: str):
+        self._remove(wine_id)
+        doc = len(self._ids)
+        doc_words = tuple(dict.fromkeys(words(producer) + words(label)))
+        self._ids.append(wine_id)
+        self._doc_words.append(doc_words)
+        self._docs[wine_id] = doc
+        for word in doc_words:
+            self._add_word(word, doc)
+
+    def _remove(self, wine_id: uuid.UUID):
+        doc = self._docs.pop(wine_id, None)
+        if doc is None:
+            return
+        for word in self._doc_words[doc]:
+            self._drop_word(word, doc)
+        self._ids[doc] = None
+        self._doc_words[doc] = ()
+
+    def load(self, db: Session):
+        """(Re)build from the wines table."""
+        Wine = models.Wine
+        with self._lock:
+            self._reset()
+            rows = db.query(Wine.id, Wine.producer, Wine.label).yield_per(10000)
+            for wine_id, producer, label in rows:
+                self._put(wine_id, producer, label)
+            self.loaded_at = time.monotonic()
+
+    def add(self, wine_id: uuid.UUID, producer: str, label: str):
+        """Index a created or updated wine. A no-op until the index has loaded."""
+        with self._lock:
+            if self.loaded_at is not None:
+                self._put(wine_id, producer, label)
+
+    def remove(self, wine_id: uuid.UUID):
+        with self._lock:
+            if self.loaded_at is not None:
+                self._remove(wine_id)
+
+    def _stale(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self.loaded_at > self.ttl
+
+    # --- searching ---
+    def _expand(self, token: str) -> Dict[str, Tuple[float, float]]:
+        """
+        Words similar to a query word: word -> (share of the query word's
+        trigrams it contains, trigram Jaccard similarity). The first
+        tolerates typos and prefixes; the second prefers whole-word hits.
+        """
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        matches = {}
+        for word, count in shared.items():
+            contained = count / len(grams)
+            if contained >= self.threshold:
+                matches[word] = (contained, count / (len(grams) + self._gram_size[word] - count))
+        return matches
+
+    def _score(self, doc: int, expansions: list):
+        contained = similar = 0.0
+        doc_words = self._doc_words[doc]
+        for matches in expansions:
+            best = max((matches[w] for w in doc_words if w in matches), default=None)
+            if best is None:
+                return None
+            contained += best[0]
+            similar += best[1]
+        return contained, similar
+
+    def search(self, db: Session, query: str, limit: int) -> List[uuid.UUID]:
+        with self._lock:
+            if self._stale():
+                self.load(db)
+
+            expansions = [self._expand(token) for token in query_words(query)]
+            if not expansions or not all(expansions):
+                return []
+
+            # walk the wines under the query word that covers the fewest of
+            # them, its best matching words first, and stop once no wine
+            # left can beat the current top `limit`
+            seed = min(expansions, key=lambda matches: sum(len(self._postings[w]) for w in matches))
+            others = [max(matches.values()) for matches in expansions if matches is not seed]
+            rest = (sum(best[0] for best in others), sum(best[1] for best in others))
+
+            top, seen, order = [], set(), itertools.count()
+            for word, (contained, similar) in sorted(seed.items(), key=lambda item: item[1], reverse=True):
+                bound = (contained + rest[0], similar + rest[1])
+                if len(top) >= limit and top[0][0] >= bound:
+                    break
+                for doc in self._postings[word]:
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    score = self._score(doc, expansions)
+                    if score is None:
+                        continue
+                    entry = (score, -next(order), doc)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+                    if len(top) >= limit and top[0][0] >= bound:
+                        break
+            return [self._ids[doc] for _, _, doc in sorted(top, reverse=True)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded_at is not None,
+                "wines": len(self._docs),
+                "words": len(self._postings),
+                "trigrams": len(self._grams),
+            }
+
+
+index = WineIndex()
+
+
+# --- PostgreSQL --------------------------------------------
+def _search_postgresql(db: Session, query: str, limit: int) -> List[uuid.UUID]:
+    tokens = query_words(query)
+    if not tokens:
+        return []
+    text = " ".join(tokens)
+    # applies to this transaction only; <% compares against it
+    db.execute(func.set_config("pg_trgm.word_similarity_threshold", str(THRESHOLD), True).select())
+    rows = (
+        db.query(models.Wine.id)
+            .filter(*(literal(token).op("<%")(SEARCH_TEXT) for token in tokens))
+            .order_by(
+                func.word_similarity(text, SEARCH_TEXT).desc(),
+                func.similarity(text, SEARCH_TEXT).desc(),
+                models.Wine.producer,
+                models.Wine.label,
+            )
+            .limit(limit)
+    )
+    return [wine_id for (wine_id,) in rows]
+
+
+def search(db: Session, query: str, limit: int = 20) -> List[uuid.UUID]:
+    """Ids of the best matching wines, best first."""
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgresql(db, query, limit)
+    return index.search(db, query, limit)
+
@@ -0,0 +1,9 @@
+"""
+Reproducible benchmarks.
+
+    datagen     deterministic synthetic cellars at 1k/100k/1M scan events
+    scenarios   handler-level scenarios (queries + response rendering)
+    run         generate, measure and write JSON results
+    compare     diff two result files and flag regressions
+    loadtest    concurrent HTTP scanners and dashboards (needs httpx)
+"""
@@ -0,0 +1,62 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare base.json head.json [--metric p95_ms] [--threshold 0.10]
+
+Prints one line per scenario and exits non-zero when any scenario got
+slower than the threshold allows, or issues more queries per call.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: dict, head: dict, metric: str, threshold: float) -> list:
+    """Return (scenario, base value, head value, change, regressed) rows."""
+    rows = []
+    for name, after in head["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            rows.append((name, None, after[metric], None, False))
+            continue
+        change = (after[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+        regressed = (
+            change > threshold
+            or after["queries_per_call"] > before["queries_per_call"]
+        )
+        rows.append((name, before[metric], after[metric], change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown as a fraction (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    base, head = _load(args.base), _load(args.head)
+    for key in ("scale", "seed", "dialect"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} vs {head['meta'].get(key)})",
+                  file=sys.stderr)
+
+    rows = compare(base, head, args.metric, args.threshold)
+    print(f"{'scenario':<24} {'base':>10} {'head':>10} {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        before_text = f"{before:.3f}" if before is not None else "-"
+        change_text = f"{change:+.1%}" if change is not None else "new"
+        print(f"{name:<24} {before_text:>10} {after:>10.3f} {change_text:>8}{'  REGRESSION' if regressed else ''}")
+
+    sys.exit(1 if any(row[4] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Deterministic synthetic cellar generator.
+
+The same seed and scale always produce the same rows, ids included, so
+two commits benchmarked against freshly generated databases see identical
+data. Rows go in through Core executemany in chunks; the occupancy
+projection is written from the simulated final state rather than replayed.
+"""
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+CHUNK = 5000
+
+PRODUCER_WORDS = (
+    "Chateau", "Domaine", "Bodega", "Tenuta", "Weingut", "Quinta", "Clos",
+    "Cantina", "Maison", "Estate", "Vineyards", "Cellars",
+)
+NAME_WORDS = (
+    "Rouge", "Blanc", "Reserve", "Vieilles", "Vignes", "Riserva", "Cuvee",
+    "Hill", "Stone", "River", "Oak", "Iron", "Fox", "Lark", "North", "South",
+)
+CRITICS = ("WA", "WS", "Decanter", "Vinous", "JR", "JS")
+CURRENCIES = ("USD", "EUR", "GBP")
+COMMON_SIZES = (
+    models.BottleSize.STANDARD, models.BottleSize.STANDARD, models.BottleSize.STANDARD,
+    models.BottleSize.HALF, models.BottleSize.MAGNUM,
+)
+
+
+@dataclass(frozen=True)
+class Scale:
+    countries: int
+    regions_per_country: int
+    subregions_per_region: int
+    varietals: int
+    wines: int
+    slots: int
+    events: int
+
+
+# named by the length of the scan event history
+SCALES = {
+    "1k":   Scale(countries=3,  regions_per_country=3, subregions_per_region=3, varietals=20,
+                  wines=300, slots=200, events=1_000),
+    "100k": Scale(countries=10, regions_per_country=5, subregions_per_region=4, varietals=80,
+                  wines=5_000, slots=2_000, events=100_000),
+    "1M":   Scale(countries=20, regions_per_country=8, subregions_per_region=5, varietals=150,
+                  wines=50_000, slots=10_000, events=1_000_000),
+}
+
+
+class Generator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def words(self, pool, count: int) -> str:
+        return " ".join(self.rng.choice(pool) for _ in range(count))
+
+
+class _Bag:
+    """A set with O(1) random removal, for picking slots at random."""
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.index = {item: i for i, item in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        self.index[item] = len(self.items)
+        self.items.append(item)
+
+    def pop_random(self, rng: random.Random):
+        i = rng.randrange(len(self.items))
+        item, last = self.items[i], self.items[-1]
+        self.items[i] = last
+        self.index[last] = i
+        self.items.pop()
+        del self.index[item]
+        return item
+
+
+def _insert(db: Session, table, rows: list):
+    for start in range(0, len(rows), CHUNK):
+        db.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def generate(db: Session, scale: Scale, seed: int = 42) -> dict:
+    """
+    Fill an empty schema with a synthetic cellar and commit.
+    Returns row counts per table.
+    """
+    gen = Generator(seed)
+    rng = gen.rng
+
+    # lookups
+    countries, regions, subregions = [], [], []
+    for c in range(scale.countries):
+        country = {"id": gen.uuid(), "name": f"Country {c:03d}"}
+        countries.append(country)
+        for r in range(scale.regions_per_country):
+            region = {"id": gen.uuid(), "name": f"Region {c:03d}-{r:02d}", "country_id": country["id"]}
+            regions.append(region)
+            for s in range(scale.subregions_per_region):
+                subregions.append({
+                    "id": gen.uuid(),
+                    "name": f"Subregion {c:03d}-{r:02d}-{s:02d}",
+                    "region_id": region["id"],
+                })
+    varietals = [{"id": gen.uuid(), "name": f"Varietal {v:03d}"} for v in range(scale.varietals)]
+    region_country = {region["id"]: region["country_id"] for region in regions}
+    subregion_region = {sub["id"]: sub["region_id"] for sub in subregions}
+
+    # wines, blends, purchases and scores
+    wines, blends, purchases, scores = [], [], [], []
+    seen = set()
+    while len(wines) < scale.wines:
+        producer = f"{rng.choice(PRODUCER_WORDS)} {gen.words(NAME_WORDS, 2)}"
+        label = gen.words(NAME_WORDS, rng.randint(1, 3))
+        vintage = rng.randint(1970, 2024)
+        bottle_size = rng.choice(COMMON_SIZES)
+        if (producer, label, vintage, bottle_size) in seen:
+            continue
+        seen.add((producer, label, vintage, bottle_size))
+
+        subregion_id = rng.choice(subregions)["id"]
+        region_id = subregion_region[subregion_id]
+        wine_id = gen.uuid()
+        wines.append({
+            "id": wine_id,
+            "producer": producer,
+            "label": label,
+            "vintage": vintage,
+            "country_id": region_country[region_id],
+            "region_id": region_id,
+            "subregion_id": subregion_id,
+            "classification_id": None,
+            "bottle_size": bottle_size,
+            "closure_type": models.ClosureType.CORK if rng.random() < 0.8 else models.ClosureType.SCREW_CAP,
+            "abv": Decimal(rng.randint(110, 155)) / 10,
+        })
+
+        # blends of one to three varietals adding up to 100%
+        parts = rng.sample(varietals, rng.choice((1, 1, 2, 3)))
+        remaining = Decimal(100)
+        for i, varietal in enumerate(parts):
+            pct = remaining if i == len(parts) - 1 else Decimal(rng.randint(10, int(remaining) - 10 * (len(parts) - i - 1)))
+            remaining -= pct
+            blends.append({"wine_id": wine_id, "varietal_id": varietal["id"], "blend_pct": pct})
+
+        for _ in range(rng.randint(1, 3)):
+            purchases.append({
+                "id": gen.uuid(),
+                "wine_id": wine_id,
+                "purchase_date": date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+                "price_amount": Decimal(rng.randint(800, 50000)) / 100,
+                "price_currency": rng.choice(CURRENCIES),
+                "receipt_url": None,
+            })
+        for _ in range(rng.randint(0, 4)):
+            scores.append({
+                "id": gen.uuid(),
+                "wine_id": wine_id,
+                "source": rng.choice(CRITICS),
+                "score": Decimal(rng.randint(8000, 10000)) / 100,
+                "review_date": date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+            })
+
+    # slots: racks of 20 rows, one LED node per rack; rack labels are
+    # numeric because CellarSlotRead declares rack as an int
+    slots = [
+        {"id": gen.uuid(), "rack": f"{n // 20:04d}", "row": n % 20, "led_node_id": f"node-{n // 20:04d}"}
+        for n in range(scale.slots)
+    ]
+
+    # scan history: simulate bottles moving in and out so every event is valid
+    events = []
+    free = _Bag(slot["id"] for slot in slots)
+    occupied = _Bag()
+    held = {}                               # slot_id -> wine_id
+    cellared = set()                        # wines currently in a slot
+    last_event = {}                         # slot_id -> (event_id, timestamp)
+    wine_ids = [wine["id"] for wine in wines]
+    clock = datetime(2020, 1, 1)
+    for _ in range(scale.events):
+        clock += timedelta(seconds=rng.randint(1, 600))
+        # keep the cellar around two thirds full
+        take_out = held and (not free or rng.random() < len(held) / scale.slots * 0.75)
+        if take_out:
+            slot_id = occupied.pop_random(rng)
+            wine_id = held.pop(slot_id)
+            cellared.discard(wine_id)
+            free.add(slot_id)
+            event_type = models.EventTypeEnum.OUT
+        else:
+            wine_id = rng.choice(wine_ids)
+            while wine_id in cellared:
+                wine_id = rng.choice(wine_ids)
+            slot_id = free.pop_random(rng)
+            occupied.add(slot_id)
+            held[slot_id] = wine_id
+            cellared.add(wine_id)
+            event_type = models.EventTypeEnum.IN
+
+        event_id = gen.uuid()
+        events.append({
+            "id": event_id,
+            "wine_id": wine_id,
+            "slot_id": slot_id,
+            "event_type": event_type,
+            "timestamp": clock,
+        })
+        last_event[slot_id] = (event_id, clock)
+
+    occupancy = [
+        {
+            "slot_id": slot["id"],
+            "wine_id": held.get(slot["id"]),
+            "last_event_id": last_event.get(slot["id"], (None, None))[0],
+            "last_event_at": last_event.get(slot["id"], (None, None))[1],
+        }
+        for slot in slots
+    ]
+
+    tables = (
+        (models.Country.__table__, countries),
+        (models.Region.__table__, regions),
+        (models.Subregion.__table__, subregions),
+        (models.Varietal.__table__, varietals),
+        (models.Wine.__table__, wines),
+        (models.wine_varietals, blends),
+        (models.Purchase.__table__, purchases),
+        (models.CriticScore.__table__, scores),
+        (models.CellarSlot.__table__, slots),
+        (models.ScanEvent.__table__, events),
+        (models.SlotOccupancy.__table__, occupancy),
+    )
+    for table, rows in tables:
+        _insert(db, table, rows)
+    db.commit()
+    return {table.name: len(rows) for table, rows in tables}
@@ -0,0 +1,281 @@
+"""
+HTTP load test: concurrent barcode scanners and dashboard clients.
+
+    # in-process, against DATABASE_URL (e.g. a cellar from benchmarks.run)
+    python -m benchmarks.loadtest --database-url sqlite:///bench.sqlite3 --clients 32
+
+    # over the network, against a running server
+    python -m benchmarks.loadtest --base-url http://localhost:8000 --clients 64 \\
+        --duration 60 --mix slot_in=4,slot_out=4,search_lookup=2,list_wines=1
+
+Each client loops for --duration seconds, picking an operation from the
+weighted --mix. Scanners share one picture of the cellar: slot_in takes a
+random slot (so two scanners can race for the same one) and slot_out
+removes a wine some scanner put in. The report gives latency percentiles,
+throughput, error rate and occupancy conflict rate per operation.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+
+import httpx
+
+DEFAULT_MIX = "slot_in=3,slot_out=3,scan_in=1,search_bottle=1,search_lookup=3,list_wines=1,create_purchase=1"
+
+
+def _percentile(ordered: list, q: float):
+    if not ordered:
+        return None
+    rank = math.ceil(q * len(ordered)) - 1
+    return round(ordered[max(0, min(len(ordered) - 1, rank))], 3)
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = [name for name in mix if name not in OPERATIONS]
+    if unknown:
+        raise ValueError(f"unknown operation(s): {', '.join(unknown)}")
+    return mix
+
+
+def is_conflict(response: httpx.Response) -> bool:
+    """A lost race for a slot: 409, or the older 400 "Slot is occupied"."""
+    if response.status_code == 409:
+        return True
+    if response.status_code == 400:
+        try:
+            return response.json().get("detail") == "Slot is occupied"
+        except ValueError:
+            return False
+    return False
+
+
+class Cellar:
+    """What the clients know about the data: ids to use and which wines are slotted."""
+    def __init__(self, rng: random.Random, wines: list, slots: list):
+        self.rng = rng
+        self.wine_ids = [wine["id"] for wine in wines]
+        self.region_ids = sorted({wine["region"]["id"] for wine in wines})
+        self.slot_ids = [slot["id"] for slot in slots]
+        self.slotted = []                   # wines put in by this run
+
+    @classmethod
+    async def discover(cls, client: httpx.AsyncClient, rng: random.Random, max_rows: int) -> "Cellar":
+        async def fetch(path):
+            rows, cursor = [], None
+            while len(rows) < max_rows:
+                params = {"limit": min(500, max_rows - len(rows))}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+                rows.extend(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            return rows
+
+        wines, slots = await fetch("/wines"), await fetch("/cellar-slots")
+        if not wines or not slots:
+            raise SystemExit("the target has no wines or no cellar slots; generate data first")
+        return cls(rng, wines, slots)
+
+
+# --- Operations -------------------------------------------
+# each returns the response; Cellar state is updated on success
+
+async def slot_in(client, cellar):
+    wine_id = cellar.rng.choice(cellar.wine_ids)
+    response = await client.post("/cellar-slots/slot-in", params={
+        "wine_id": wine_id, "slot_id": cellar.rng.choice(cellar.slot_ids),
+    })
+    if response.status_code == 201:
+        cellar.slotted.append(wine_id)
+    return response
+
+
+async def slot_out(client, cellar):
+    if cellar.slotted:
+        wine_id = cellar.slotted.pop(cellar.rng.randrange(len(cellar.slotted)))
+    else:
+        wine_id = cellar.rng.choice(cellar.wine_ids)
+    return await client.post("/cellar-slots/slot-out", params={"wine_id": wine_id})
+
+
+async def scan_in(client, cellar):
+    return await client.post("/cellar-slots/scan-in", params={"wine_id": cellar.rng.choice(cellar.wine_ids)})
+
+
+async def search_bottle(client, cellar):
+    wine_id = cellar.rng.choice(cellar.slotted or cellar.wine_ids)
+    return await client.post("/cellar-slots/search-bottle", params={"wine_id": wine_id})
+
+
+async def search_lookup(client, cellar):
+    return await client.post("/cellar-slots/search-lookup", params={"region_id": cellar.rng.choice(cellar.region_ids)})
+
+
+async def list_wines(client, cellar):
+    return await client.get("/wines", params={"limit": 100})
+
+
+async def create_purchase(client, cellar):
+    return await client.post("/purchases", json={
+        "wine_id": cellar.rng.choice(cellar.wine_ids),
+        "purchase_date": date.today().isoformat(),
+        "price_amount": f"{cellar.rng.randint(800, 20000) / 100:.2f}",
+        "price_currency": "USD",
+    })
+
+
+OPERATIONS = {
+    "slot_in": slot_in,
+    "slot_out": slot_out,
+    "scan_in": scan_in,
+    "search_bottle": search_bottle,
+    "search_lookup": search_lookup,
+    "list_wines": list_wines,
+    "create_purchase": create_purchase,
+}
+
+
+# --- Driver -----------------------------------------------
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)      # operation -> ms
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)          # 5xx and transport failures
+        self.conflicts = defaultdict(int)
+
+    def record(self, operation: str, elapsed: float, response: httpx.Response = None):
+        self.latencies[operation].append(elapsed * 1000)
+        if response is None:
+            self.errors[operation] += 1
+            self.statuses[operation]["error"] += 1
+            return
+        self.statuses[operation][str(response.status_code)] += 1
+        if response.status_code >= 500:
+            self.errors[operation] += 1
+        elif is_conflict(response):
+            self.conflicts[operation] += 1
+
+    def report(self, elapsed: float, clients: int, mix: dict) -> dict:
+        operations = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            count = len(latencies)
+            operations[operation] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 1),
+                "p50_ms": _percentile(latencies, 0.50),
+                "p95_ms": _percentile(latencies, 0.95),
+                "p99_ms": _percentile(latencies, 0.99),
+                "error_rate": round(self.errors[operation] / count, 4),
+                "conflict_rate": round(self.conflicts[operation] / count, 4),
+                "statuses": dict(self.statuses[operation]),
+            }
+
+        everything = sorted(ms for latencies in self.latencies.values() for ms in latencies)
+        total = len(everything)
+        return {
+            "clients": clients,
+            "duration_seconds": round(elapsed, 2),
+            "mix": mix,
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "p50_ms": _percentile(everything, 0.50),
+            "p95_ms": _percentile(everything, 0.95),
+            "p99_ms": _percentile(everything, 0.99),
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else None,
+            "conflict_rate": round(sum(self.conflicts.values()) / total, 4) if total else None,
+            "operations": operations,
+        }
+
+
+async def client_loop(client, cellar, mix: dict, deadline: float, results: Results, seed: int):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        operation = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await OPERATIONS[operation](client, cellar)
+        except httpx.HTTPError:
+            response = None
+        results.record(operation, time.perf_counter() - started, response)
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.clients))
+    else:
+        # app.database builds its engine at import time
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        from app import led
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://loadtest", timeout=args.timeout)
+        # ASGITransport doesn't run startup hooks; LED commands need the worker
+        await led.dispatcher.start()
+
+    async with client:
+        rng = random.Random(args.seed)
+        cellar = await Cellar.discover(client, rng, args.max_rows)
+        results = Results()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            client_loop(client, cellar, mix, deadline, results, args.seed + n)
+            for n in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+    if not args.base_url:
+        await led.dispatcher.stop()
+    return results.report(elapsed, args.clients, mix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", help="load a running server instead of the app in-process")
+    target.add_argument("--database-url", help="DATABASE_URL for the in-process app")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,...")
+    parser.add_argument("--max-rows", type=int, default=5000,
+                        help="wines and slots to discover before starting")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if report["requests"] == 0:
+        sys.exit("no requests completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Run the benchmark scenarios against a generated cellar and write JSON.
+
+    python -m benchmarks.run --database-url sqlite:///bench.sqlite3 --scale 1k
+    python -m benchmarks.run --database-url postgresql://localhost/cellar_bench \\
+        --scale 100k --output results/100k-$(git rev-parse --short HEAD).json
+
+The target database is dropped and regenerated unless --skip-generate is
+given, so never point it at real data. Compare two result files with
+`python -m benchmarks.compare`.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def _percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(q * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, rank))]
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(session_factory, scenario, fixture, iterations: int, warmup: int) -> dict:
+    """Time one scenario; every call gets a fresh session, like a request would."""
+    from app import instrumentation
+
+    def once():
+        db = session_factory()
+        try:
+            with instrumentation.track() as stats:
+                started = time.perf_counter()
+                scenario.run(db, fixture)
+                elapsed = time.perf_counter() - started
+            if scenario.reset is not None:
+                scenario.reset(db, fixture)
+        finally:
+            db.close()
+        return elapsed, stats.query_count
+
+    for _ in range(warmup):
+        once()
+
+    timings, queries = [], []
+    for _ in range(iterations):
+        elapsed, count = once()
+        timings.append(elapsed * 1000)
+        queries.append(count)
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(_percentile(timings, 0.50), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "p99_ms": round(_percentile(timings, 0.99), 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+        "queries_per_call": round(sum(queries) / len(queries), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--database-url", default="sqlite:///bench.sqlite3",
+                        help="database to generate into and benchmark (it is dropped first)")
+    parser.add_argument("--scale", default="1k", help="1k, 100k or 1M scan events")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--heavy-iterations", type=int, default=5,
+                        help="iterations for whole-cellar jobs such as recompute_all_metrics")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--skip-generate", action="store_true",
+                        help="reuse data generated by an earlier run with the same scale and seed")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # app.database builds its engine at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.pop("DB_ASYNC", None)
+    from app.database import Base, SessionLocal, engine
+    from benchmarks import datagen
+    from benchmarks.scenarios import SCENARIOS, Fixture
+
+    if args.scale not in datagen.SCALES:
+        parser.error(f"unknown scale {args.scale!r}; choose from {', '.join(datagen.SCALES)}")
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    rows = None
+    if not args.skip_generate:
+        print(f"Generating {args.scale} cellar (seed {args.seed})...", file=sys.stderr)
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            rows = datagen.generate(db, datagen.SCALES[args.scale], seed=args.seed)
+        finally:
+            db.close()
+
+    db = SessionLocal()
+    try:
+        fixture = Fixture.load(db)
+    finally:
+        db.close()
+
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        iterations = args.heavy_iterations if scenario.heavy else args.iterations
+        print(f"  {name} x{iterations}", file=sys.stderr)
+        results[name] = measure(SessionLocal, scenario, fixture, iterations, args.warmup)
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "rows": rows,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
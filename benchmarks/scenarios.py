@@ -0,0 +1,190 @@
+"""
+Benchmark scenarios.
+
+Each scenario calls a route handler directly with its own session, then
+renders the result through the route's response model, so a measurement
+covers the queries and the serialization but not HTTP. Scenarios that
+write get a reset step, run outside the timed section, that puts the
+cellar back the way it was.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Response
+from pydantic import parse_obj_as
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import metrics_job, models, occupancy
+from app.routers import cellar_slots, critic_scores, metrics, purchases, scan_events, wines
+from app.schemas import ColorMapFormat
+
+
+@dataclass
+class Fixture:
+    """Ids the scenarios work with, picked deterministically from the generated data."""
+    cellared_wine: object       # a wine currently in a slot
+    cellared_slot: object       # the slot holding it
+    region_id: object           # that wine's region
+    varietal_id: object         # a varietal of some wine
+    free_slot: object           # an empty slot
+    loose_wine: object          # a wine that is not in the cellar
+    scored_wine: object         # a wine with critic scores
+    search_text: str            # the cellared wine's producer, last letter dropped
+
+    @classmethod
+    def load(cls, db: Session) -> "Fixture":
+        Occ = models.SlotOccupancy
+        cellared = db.execute(
+            select(Occ.wine_id).where(Occ.wine_id.isnot(None)).order_by(Occ.slot_id).limit(1)
+        ).scalar()
+        in_cellar = select(Occ.wine_id).where(Occ.wine_id.isnot(None))
+        return cls(
+            cellared_wine = cellared,
+            cellared_slot = db.execute(
+                select(Occ.slot_id).where(Occ.wine_id == cellared).order_by(Occ.slot_id).limit(1)
+            ).scalar(),
+            region_id = db.execute(
+                select(models.Wine.region_id).where(models.Wine.id == cellared)
+            ).scalar(),
+            varietal_id = db.execute(
+                select(models.wine_varietals.c.varietal_id)
+                    .order_by(models.wine_varietals.c.wine_id, models.wine_varietals.c.varietal_id)
+                    .limit(1)
+            ).scalar(),
+            free_slot = db.execute(
+                select(Occ.slot_id).where(Occ.wine_id.is_(None)).order_by(Occ.slot_id).limit(1)
+            ).scalar(),
+            loose_wine = db.execute(
+                select(models.Wine.id).where(models.Wine.id.notin_(in_cellar))
+                    .order_by(models.Wine.id).limit(1)
+            ).scalar(),
+            scored_wine = db.execute(
+                select(models.CriticScore.wine_id).order_by(models.CriticScore.wine_id).limit(1)
+            ).scalar(),
+            search_text = db.execute(
+                select(models.Wine.producer).where(models.Wine.id == cellared)
+            ).scalar()[:-1],
+        )
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[Session, Fixture], object]
+    reset: Optional[Callable[[Session, Fixture], None]] = None
+    heavy: bool = False         # whole-cellar jobs: run.py caps their iterations
+
+
+def _render(router, handler: str, result):
+    """Validate a handler result against its route's response model, as FastAPI would."""
+    if isinstance(result, Response):
+        return result
+    for route in router.routes:
+        if getattr(route, "name", None) == handler and route.response_model is not None:
+            return parse_obj_as(route.response_model, result)
+    return result
+
+
+def list_wines(db, fx):
+    page = wines.list_wines(response=Response(), skip=0, limit=100, cursor=None, db=db)
+    return _render(wines.router, "list_wines", page)
+
+
+def search_wines(db, fx):
+    found = wines.search_wines(q=fx.search_text, limit=20, db=db)
+    return _render(wines.router, "search_wines", found)
+
+
+def search_bottle(db, fx):
+    colors = cellar_slots.search_bottle(
+        wine_id=fx.cellared_wine, response=Response(), format=ColorMapFormat.FULL, if_none_match=None, db=db
+    )
+    return _render(cellar_slots.router, "search_bottle", colors)
+
+
+def search_lookup(db, fx):
+    colors = cellar_slots.search_lookup(
+        response=Response(), country_id=None, region_id=fx.region_id, subregion_id=None,
+        varietal_id=None, format=ColorMapFormat.FULL, if_none_match=None, db=db
+    )
+    return _render(cellar_slots.router, "search_lookup", colors)
+
+
+def scan_in_suggestions(db, fx):
+    colors = cellar_slots.scan_in_suggestions(
+        wine_id=fx.cellared_wine, response=Response(), format=ColorMapFormat.FULL, if_none_match=None, db=db
+    )
+    return _render(cellar_slots.router, "scan_in_suggestions", colors)
+
+
+def search_lookup_rle(db, fx):
+    color_map = cellar_slots.search_lookup(
+        response=Response(), country_id=None, region_id=fx.region_id, subregion_id=None,
+        varietal_id=None, format=ColorMapFormat.RLE, if_none_match=None, db=db
+    )
+    return _render(cellar_slots.router, "search_lookup", color_map)
+
+
+def slot_in_wine(db, fx):
+    event = cellar_slots.slot_in_wine(wine_id=fx.loose_wine, slot_id=fx.free_slot, db=db)
+    return _render(cellar_slots.router, "slot_in_wine", event)
+
+
+def take_loose_wine_out(db, fx):
+    cellar_slots.slot_out_wine(wine_id=fx.loose_wine, db=db)
+
+
+def replay_slot(db, fx):
+    # latest event of one slot; the session is closed without committing
+    return occupancy.replay_slot(db, fx.cellared_slot)
+
+
+def wine_history(db, fx):
+    return occupancy.has_history(db, fx.loose_wine, models.EventTypeEnum.OUT)
+
+
+def list_scan_events(db, fx):
+    page = scan_events.list_scan_events(response=Response(), skip=0, limit=100, cursor=None, db=db)
+    return _render(scan_events.router, "list_scan_events", page)
+
+
+def list_critic_scores(db, fx):
+    page = critic_scores.list_critic_scores(
+        response=Response(), wine_id=fx.scored_wine, skip=0, limit=100, cursor=None, db=db
+    )
+    return _render(critic_scores.router, "list_critic_scores", page)
+
+
+def list_purchases(db, fx):
+    page = purchases.list_purchases(response=Response(), skip=0, limit=100, cursor=None, db=db)
+    return _render(purchases.router, "list_purchases", page)
+
+
+def recompute_metrics(db, fx):
+    row = metrics.recompute_metrics(wine_id=fx.scored_wine, db=db)
+    return _render(metrics.router, "recompute_metrics", row)
+
+
+def recompute_all_metrics(db, fx):
+    return metrics_job.recompute_all(db)
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario("list_wines", list_wines),
+        Scenario("search_wines", search_wines),
+        Scenario("search_bottle", search_bottle),
+        Scenario("search_lookup", search_lookup),
+        Scenario("search_lookup_rle", search_lookup_rle),
+        Scenario("scan_in_suggestions", scan_in_suggestions),
+        Scenario("slot_in_wine", slot_in_wine, reset=take_loose_wine_out),
+        Scenario("replay_slot", replay_slot),
+        Scenario("wine_history", wine_history),
+        Scenario("list_scan_events", list_scan_events),
+        Scenario("list_critic_scores", list_critic_scores),
+        Scenario("list_purchases", list_purchases),
+        Scenario("recompute_metrics", recompute_metrics),
+        Scenario("recompute_all_metrics", recompute_all_metrics, heavy=True),
+    )
+}
@@ -0,0 +1,44 @@
+"""Add access path indexes on scan_events, critic_scores and purchases
+
+Revision ID: a7d3e9f1c245
+Revises: f5c1d8e2a934
+Create Date: 2026-10-17 16:05:52.914473
+
+On PostgreSQL the indexes are built CONCURRENTLY, outside the migration
+transaction, so writers are not blocked while they build. If a build
+fails it leaves an INVALID index behind: drop it and run the upgrade again.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9f1c245'
+down_revision: Union[str, Sequence[str], None] = 'f5c1d8e2a934'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_scan_events_slot_id_timestamp', 'scan_events', ['slot_id', sa.text('"timestamp" DESC')]),
+    ('ix_scan_events_wine_id_event_type_timestamp', 'scan_events', ['wine_id', 'event_type', sa.text('"timestamp" DESC')]),
+    ('ix_scan_events_timestamp_id', 'scan_events', ['timestamp', 'id']),
+    ('ix_critic_scores_wine_id_id', 'critic_scores', ['wine_id', 'id']),
+    ('ix_purchases_wine_id', 'purchases', ['wine_id']),
+    ('ix_purchases_purchase_date_id', 'purchases', ['purchase_date', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,55 @@
+"""Add slot_occupancy projection
+
+Revision ID: b41e7c2d9a10
+Revises: d928168c82e6
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7c2d9a10'
+down_revision: Union[str, Sequence[str], None] = 'd928168c82e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('slot_occupancy',
+    sa.Column('slot_id', sa.UUID(), nullable=False),
+    sa.Column('wine_id', sa.UUID(), nullable=True),
+    sa.Column('last_event_id', sa.UUID(), nullable=True),
+    sa.Column('last_event_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['slot_id'], ['cellar_slots.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wine_id'], ['wines.id'], ),
+    sa.ForeignKeyConstraint(['last_event_id'], ['scan_events.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('slot_id')
+    )
+    op.create_index(op.f('ix_slot_occupancy_wine_id'), 'slot_occupancy', ['wine_id'], unique=False)
+
+    # Backfill: one row per slot, filled from that slot's latest event.
+    # `python -m app.cli rebuild-occupancy` does the same thing on demand.
+    op.execute("""
+        INSERT INTO slot_occupancy (slot_id, wine_id, last_event_id, last_event_at)
+        SELECT s.id,
+               CASE WHEN e.event_type = 'IN' THEN e.wine_id END,
+               e.id,
+               e.timestamp
+          FROM cellar_slots s
+          LEFT JOIN (
+                SELECT DISTINCT ON (slot_id) id, slot_id, wine_id, event_type, timestamp
+                  FROM scan_events
+                 ORDER BY slot_id, timestamp DESC
+          ) e ON e.slot_id = s.id;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_slot_occupancy_wine_id'), table_name='slot_occupancy')
+    op.drop_table('slot_occupancy')
@@ -0,0 +1,47 @@
+"""Add updated_at to wines, purchases, critic_scores and scan_events
+
+Revision ID: b8e4f0a2d356
+Revises: a7d3e9f1c245
+Create Date: 2026-10-17 17:12:30.604918
+
+The incremental analytics snapshot (app/snapshot.py) exports rows whose
+updated_at passed its watermark. Existing rows are stamped with the
+migration time, so the first incremental run after upgrading exports
+everything once.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f0a2d356'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e9f1c245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('wines', 'purchases', 'critic_scores', 'scan_events')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the app writes naive UTC (datetime.utcnow)
+    now = "timezone('utc', now())" if op.get_bind().dialect.name == 'postgresql' else "CURRENT_TIMESTAMP"
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = {now}")
+
+    # built outside the transaction so writers aren't blocked (see a7d3e9f1c245)
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_updated_at', table_name=table, postgresql_concurrently=True)
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,42 @@
+"""Add running score_sum to wine_metrics
+
+Revision ID: c5a09e3f7b21
+Revises: b41e7c2d9a10
+Create Date: 2026-10-17 10:41:03.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a09e3f7b21'
+down_revision: Union[str, Sequence[str], None] = 'b41e7c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('wine_metrics',
+        sa.Column('score_sum', sa.Numeric(precision=12, scale=2), nullable=False, server_default='0')
+    )
+
+    # Seed the running totals so incremental updates start from the truth
+    op.execute("""
+        INSERT INTO wine_metrics (wine_id, review_count, score_sum, avg_score)
+        SELECT wine_id, COUNT(*), SUM(score), ROUND(AVG(score), 2)
+          FROM critic_scores
+         GROUP BY wine_id
+        ON CONFLICT (wine_id) DO UPDATE
+           SET review_count = EXCLUDED.review_count,
+               score_sum    = EXCLUDED.score_sum,
+               avg_score    = EXCLUDED.avg_score;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('wine_metrics', 'score_sum')
@@ -0,0 +1,45 @@
+"""Add keyset sort indexes on wines, regions, subregions and classifications
+
+Revision ID: c9f2b6d4e183
+Revises: b8e4f0a2d356
+Create Date: 2026-10-18 09:42:17.226051
+
+Each list route pages in its own keyset order; these cover the ones no
+existing index did. Countries and varietals need none: their names are
+unique, so the unique index on name already gives the order.
+
+Built CONCURRENTLY on PostgreSQL, like a7d3e9f1c245: if a build fails it
+leaves an INVALID index behind, drop it and run the upgrade again.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f2b6d4e183'
+down_revision: Union[str, Sequence[str], None] = 'b8e4f0a2d356'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_wines_producer_label_vintage_id', 'wines', ['producer', 'label', 'vintage', 'id']),
+    ('ix_regions_name_id', 'regions', ['name', 'id']),
+    ('ix_subregions_name_id', 'subregions', ['name', 'id']),
+    ('ix_classifications_name_id', 'classifications', ['name', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,106 @@
+"""Touch wines.updated_at when a wine's blend changes
+
+Revision ID: d2e6a9c4f170
+Revises: c9f2b6d4e183
+Create Date: 2026-10-17 22:31:05.118240
+
+wine_varietals has no updated_at, so the incremental snapshot
+(app/snapshot.py) follows the wine's. These triggers (also created by
+models.WINE_VARIETALS_TRIGGERS for new databases) stamp the wine whenever
+its blend rows change or one of its varietals is renamed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e6a9c4f170'
+down_revision: Union[str, Sequence[str], None] = 'c9f2b6d4e183'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRESQL = (
+    """
+    CREATE OR REPLACE FUNCTION touch_blended_wine() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE wines SET updated_at = timezone('utc', now()) WHERE id = OLD.wine_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            UPDATE wines SET updated_at = timezone('utc', now()) WHERE id = NEW.wine_id;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER wine_varietals_touch_wine
+    AFTER INSERT OR UPDATE OR DELETE ON wine_varietals
+    FOR EACH ROW EXECUTE FUNCTION touch_blended_wine()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION touch_varietal_wines() RETURNS trigger AS $$
+    BEGIN
+        UPDATE wines SET updated_at = timezone('utc', now())
+        WHERE id IN (SELECT wine_id FROM wine_varietals WHERE varietal_id = NEW.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER varietals_touch_wines
+    AFTER UPDATE OF name ON varietals
+    FOR EACH ROW EXECUTE FUNCTION touch_varietal_wines()
+    """,
+)
+
+SQLITE = (
+    """
+    CREATE TRIGGER wine_varietals_touch_wine_insert AFTER INSERT ON wine_varietals
+    BEGIN
+        UPDATE wines SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.wine_id;
+    END
+    """,
+    """
+    CREATE TRIGGER wine_varietals_touch_wine_update AFTER UPDATE ON wine_varietals
+    BEGIN
+        UPDATE wines SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id IN (OLD.wine_id, NEW.wine_id);
+    END
+    """,
+    """
+    CREATE TRIGGER wine_varietals_touch_wine_delete AFTER DELETE ON wine_varietals
+    BEGIN
+        UPDATE wines SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = OLD.wine_id;
+    END
+    """,
+    """
+    CREATE TRIGGER varietals_touch_wines AFTER UPDATE OF name ON varietals
+    BEGIN
+        UPDATE wines SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+        WHERE id IN (SELECT wine_id FROM wine_varietals WHERE varietal_id = NEW.id);
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for statement in POSTGRESQL if dialect == 'postgresql' else SQLITE if dialect == 'sqlite' else ():
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS varietals_touch_wines ON varietals")
+        op.execute("DROP TRIGGER IF EXISTS wine_varietals_touch_wine ON wine_varietals")
+        op.execute("DROP FUNCTION IF EXISTS touch_varietal_wines()")
+        op.execute("DROP FUNCTION IF EXISTS touch_blended_wine()")
+    elif dialect == 'sqlite':
+        for name in (
+            'varietals_touch_wines', 'wine_varietals_touch_wine_delete',
+            'wine_varietals_touch_wine_update', 'wine_varietals_touch_wine_insert',
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
@@ -0,0 +1,30 @@
+"""Track wine_metrics freshness
+
+Revision ID: d3f18a6c0e57
+Revises: c5a09e3f7b21
+Create Date: 2026-10-17 11:26:58.301446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f18a6c0e57'
+down_revision: Union[str, Sequence[str], None] = 'c5a09e3f7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('wine_metrics', sa.Column('scores_changed_at', sa.DateTime(), nullable=True))
+    op.add_column('wine_metrics', sa.Column('computed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('wine_metrics', 'computed_at')
+    op.drop_column('wine_metrics', 'scores_changed_at')
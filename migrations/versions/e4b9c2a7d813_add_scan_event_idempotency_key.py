@@ -0,0 +1,30 @@
+"""Add scan event idempotency key
+
+Revision ID: e4b9c2a7d813
+Revises: d3f18a6c0e57
+Create Date: 2026-10-17 14:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c2a7d813'
+down_revision: Union[str, Sequence[str], None] = 'd3f18a6c0e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_events', sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uix_scan_event_idempotency_key', 'scan_events', ['idempotency_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uix_scan_event_idempotency_key', 'scan_events', type_='unique')
+    op.drop_column('scan_events', 'idempotency_key')
@@ -0,0 +1,37 @@
+"""Add wine search trigram index
+
+Revision ID: f5c1d8e2a934
+Revises: e4b9c2a7d813
+Create Date: 2026-10-17 15:21:08.340117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1d8e2a934'
+down_revision: Union[str, Sequence[str], None] = 'e4b9c2a7d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL only; other backends search with the in-process index (app/wine_search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_wines_search_trgm ON wines "
+        "USING gin ((producer || ' ' || label) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_wines_search_trgm")
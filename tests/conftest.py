@@ -0,0 +1,78 @@
+"""
+Shared fixtures: a throwaway SQLite cellar built with the benchmark data
+generator. DATABASE_URL has to be set before anything imports app.database,
+which builds its engine at import time.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="cellar-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.sqlite3')}"
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import Base, SessionLocal, engine
+from benchmarks import datagen
+
+# big enough for a 50-row page of wines, purchases and scan events
+TEST_SCALE = datagen.Scale(
+    countries=2, regions_per_country=2, subregions_per_region=2, varietals=10,
+    wines=120, slots=80, events=300,
+)
+
+
+@pytest.fixture(scope="session")
+def cellar():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = datagen.generate(db, TEST_SCALE, seed=7)
+        # the generator leaves classifications empty; list routes need a row
+        country = db.query(models.Country).order_by(models.Country.name).first()
+        db.add_all([
+            models.Classification(name="Grand Cru", country_id=country.id),
+            models.Classification(name="Premier Cru", country_id=country.id),
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return counts
+
+
+@pytest.fixture
+def db(cellar):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def client(cellar):
+    """The app over HTTP, without its startup hooks (LED worker, stream broker)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def enforced_fks(cellar):
+    """
+    A session on one connection that checks foreign keys: SQLite only does
+    when asked to, per connection and outside a transaction.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.commit()
+        session = Session(bind=conn)
+        try:
+            yield session
+        finally:
+            session.close()
+            conn.rollback()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
@@ -0,0 +1,58 @@
+"""
+asyncify'd routers (DB_ASYNC) against the same cellar through sqlite+aiosqlite.
+Skipped when the async driver isn't installed (requirements-optional.txt).
+"""
+import os
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import database, models
+from app.async_routes import asyncify
+from app.routers.cellar_slots import router as cellar_slots_router
+from app.routers.scan_events import router as scan_events_router
+from app.routers.wines import router as wines_router
+from tests.test_occupancy import free_slot, loose_wine, slot_in
+
+
+@pytest.fixture
+def async_client(cellar):
+    engine = create_async_engine(database._async_url(os.environ["DATABASE_URL"]))
+    sessions = async_sessionmaker(engine, autocommit=False, autoflush=False)
+
+    async def get_async_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    for router in (wines_router, cellar_slots_router, scan_events_router):
+        app.include_router(asyncify(router))
+    app.dependency_overrides[database.get_async_db] = get_async_db
+    with TestClient(app) as client:
+        yield client
+    engine.sync_engine.dispose()
+
+
+@pytest.mark.parametrize("path", ["/wines", "/cellar-slots", "/scan-events"])
+def test_async_reads_match_sync(async_client, client, path):
+    response = async_client.get(path, params={"limit": 20})
+    assert response.status_code == 200
+    assert response.json() == client.get(path, params={"limit": 20}).json()
+
+
+def test_async_slot_in_commits(async_client, db):
+    slot_id = free_slot(db).slot_id
+    wine = loose_wine(db)
+
+    response = slot_in(async_client, wine.id, slot_id)
+
+    assert response.status_code == 201
+    assert response.json()["wine"]["id"] == str(wine.id)
+    db.expire_all()
+    assert db.get(models.SlotOccupancy, slot_id).wine_id == wine.id
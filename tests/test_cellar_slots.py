@@ -0,0 +1,66 @@
+"""
+Color maps for the LED panel: search-lookup and scan-in suggestions,
+read from the occupancy projection as bottles go in and out.
+"""
+from sqlalchemy import func
+
+from app import models
+from tests.test_occupancy import free_slot, loose_wine, slot_in
+
+
+def blended_wine(db) -> models.Wine:
+    """A wine in no slot with more than one varietal."""
+    held = db.query(models.SlotOccupancy.wine_id).filter(models.SlotOccupancy.wine_id.isnot(None))
+    blends = (
+        db.query(models.wine_varietals.c.wine_id)
+            .group_by(models.wine_varietals.c.wine_id)
+            .having(func.count() > 1)
+    )
+    return (
+        db.query(models.Wine)
+            .filter(models.Wine.id.in_(blends), models.Wine.id.notin_(held))
+            .order_by(models.Wine.id)
+            .first()
+    )
+
+
+def colors(client, path, **params) -> dict:
+    response = client.post(path, params={key: str(value) for key, value in params.items()})
+    assert response.status_code == 200
+    entries = response.json()
+    slot_ids = [entry["slot_id"] for entry in entries]
+    assert len(slot_ids) == len(set(slot_ids))
+    return {entry["slot_id"]: entry["color"] for entry in entries}
+
+
+def slot_out(client, wine_id):
+    return client.post("/cellar-slots/slot-out", params={"wine_id": str(wine_id)})
+
+
+def test_search_lookup_lists_each_slot_once_for_a_blended_wine(client, db):
+    wine = blended_wine(db)
+    slot_id = str(free_slot(db).slot_id)
+    assert slot_in(client, wine.id, slot_id).status_code == 201
+
+    slots = db.query(models.CellarSlot).count()
+    for varietal in wine.varietals:
+        lit = colors(client, "/cellar-slots/search-lookup", varietal_id=varietal.id)
+        assert len(lit) == slots
+        assert lit[slot_id] == "green"
+    lit = colors(client, "/cellar-slots/search-lookup", country_id=wine.country_id, varietal_id=wine.varietals[0].id)
+    assert len(lit) == slots
+    assert lit[slot_id] == "green"
+
+
+def test_slot_turns_red_and_free_after_slot_out(client, db):
+    wine = loose_wine(db)
+    slot_id = str(free_slot(db).slot_id)
+    assert colors(client, "/cellar-slots/scan-in", wine_id=wine.id)[slot_id] == "blue"
+
+    assert slot_in(client, wine.id, slot_id).status_code == 201
+    assert colors(client, "/cellar-slots/search-lookup", country_id=wine.country_id)[slot_id] == "green"
+    assert slot_id not in colors(client, "/cellar-slots/scan-in", wine_id=wine.id)
+
+    assert slot_out(client, wine.id).status_code == 201
+    assert colors(client, "/cellar-slots/search-lookup", country_id=wine.country_id)[slot_id] == "red"
+    assert colors(client, "/cellar-slots/scan-in", wine_id=wine.id)[slot_id] == "blue"
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app import models, wine_metrics
+
+
+def scored_wine(db):
+    return (
+        db.query(models.CriticScore.wine_id)
+            .group_by(models.CriticScore.wine_id)
+            .order_by(func.count().desc(), models.CriticScore.wine_id)
+            .limit(1)
+            .scalar()
+    )
+
+
+def unscored_wines(db, count):
+    scored = db.query(models.CriticScore.wine_id)
+    return db.query(models.Wine).filter(models.Wine.id.notin_(scored)).order_by(models.Wine.id).limit(count).all()
+
+
+def totals(metrics):
+    return metrics.review_count, Decimal(metrics.score_sum), metrics.avg_score
+
+
+def assert_matches_rebuild(db, wine_id):
+    """The running totals the routes left behind equal a recount from scratch."""
+    db.expire_all()
+    running = totals(db.get(models.WineMetrics, wine_id))
+    rebuilt = totals(wine_metrics.rebuild(db, wine_id))
+    db.rollback()
+    assert running == rebuilt
+    return running
+
+
+def score(client, wine_id, value, score_id=None):
+    body = {"wine_id": str(wine_id), "source": "WA", "score": value, "review_date": "2024-05-01"}
+    if score_id is None:
+        response = client.post("/critic-scores", json=body)
+        assert response.status_code == 201
+    else:
+        response = client.put(f"/critic-scores/{score_id}", json=body)
+        assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_scores_filter_by_wine_over_http(client, db):
+    wine_id = scored_wine(db)
+    response = client.get("/critic-scores", params={"wine_id": str(wine_id)})
+    assert response.status_code == 200
+    scores = response.json()
+    assert scores and {score["wine_id"] for score in scores} == {str(wine_id)}
+
+    assert client.get("/critic-scores", params={"wine_id": "not-a-uuid"}).status_code == 422
+
+
+def test_metrics_routes_take_a_wine_id_over_http(client, db):
+    wine_id = scored_wine(db)
+    recomputed = client.post(f"/metrics/{wine_id}/recompute")
+    assert recomputed.status_code == 200
+    assert recomputed.json()["review_count"] == (
+        db.query(models.CriticScore).filter(models.CriticScore.wine_id == wine_id).count()
+    )
+    assert client.get(f"/metrics/{wine_id}").json() == recomputed.json()
+
+
+def test_running_totals_follow_score_writes(client, db):
+    first, second = unscored_wines(db, 2)
+
+    # the first score seeds the metrics row, the next ones shift it
+    kept = score(client, first.id, "93.50")
+    assert assert_matches_rebuild(db, first.id) == (1, Decimal("93.50"), Decimal("93.50"))
+    moved = score(client, first.id, "88.25")
+    assert assert_matches_rebuild(db, first.id) == (2, Decimal("181.75"), Decimal("90.88"))
+
+    score(client, first.id, "90.00", score_id=moved)
+    assert assert_matches_rebuild(db, first.id) == (2, Decimal("183.50"), Decimal("91.75"))
+
+    # moving a score between wines takes it off one and adds it to the other
+    score(client, second.id, "95.00", score_id=moved)
+    assert assert_matches_rebuild(db, first.id) == (1, Decimal("93.50"), Decimal("93.50"))
+    assert assert_matches_rebuild(db, second.id) == (1, Decimal("95.00"), Decimal("95.00"))
+
+    assert client.delete(f"/critic-scores/{kept}").status_code == 204
+    assert assert_matches_rebuild(db, first.id) == (0, Decimal("0"), None)
+    assert client.delete(f"/critic-scores/{moved}").status_code == 204
+    assert assert_matches_rebuild(db, second.id) == (0, Decimal("0"), None)
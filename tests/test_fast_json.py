@@ -0,0 +1,60 @@
+"""
+fast_json renders list pages without response_model; its output has to
+match what response_model would have produced for the same rows.
+"""
+import uuid
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError, parse_obj_as
+
+from app import fast_json, models, schemas
+from app.main import app
+
+LIST_ROUTES = sorted(
+    route.path for route in app.routes
+    if "GET" in getattr(route, "methods", ()) and "List[" in str(getattr(route, "response_model", ""))
+)
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """(schema, rows) of every page rendered through fast_json.respond."""
+    calls = []
+    respond = fast_json.respond
+
+    def recording(schema, rows, response=None):
+        rows = list(rows)
+        calls.append((schema, rows))
+        return respond(schema, rows, response)
+
+    monkeypatch.setattr(fast_json, "respond", recording)
+    return calls
+
+
+@pytest.mark.parametrize("path", LIST_ROUTES)
+def test_list_routes_match_response_model(client, db, rendered, path):
+    params = {}
+    if path == "/wines/search":
+        params["q"] = db.query(models.Wine.producer).limit(1).scalar()
+
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+
+    (schema, rows), = rendered
+    assert rows, f"{path} returned an empty page"
+    expected = jsonable_encoder(parse_obj_as(List[schema], rows))
+    assert response.json() == expected
+
+
+def test_values_are_coerced_to_the_field_types():
+    slot = models.CellarSlot(id=uuid.uuid4(), rack="0007", row=3, led_node_id="node-7")
+    out = fast_json.serializer(schemas.CellarSlotRead)(slot)
+    assert out == {"rack": 7, "row": "3", "led_node_id": "node-7", "id": slot.id}
+
+
+def test_values_that_dont_fit_fail_like_response_model():
+    slot = models.CellarSlot(id=uuid.uuid4(), rack="A1", row=3, led_node_id="node-7")
+    with pytest.raises(ValidationError):
+        fast_json.serializer(schemas.CellarSlotRead)(slot)
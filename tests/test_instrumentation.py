@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import instrumentation
+
+
+def test_failed_statements_leave_no_state_on_the_connection(db):
+    with instrumentation.track() as stats:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.execute(text("SELECT * FROM no_such_table"))
+            db.rollback()
+        db.execute(text("SELECT 1"))
+
+    assert stats.query_count == 1
+    assert 0 <= stats.db_time < 1
+    assert "query_started" not in db.connection().info
@@ -0,0 +1,106 @@
+"""LedDispatcher against the in-memory SimulatorTransport."""
+import asyncio
+import time
+
+from app.led import LedDispatcher, SimulatorTransport
+
+
+class FlakyTransport(SimulatorTransport):
+    """Fails the first `failures` sends, noting when each attempt was made."""
+    def __init__(self, failures: int):
+        super().__init__()
+        self.remaining  = failures
+        self.attempts   = []
+
+    async def send(self, node_id, colors):
+        self.attempts.append(time.monotonic())
+        if self.remaining:
+            self.remaining -= 1
+            raise ConnectionError("flaky")
+        await super().send(node_id, colors)
+
+
+async def settle(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "dispatcher did not settle"
+        await asyncio.sleep(0.005)
+
+
+def run(dispatcher: LedDispatcher, scenario):
+    async def main():
+        await dispatcher.start()
+        try:
+            await scenario()
+        finally:
+            await dispatcher.stop()
+    asyncio.run(main())
+
+
+def test_commands_for_one_slot_coalesce_into_one_send():
+    transport = SimulatorTransport()
+    dispatcher = LedDispatcher(transport, batch_window=0.05)
+
+    async def scenario():
+        for color in ("red", "green", "blue"):
+            dispatcher.submit("node-1", "slot-a", color)
+        dispatcher.submit("node-1", "slot-b", "red")
+        await settle(lambda: dispatcher.sent.value() == 2)
+
+    run(dispatcher, scenario)
+    assert transport.batches == [("node-1", {"slot-a": "blue", "slot-b": "red"})]
+    assert transport.state == {"node-1": {"slot-a": "blue", "slot-b": "red"}}
+
+
+def test_failed_sends_retry_with_backoff():
+    transport = FlakyTransport(failures=2)
+    dispatcher = LedDispatcher(transport, batch_window=0, max_attempts=5, backoff=0.05)
+
+    async def scenario():
+        dispatcher.submit("node-1", "slot-a", "red")
+        await settle(lambda: dispatcher.sent.value() == 1)
+
+    run(dispatcher, scenario)
+    assert dispatcher.failures.value() == 2
+    assert dispatcher.dropped.value() == 0
+    assert transport.state == {"node-1": {"slot-a": "red"}}
+    # jittered exponential backoff: at least half of 0.05, then of 0.1
+    first, second = (b - a for a, b in zip(transport.attempts, transport.attempts[1:]))
+    assert first >= 0.02
+    assert second >= 0.045
+
+
+def test_gives_up_after_max_attempts():
+    transport = SimulatorTransport(failure_rate=1.0)
+    dispatcher = LedDispatcher(transport, batch_window=0, max_attempts=3, backoff=0.001)
+
+    async def scenario():
+        dispatcher.submit("node-1", "slot-a", "red")
+        dispatcher.submit("node-1", "slot-b", "red")
+        await settle(lambda: dispatcher.dropped.value() == 2)
+
+    run(dispatcher, scenario)
+    assert dispatcher.failures.value() == 3
+    assert dispatcher.sent.value() == 0
+    assert transport.batches == []
+
+
+def test_full_queue_drops_and_counts():
+    transport = SimulatorTransport()
+    dispatcher = LedDispatcher(transport, maxsize=2, batch_window=0.05)
+
+    async def scenario():
+        # all five land in one loop iteration, before the worker drains any
+        accepted = [dispatcher.submit("node-1", f"slot-{i}", "red") for i in range(5)]
+        assert all(accepted)
+        await settle(lambda: dispatcher.sent.value() + dispatcher.dropped.value() == 5)
+
+    run(dispatcher, scenario)
+    assert dispatcher.dropped.value() == 3
+    assert transport.state == {"node-1": {"slot-0": "red", "slot-1": "red"}}
+
+
+def test_submit_when_stopped_is_dropped():
+    dispatcher = LedDispatcher(SimulatorTransport())
+    assert dispatcher.submit("node-1", "slot-a", "red") is False
+    assert dispatcher.dropped.value() == 1
@@ -0,0 +1,106 @@
+"""
+Compare-and-set claims and releases (app.occupancy.claim/release) and
+the slot-in/slot-out routes built on them.
+"""
+import uuid
+
+import pytest
+
+from app import models, occupancy
+
+
+def free_slot(db) -> models.SlotOccupancy:
+    return (
+        db.query(models.SlotOccupancy)
+            .filter(models.SlotOccupancy.wine_id.is_(None))
+            .order_by(models.SlotOccupancy.slot_id)
+            .first()
+    )
+
+
+def loose_wine(db) -> models.Wine:
+    """A wine that is in no slot."""
+    held = db.query(models.SlotOccupancy.wine_id).filter(models.SlotOccupancy.wine_id.isnot(None))
+    return db.query(models.Wine).filter(models.Wine.id.notin_(held)).order_by(models.Wine.id).first()
+
+
+def events(db, slot_id) -> int:
+    return db.query(models.ScanEvent).filter(models.ScanEvent.slot_id == slot_id).count()
+
+
+def new_slot(db) -> models.CellarSlot:
+    """A slot created without its occupancy row, like slots that predate the projection."""
+    slot = models.CellarSlot(
+        id=uuid.uuid4(), rack=str(9000 + db.query(models.CellarSlot).count()), row=0, led_node_id="node-test",
+    )
+    db.add(slot)
+    db.commit()
+    return slot
+
+
+def slot_in(client, wine_id, slot_id):
+    return client.post("/cellar-slots/slot-in", params={"wine_id": str(wine_id), "slot_id": str(slot_id)})
+
+
+def test_second_claim_on_an_occupied_slot_is_a_409(client, db):
+    slot_id = free_slot(db).slot_id
+    first = loose_wine(db)
+    assert slot_in(client, first.id, slot_id).status_code == 201
+    db.expire_all()
+    second = loose_wine(db)
+    before = events(db, slot_id)
+
+    response = slot_in(client, second.id, slot_id)
+
+    assert response.status_code == 409
+    db.expire_all()
+    assert events(db, slot_id) == before
+    assert db.get(models.SlotOccupancy, slot_id).wine_id == first.id
+
+
+def test_release_after_another_release_is_a_409(client, db, monkeypatch):
+    slot_id = free_slot(db).slot_id
+    wine = loose_wine(db)
+    assert slot_in(client, wine.id, slot_id).status_code == 201
+    # both scanners looked the bottle up before either took it out
+    stale = occupancy.current_slot(db, wine.id)
+    db.expunge(stale)
+    monkeypatch.setattr(occupancy, "current_slot", lambda db, wine_id: stale)
+
+    assert client.post("/cellar-slots/slot-out", params={"wine_id": str(wine.id)}).status_code == 201
+    before = events(db, slot_id)
+    response = client.post("/cellar-slots/slot-out", params={"wine_id": str(wine.id)})
+
+    assert response.status_code == 409
+    db.expire_all()
+    assert events(db, slot_id) == before
+    assert db.get(models.SlotOccupancy, slot_id).wine_id is None
+
+
+def test_claim_creates_a_missing_projection_row(db):
+    slot = new_slot(db)
+    wine = loose_wine(db)
+
+    event = occupancy.claim(db, slot.id, wine.id)
+    db.commit()
+
+    occ = db.get(models.SlotOccupancy, slot.id)
+    assert (occ.wine_id, occ.last_event_id) == (wine.id, event.id)
+    with pytest.raises(occupancy.SlotConflict):
+        occupancy.claim(db, slot.id, loose_wine(db).id)
+    db.rollback()
+
+
+def test_claim_loses_a_race_to_create_the_projection_row(db, monkeypatch):
+    slot = new_slot(db)
+    wine = loose_wine(db)
+    # another scanner creates the row between our check and our insert
+    db.add(models.SlotOccupancy(slot_id=slot.id, wine_id=wine.id))
+    db.flush()
+    monkeypatch.setattr(occupancy, "_has_projection", lambda db, slot_id: False)
+
+    with pytest.raises(occupancy.SlotConflict):
+        occupancy.claim(db, slot.id, wine.id)
+    db.rollback()
+    assert events(db, slot.id) == 0
+    assert db.get(models.SlotOccupancy, slot.id) is None
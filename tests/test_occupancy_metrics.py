@@ -0,0 +1,72 @@
+"""
+Scan events reach the /metrics counters only when their outermost
+transaction commits; app.occupancy tallies them and adds them up in its
+own after_commit hook.
+"""
+import subprocess
+import sys
+
+import pytest
+
+from app import models, occupancy, occupancy_stream  # noqa: F401  (its hooks publish CHANGES_KEY)
+from app.occupancy import CHANGES_KEY, RECORDED_KEY
+
+
+def slot(db, occupied: bool) -> models.SlotOccupancy:
+    held = models.SlotOccupancy.wine_id
+    return (
+        db.query(models.SlotOccupancy)
+            .filter(held.isnot(None) if occupied else held.is_(None))
+            .first()
+    )
+
+
+def test_committed_claim_is_counted(db):
+    free = slot(db, occupied=False)
+    wine = db.query(models.Wine).first()
+    before = occupancy.scan_events_total.value()
+
+    occupancy.claim(db, free.slot_id, wine.id)
+    assert occupancy.scan_events_total.value() == before
+    db.commit()
+    assert occupancy.scan_events_total.value() == before + 1
+
+
+def test_conflicting_claim_is_not_counted(db):
+    taken = slot(db, occupied=True)
+    before = occupancy.scan_events_total.value()
+    window = occupancy.scan_events_window.count()
+
+    with pytest.raises(occupancy.SlotConflict):
+        occupancy.claim(db, taken.slot_id, taken.wine_id)
+    db.rollback()
+    db.commit()
+
+    assert occupancy.scan_events_total.value() == before
+    assert occupancy.scan_events_window.count() == window
+
+
+def test_counting_does_not_depend_on_the_stream_module():
+    # a fresh interpreter that never imports app.occupancy_stream
+    script = (
+        "from sqlalchemy import event; from sqlalchemy.orm import Session; import sys; "
+        "from app import occupancy; "
+        "assert 'app.occupancy_stream' not in sys.modules; "
+        "assert event.contains(Session, 'after_commit', occupancy._count_committed)"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_savepoint_rollback_keeps_the_outer_transactions_events(db):
+    free = slot(db, occupied=False)
+    wine = db.query(models.Wine).first()
+    before = occupancy.scan_events_total.value()
+
+    occupancy.claim(db, free.slot_id, wine.id)
+    savepoint = db.begin_nested()
+    savepoint.rollback()
+    assert db.info[RECORDED_KEY] == 1
+    assert len(db.info[CHANGES_KEY]) == 1
+
+    db.commit()
+    assert occupancy.scan_events_total.value() == before + 1
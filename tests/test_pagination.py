@@ -0,0 +1,57 @@
+import base64
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app import models
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.routers import purchases
+from app.routers.purchases import PURCHASE_SORT
+from app.routers.scan_events import SCAN_EVENT_SORT
+
+
+def raw_cursor(items) -> str:
+    return base64.urlsafe_b64encode(json.dumps(items).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    values = [date(2020, 5, 1), uuid.uuid4()]
+    assert decode_cursor(encode_cursor(values), PURCHASE_SORT) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor({"a": 1}),
+    raw_cursor([["n", "not-a-number"], ["u", str(uuid.uuid4())]]),
+    raw_cursor([["d", "2020-05-01"]]),
+    # right shape, wrong types for purchase_date/id
+    raw_cursor([["i", 7], ["s", "x"]]),
+    # a scan events cursor: datetime where purchases sort by date
+    encode_cursor([datetime(2020, 5, 1, 12), uuid.uuid4()]),
+], ids=["garbage", "object", "bad-decimal", "too-short", "wrong-types", "other-endpoint"])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor, PURCHASE_SORT)
+    assert raised.value.status_code == 400
+
+
+def test_cursor_from_another_endpoint_is_a_400(db):
+    foreign = encode_cursor([datetime(2020, 5, 1, 12), uuid.uuid4()])
+    decode_cursor(foreign, SCAN_EVENT_SORT)
+    with pytest.raises(HTTPException) as raised:
+        purchases.list_purchases(response=Response(), skip=0, limit=10, cursor=foreign, db=db)
+    assert raised.value.status_code == 400
+
+
+def test_walk_visits_every_row_once(db):
+    seen, cursor = [], None
+    while True:
+        page = purchases.list_purchases(response=Response(), skip=0, limit=25, cursor=cursor, db=db)
+        seen.extend(row["id"] for row in json.loads(page.body))
+        cursor = page.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == db.query(models.Purchase).count()
@@ -0,0 +1,44 @@
+"""
+List pages load their nested read graphs with a fixed number of
+statements (app/loaders.py), however many rows the page holds.
+"""
+import json
+
+import pytest
+from fastapi import Response
+
+from app import instrumentation
+from app.routers import purchases, scan_events, wines
+
+# statements per page on the test cellar: the page query plus one SELECT
+# per selectin level that still has rows to load
+EXPECTED = {
+    "list_wines": 2,            # wines, varietals (lookups come from the lookup cache)
+    "list_purchases": 8,        # purchases joined to their wine, then the WineRead graph
+    "list_scan_events": 8,      # scan events joined to slot and wine, then the WineRead graph
+}
+
+HANDLERS = [wines.list_wines, purchases.list_purchases, scan_events.list_scan_events]
+
+
+def page(db, handler, limit: int):
+    """Render one page the way the route would; returns (statements, rows)."""
+    with instrumentation.track() as stats:
+        result = handler(response=Response(), skip=0, limit=limit, cursor=None, db=db)
+    return stats.query_count, json.loads(result.body)
+
+
+@pytest.mark.parametrize("handler", HANDLERS, ids=lambda handler: handler.__name__)
+def test_statements_per_page_do_not_grow_with_page_size(db, handler):
+    # warm the lookup cache so both pages see the same cache state
+    page(db, handler, 50)
+    db.expunge_all()
+
+    small, rows = page(db, handler, 1)
+    assert len(rows) == 1
+    db.expunge_all()
+
+    large, rows = page(db, handler, 50)
+    assert len(rows) == 50
+
+    assert small == large == EXPECTED[handler.__name__]
@@ -0,0 +1,115 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, scan_ingest, schemas
+from app.routers.scan_events import create_scan_events_batch
+from tests.test_occupancy import free_slot, loose_wine
+
+IN, OUT = models.EventTypeEnum.IN, models.EventTypeEnum.OUT
+
+
+def item(wine_id, slot_id, key=None, event_type=IN, timestamp=None) -> schemas.ScanEventBatchItem:
+    return schemas.ScanEventBatchItem(
+        idempotency_key=key or uuid.uuid4().hex,
+        wine_id=wine_id, slot_id=slot_id,
+        event_type=event_type, timestamp=timestamp or datetime.utcnow(),
+    )
+
+
+def after(occ: models.SlotOccupancy) -> datetime:
+    """A time later than anything the slot has seen."""
+    return max(datetime.utcnow(), occ.last_event_at or datetime.min)
+
+
+def stored(db, slot_id) -> int:
+    return db.query(models.ScanEvent).filter(models.ScanEvent.slot_id == slot_id).count()
+
+
+def test_row_whose_wine_vanished_is_invalid_not_duplicate(enforced_fks, monkeypatch):
+    db = enforced_fks
+    slot_id, other_slot_id = (
+        slot_id for (slot_id,) in
+        db.query(models.SlotOccupancy.slot_id)
+            .filter(models.SlotOccupancy.wine_id.is_(None))
+            .limit(2)
+    )
+    wine_id = db.query(models.Wine.id).limit(1).scalar()
+    # the wine passes the set-based check but is gone by the time of the insert
+    monkeypatch.setattr(scan_ingest, "_known", lambda db, column, values, chunk_size: set(values))
+
+    result = scan_ingest.ingest(db, [item(wine_id, slot_id), item(uuid.uuid4(), other_slot_id)])
+
+    created, vanished = result.results
+    assert created.status == "created" and created.event_id is not None
+    assert vanished.status == "invalid"
+    assert vanished.event_id is None
+    assert (result.created, result.duplicates, result.conflicts, result.invalid) == (1, 0, 0, 1)
+
+
+def test_transitions_are_checked_in_timestamp_order(db):
+    occ = free_slot(db)
+    slot_id, t = occ.slot_id, after(occ)
+    first = loose_wine(db)
+    second = db.query(models.Wine).filter(models.Wine.id > first.id).order_by(models.Wine.id).first()
+    before = stored(db, slot_id)
+    # request order is not timestamp order
+    batch = [
+        item(first.id, slot_id, event_type=OUT, timestamp=t + timedelta(minutes=4)),
+        item(second.id, slot_id, event_type=OUT, timestamp=t + timedelta(minutes=3)),
+        item(first.id, slot_id, event_type=IN, timestamp=t + timedelta(minutes=1)),
+        item(second.id, slot_id, event_type=IN, timestamp=t + timedelta(minutes=2)),
+        item(second.id, slot_id, event_type=OUT, timestamp=t + timedelta(minutes=5)),
+    ]
+
+    result = scan_ingest.ingest(db, batch)
+
+    assert [(row.status, row.detail) for row in result.results] == [
+        ("created", None),
+        ("conflict", "Slot holds another wine"),
+        ("created", None),
+        ("conflict", "Slot is occupied"),
+        ("conflict", "Slot is empty"),
+    ]
+    assert (result.created, result.conflicts) == (2, 3)
+    assert stored(db, slot_id) == before + 2
+    occ = db.get(models.SlotOccupancy, slot_id)
+    assert occ.wine_id is None and occ.last_event_id == result.results[0].event_id
+
+
+def test_event_older_than_the_slot_is_a_conflict(db):
+    occ = db.query(models.SlotOccupancy).filter(models.SlotOccupancy.wine_id.isnot(None)).first()
+    slot_id, wine_id, last_event_id = occ.slot_id, occ.wine_id, occ.last_event_id
+
+    result = scan_ingest.ingest(db, [item(wine_id, slot_id, event_type=OUT, timestamp=occ.last_event_at - timedelta(days=1))])
+
+    assert (result.results[0].status, result.results[0].detail) == ("conflict", "Older than the slot's last event")
+    db.expire_all()
+    assert db.get(models.SlotOccupancy, slot_id).last_event_id == last_event_id
+
+
+def test_failed_insert_frees_the_slot_for_the_next_event(enforced_fks, monkeypatch):
+    db = enforced_fks
+    occ = free_slot(db)
+    slot_id, t = occ.slot_id, after(occ)
+    wine = loose_wine(db)
+    monkeypatch.setattr(scan_ingest, "_known", lambda db, column, values, chunk_size: set(values))
+
+    # the vanished wine first takes the slot, and then never gets stored
+    result = scan_ingest.ingest(db, [
+        item(uuid.uuid4(), slot_id, timestamp=t + timedelta(minutes=1)),
+        item(wine.id, slot_id, timestamp=t + timedelta(minutes=2)),
+    ])
+
+    assert [row.status for row in result.results] == ["invalid", "created"]
+    assert db.get(models.SlotOccupancy, slot_id).wine_id == wine.id
+
+
+def test_batch_size_is_capped(db, monkeypatch):
+    monkeypatch.setattr(scan_ingest, "MAX_BATCH", 2)
+    events = [item(uuid.uuid4(), uuid.uuid4()) for _ in range(3)]
+    with pytest.raises(HTTPException) as raised:
+        create_scan_events_batch(events, db=db)
+    assert raised.value.status_code == 413
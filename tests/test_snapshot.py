@@ -0,0 +1,75 @@
+"""
+Analytics snapshots (app/snapshot.py). Skipped without pyarrow
+(requirements-optional.txt).
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet
+
+from sqlalchemy import update
+
+from app import models, snapshot
+from app.database import engine
+
+
+def read(out_dir, manifest, table) -> list:
+    run_dir = os.path.join(out_dir, snapshot._load_state(out_dir)["last_snapshot"])
+    return pa.parquet.read_table(os.path.join(run_dir, manifest["tables"][table]["file"])).to_pylist()
+
+
+def test_runs_never_share_a_directory(cellar, tmp_path, monkeypatch):
+    out = str(tmp_path)
+    snapshot.run(engine, out, full=True)
+    snapshot.run(engine, out, full=True)
+    assert len([name for name in os.listdir(out) if name != snapshot.STATE_FILE]) == 2
+
+    # two runs stamped the same instant: the second fails rather than overwrite
+    class frozen(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2030, 1, 1)
+    monkeypatch.setattr(snapshot, "datetime", frozen)
+    first = snapshot.run(engine, out, full=True)
+    with pytest.raises(FileExistsError):
+        snapshot.run(engine, out, full=True)
+    assert snapshot._load_state(out)["last_snapshot"] == "20300101T000000000000Z"
+    assert first["taken_at"] == "2030-01-01T00:00:00"
+
+
+def test_blend_change_reaches_the_next_incremental_run(tmp_path, db, monkeypatch):
+    out = str(tmp_path)
+    monkeypatch.setattr(snapshot, "LOOKBACK", timedelta(0))
+    snapshot.run(engine, out)
+    time.sleep(0.01)
+
+    wine_id = db.query(models.wine_varietals.c.wine_id).order_by(models.wine_varietals.c.wine_id).limit(1).scalar()
+    db.execute(
+        update(models.wine_varietals)
+            .where(models.wine_varietals.c.wine_id == wine_id)
+            .values(blend_pct=models.wine_varietals.c.blend_pct)
+    )
+    db.commit()
+    manifest = snapshot.run(engine, out)
+
+    assert manifest["mode"] == "incremental"
+    assert {row["id"] for row in read(out, manifest, "wines")} == {str(wine_id)}
+    blend = read(out, manifest, "wine_varietals")
+    assert blend and {row["wine_id"] for row in blend} == {str(wine_id)}
+
+
+def test_renaming_a_varietal_touches_its_wines(db):
+    link = models.wine_varietals.c
+    varietal_id = db.query(link.varietal_id).order_by(link.varietal_id).limit(1).scalar()
+    blended = db.query(link.wine_id).filter(link.varietal_id == varietal_id)
+    before = datetime.utcnow()
+    time.sleep(0.01)
+
+    db.execute(update(models.Varietal).where(models.Varietal.id == varietal_id).values(name="Renamed"))
+
+    stamps = [stamp for (stamp,) in db.query(models.Wine.updated_at).filter(models.Wine.id.in_(blended))]
+    assert stamps and all(stamp > before for stamp in stamps)
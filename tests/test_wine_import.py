@@ -0,0 +1,65 @@
+import uuid
+
+from sqlalchemy import Insert
+
+from app import models, schemas, wine_import
+from app.database import SessionLocal
+
+
+def wine(subregion, label: str) -> schemas.WineCreate:
+    return schemas.WineCreate(
+        producer="Domaine Test", label=label, vintage=2019,
+        country_id=subregion.region.country_id, region_id=subregion.region_id, subregion_id=subregion.id,
+        bottle_size="standard", closure_type="cork",
+    )
+
+
+def race_before_insert(db, monkeypatch, race):
+    """Run `race` on another session just before the chunk's first INSERT."""
+    execute, raced = db.execute, []
+
+    def racing(statement, *args, **kwargs):
+        if isinstance(statement, Insert) and not raced:
+            raced.append(True)
+            other = SessionLocal()
+            try:
+                race(other)
+                other.commit()
+            except Exception as e:
+                # not an IntegrityError, or import_chunk would take it for its own
+                raise AssertionError(f"the racing writer failed: {e}") from e
+            finally:
+                other.close()
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", racing)
+
+
+def test_row_failures_are_told_apart(enforced_fks, monkeypatch):
+    db = enforced_fks
+    subregion = db.query(models.Subregion).first()
+    # lookups that exist for the checks and are deleted before the insert
+    country = models.Country(id=uuid.uuid4(), name=f"Doomed {uuid.uuid4().hex[:8]}")
+    region = models.Region(id=uuid.uuid4(), name="Doomed", country=country)
+    doomed = models.Subregion(id=uuid.uuid4(), name="Doomed", region=region)
+    db.add(doomed)
+    db.commit()
+
+    raced = wine(subregion, f"Raced {uuid.uuid4().hex}")
+    orphan = wine(doomed, f"Orphan {uuid.uuid4().hex}")
+    fine = wine(subregion, f"Fine {uuid.uuid4().hex}")
+
+    def race(other):
+        other.add(models.Wine(id=uuid.uuid4(), **raced.dict()))
+        for model, id in ((models.Subregion, doomed.id), (models.Region, region.id), (models.Country, country.id)):
+            other.query(model).filter(model.id == id).delete()
+
+    race_before_insert(db, monkeypatch, race)
+    created, failures = wine_import.import_chunk(db, [(0, raced), (1, orphan), (2, fine)], set())
+
+    assert created == 1
+    by_index = {failure.index: failure for failure in failures}
+    assert by_index[0].status == "conflict"
+    assert by_index[1].status == "invalid"
+    assert "FOREIGN KEY" in by_index[1].detail
+    assert 2 not in by_index
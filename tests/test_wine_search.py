@@ -0,0 +1,73 @@
+"""The in-process WineIndex, used on every backend but PostgreSQL."""
+import uuid
+
+import pytest
+
+from app import wine_search
+from app.wine_search import WineIndex, query_words
+
+
+@pytest.fixture
+def index(db):
+    """The test cellar indexed, plus a few wines with known names."""
+    index = WineIndex(threshold=0.5)
+    index.load(db)
+    wines = {
+        "margaux": uuid.uuid4(),
+        "margaux_second": uuid.uuid4(),
+        "palmer": uuid.uuid4(),
+    }
+    index.add(wines["margaux"], "Château Margaux", "Grand Vin")
+    index.add(wines["margaux_second"], "Château Margaux", "Pavillon Rouge")
+    index.add(wines["palmer"], "Château Palmer", "Alter Ego")
+    index.wines = wines
+    return index
+
+
+def test_query_words_drop_case_accents_and_punctuation():
+    assert query_words("Château-Margaux, GRAND vin!") == ["chateau", "margaux", "grand", "vin"]
+    assert query_words("margaux margaux") == ["margaux"]
+    assert query_words(" -- ") == []
+
+
+@pytest.mark.parametrize("query", [
+    "margaux", "Margaux", "MARGAUX!", "château margaux", "chateau-margaux", "margeaux", "marg",
+])
+def test_spellings_find_the_wine(index, db, query):
+    found = index.search(db, query, limit=5)
+    assert index.wines["margaux"] in found
+    assert index.wines["palmer"] not in found
+
+
+def test_every_query_word_has_to_match(index, db):
+    assert index.search(db, "margaux grand", limit=5)[0] == index.wines["margaux"]
+    assert index.wines["margaux_second"] not in index.search(db, "margaux grand", limit=5)
+    assert index.search(db, "margaux qwxzy", limit=5) == []
+    assert index.search(db, "", limit=5) == []
+
+
+def test_whole_word_hits_rank_above_partial_ones(index, db):
+    index.add(uuid.uuid4(), "Domaine Palmeraie", "Rosé")
+    assert index.search(db, "palmer", limit=2)[0] == index.wines["palmer"]
+
+
+def test_common_words_respect_the_limit(index, db):
+    found = index.search(db, "chateau", limit=3)
+    assert len(found) == 3
+    assert len(set(found)) == 3
+
+
+def test_removed_and_renamed_wines(index, db):
+    index.remove(index.wines["palmer"])
+    assert index.search(db, "palmer", limit=5) == []
+
+    index.add(index.wines["margaux"], "Château Lafite", "Grand Vin")
+    assert index.wines["margaux"] not in index.search(db, "margaux", limit=5)
+    assert index.search(db, "lafite", limit=5) == [index.wines["margaux"]]
+
+
+def test_search_dispatches_to_the_in_process_index(db, monkeypatch):
+    index = WineIndex()
+    monkeypatch.setattr(wine_search, "index", index)
+    assert wine_search.search(db, "qwxzy") == []
+    assert index.stats()["loaded"]